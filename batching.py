@@ -0,0 +1,142 @@
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MicroBatcher:
+    def __init__(self, run_batch, max_batch_size=32, max_wait_ms=5.0):
+        """
+        Collects concurrent single-item requests into one batched call.
+
+        The first waiting item opens a window of max_wait_ms; the batch is flushed
+        when the window closes or max_batch_size items have arrived, whichever
+        comes first. Batches are dispatched as separate tasks, so the next window
+        starts collecting while the previous batch is still running.
+
+        Args:
+            run_batch (callable): async function taking a list of items and
+                returning a list of results in the same order
+            max_batch_size (int): Largest batch handed to run_batch
+            max_wait_ms (float): How long the first item waits for company
+        """
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, float(max_wait_ms)) / 1000.0
+
+        self._pending = []
+        self._wakeup = None
+        self._full = None
+        self._worker = None
+        self._inflight = set()
+
+        self.batches = 0
+        self.items = 0
+        self.largest_batch = 0
+
+    @classmethod
+    def from_config(cls, config, run_batch):
+        """Build a batcher from the "batching" section of config.json, or None if disabled."""
+        settings = config.get("batching", {})
+        if not settings.get("enabled", False):
+            return None
+        return cls(
+            run_batch,
+            max_batch_size=settings.get("max_batch_size", 32),
+            max_wait_ms=settings.get("max_wait_ms", 5.0),
+        )
+
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._full = asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._collect())
+
+    async def submit(self, item):
+        """Queue one item and wait for its result from the batched call."""
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        self._wakeup.set()
+        if len(self._pending) >= self.max_batch_size:
+            self._full.set()
+        return await future
+
+    async def _collect(self):
+        while True:
+            await self._wakeup.wait()
+            if len(self._pending) < self.max_batch_size and self.max_wait > 0:
+                try:
+                    await asyncio.wait_for(self._full.wait(), self.max_wait)
+                except asyncio.TimeoutError:
+                    pass
+
+            batch = self._pending[:self.max_batch_size]
+            self._pending = self._pending[self.max_batch_size:]
+            if not self._pending:
+                self._wakeup.clear()
+            if len(self._pending) < self.max_batch_size:
+                self._full.clear()
+
+            task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        self.largest_batch = max(self.largest_batch, len(batch))
+        items = [item for item, _ in batch]
+        try:
+            results = await self.run_batch(items)
+            if len(results) != len(batch):
+                raise RuntimeError(f"Batch returned {len(results)} results for {len(batch)} items")
+        except asyncio.CancelledError:
+            for _, future in batch:
+                future.cancel()
+            raise
+        except Exception as e:
+            logger.error(f"Batched call failed for {len(batch)} items: {e}")
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 3) if self.batches else 0.0,
+            "largest_batch": self.largest_batch,
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "pending": len(self._pending),
+            "inflight_batches": len(self._inflight),
+        }
+
+    async def close(self, timeout=10.0):
+        """
+        Stop collecting and cancel the items not batched yet. Batches already
+        running get timeout seconds to finish, then are cancelled, so none is
+        left holding a session when the executor and session pool shut down.
+        """
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
+        for _, future in self._pending:
+            if not future.done():
+                future.cancel()
+        self._pending = []
+        if self._inflight:
+            _, running = await asyncio.wait(set(self._inflight), timeout=timeout)
+            for task in running:
+                task.cancel()
+            await asyncio.gather(*running, return_exceptions=True)
@@ -0,0 +1,124 @@
+"""
+College detection cost as the approved list grows: the Aho-Corasick matcher
+against the per-college substring loop detect_college used before, and the
+fuzzy n-gram lookup on the same cards with OCR-style character errors.
+
+The approved list is padded with generated institution names up to each size;
+the OCR texts are card-like and name a college from the list, an unknown
+institution, or none at all.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_college_matcher --sizes 500 5000 50000
+"""
+import argparse
+import json
+import random
+import time
+
+from college_matcher import CollegeMatcher, EDU_KEYWORDS
+
+PREFIXES = ["Sri", "Government", "National", "Royal", "St.", "New", "Central", "Modern", "City", "Global"]
+SUBJECTS = ["Engineering", "Arts", "Science", "Technology", "Commerce", "Medical", "Law", "Management"]
+KINDS = ["College", "Institute", "University", "Academy", "Polytechnic"]
+PLACES = ["Chennai", "Pune", "Delhi", "Hyderabad", "Kolkata", "Jaipur", "Mysore", "Nagpur", "Bhopal", "Patna"]
+
+
+def naive_find(text, colleges):
+    text_lower = text.lower()
+    for college in colleges:
+        if college.lower() in text_lower:
+            return college, None
+    for keyword in EDU_KEYWORDS:
+        if keyword in text_lower:
+            for line in text.splitlines():
+                if keyword in line.lower() and len(line.strip()) > len(keyword):
+                    return None, line.strip()
+    return None, None
+
+
+def scaled_colleges(base, size, rng):
+    colleges = list(base)
+    seen = {c.lower() for c in colleges}
+    while len(colleges) < size:
+        name = f"{rng.choice(PREFIXES)} {rng.choice(SUBJECTS)} {rng.choice(KINDS)} {rng.choice(PLACES)} {rng.randint(1, 99999)}"
+        if name.lower() not in seen:
+            seen.add(name.lower())
+            colleges.append(name)
+    return colleges
+
+
+def card_text(colleges, rng):
+    roll = f"{rng.randint(10, 99)}CS{rng.randint(1000, 9999)}"
+    choice = rng.random()
+    if choice < 0.5:
+        institution = rng.choice(colleges)
+    elif choice < 0.8:
+        institution = "Unlisted Institute of Technology"
+    else:
+        institution = "Identity Card"
+    return f"{institution.upper()}\nSTUDENT IDENTITY CARD\nName: Asha Kumar\nCourse: B.Tech CSE\nRoll No: {roll}\nValid till 2027"
+
+
+def ocr_noise(text, rng, errors=2):
+    """Swap a few letters of the institution line for common OCR confusions."""
+    first, rest = text.split("\n", 1)
+    chars = list(first)
+    for _ in range(errors):
+        i = rng.randrange(len(chars))
+        chars[i] = {"I": "L", "Y": "V", "O": "0", "E": "F", "S": "5"}.get(chars[i], "X")
+    return "".join(chars) + "\n" + rest
+
+
+def timed(func, texts):
+    start = time.perf_counter()
+    for text in texts:
+        func(text)
+    return (time.perf_counter() - start) / len(texts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 5000, 50000])
+    parser.add_argument("--texts", type=int, default=500)
+    parser.add_argument("--colleges", default="approved_colleges.json")
+    args = parser.parse_args()
+
+    with open(args.colleges, "r") as f:
+        base = json.load(f)
+
+    rng = random.Random(0)
+    print(f"{'colleges':>10}{'build s':>10}{'automaton us':>14}{'naive us':>10}{'speedup':>9}"
+          f"{'fuzzy us':>10}{'fuzzy p99 us':>14}{'fuzzy recall %':>16}")
+    for size in args.sizes:
+        colleges = scaled_colleges(base, size, rng)
+        texts = [card_text(colleges, rng) for _ in range(args.texts)]
+
+        start = time.perf_counter()
+        matcher = CollegeMatcher(colleges)
+        build = time.perf_counter() - start
+
+        for text in texts:
+            assert matcher.find(text) == naive_find(text, colleges), text
+
+        fast = timed(matcher.find, texts)
+        slow = timed(lambda text: naive_find(text, colleges), texts)
+
+        approved = {c.lower() for c in colleges}
+        listed = [(ocr_noise(text, rng), text.split("\n", 1)[0]) for text in texts
+                  if text.split("\n", 1)[0].lower() in approved]
+        latencies = []
+        recalled = 0
+        for noisy, original in listed:
+            start = time.perf_counter()
+            name, _ = matcher.closest(noisy)
+            latencies.append(time.perf_counter() - start)
+            recalled += name is not None and name.lower() == original.lower()
+        latencies.sort()
+        fuzzy = sum(latencies) / len(latencies)
+        p99 = latencies[int(0.99 * (len(latencies) - 1))]
+        print(f"{size:>10}{build:>10.2f}{fast * 1e6:>14.1f}{slow * 1e6:>10.1f}{slow / fast:>8.1f}x"
+              f"{fuzzy * 1e6:>10.1f}{p99 * 1e6:>14.1f}{recalled / len(listed) * 100:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Lookup latency of NearDuplicateIndex as the number of stored hashes grows.
+
+Random 64-bit hashes stand in for validated cards; a share of the queries are
+near-duplicates (a few flipped bits) of stored hashes, the rest are new cards.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_duplicate_index --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import time
+
+from phash_index import NearDuplicateIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--max-distance", type=int, default=6)
+    parser.add_argument("--queries", type=int, default=2000)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(f"{'hashes':>10}{'build s':>10}{'lookup us':>12}{'p99 us':>10}{'dup found %':>13}")
+    for size in args.sizes:
+        index = NearDuplicateIndex(max_distance=args.max_distance)
+        hashes = [rng.getrandbits(64) for _ in range(size)]
+        start = time.perf_counter()
+        for i, h in enumerate(hashes):
+            index.add(h, {"user_id": f"stu_{i}"})
+        build = time.perf_counter() - start
+
+        queries = []
+        for i in range(args.queries):
+            if i % 2:
+                h = rng.choice(hashes)
+                for bit in rng.sample(range(64), rng.randint(0, args.max_distance)):
+                    h ^= 1 << bit
+                queries.append((h, True))
+            else:
+                queries.append((rng.getrandbits(64), False))
+
+        latencies = []
+        found_dups = 0
+        for h, is_dup in queries:
+            start = time.perf_counter()
+            found = index.search(h)
+            latencies.append(time.perf_counter() - start)
+            found_dups += bool(is_dup and found)
+        latencies.sort()
+        mean_us = sum(latencies) / len(latencies) * 1e6
+        p99_us = latencies[int(len(latencies) * 0.99) - 1] * 1e6
+        print(f"{size:>10}{build:>10.2f}{mean_us:>12.1f}{p99_us:>10.1f}{100.0 * found_dups / (len(queries) // 2):>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
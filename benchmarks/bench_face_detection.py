@@ -0,0 +1,108 @@
+"""
+Face detection latency and recall over tests/sample_inputs: the original
+full-resolution detectMultiScale against FaceDetector on a downscaled copy,
+with and without the card layout's photo region.
+
+Recall is measured against the full-resolution detector: the share of images
+where it found a face that the fast path also finds one on. --upscale enlarges
+the samples first to mimic phone photos (4 gives roughly 12 MP from a 1000 px card).
+
+Usage (from the repository root):
+    python -m benchmarks.bench_face_detection --upscale 4
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+
+import cv2
+from PIL import Image
+
+from card_layouts import LayoutRegistry
+from face_detector import FaceDetector
+from image_context import DecodedImage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(ROOT, "tests", "sample_inputs")
+
+
+def load_images(sample_dir, limit, upscale):
+    paths = sorted(
+        p for p in glob.glob(os.path.join(sample_dir, "**", "*"), recursive=True)
+        if p.lower().endswith((".jpg", ".jpeg", ".png"))
+    )[:limit]
+    images = []
+    for path in paths:
+        pil_image = Image.open(path).convert("RGB")
+        if upscale != 1:
+            pil_image = pil_image.resize((pil_image.width * upscale, pil_image.height * upscale), Image.BICUBIC)
+        images.append((os.path.relpath(path, sample_dir), pil_image))
+    return images
+
+
+def full_resolution(cascade, decoded):
+    return cascade.detectMultiScale(decoded.gray, scaleFactor=1.1, minNeighbors=5)
+
+
+def timed(detect, images):
+    latencies, found = [], []
+    for pil_image, layout in images:
+        decoded = DecodedImage(pil_image)  # fresh per call: no cached grey/downscaled variants
+        start = time.perf_counter()
+        faces = detect(decoded, layout)
+        latencies.append((time.perf_counter() - start) * 1000)
+        found.append(len(faces) > 0)
+    return latencies, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=SAMPLE_DIR)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--upscale", type=int, default=1)
+    parser.add_argument("--config", default=os.path.join(ROOT, "config.json"))
+    args = parser.parse_args()
+
+    samples = load_images(args.samples, args.limit, args.upscale)
+    if not samples:
+        raise SystemExit(f"No sample images found under {args.samples}")
+    with open(args.config, "r") as f:
+        config = json.load(f)
+
+    registry = LayoutRegistry.from_config(config, base_dir=ROOT)
+    images = []
+    layouts_found = 0
+    for _, pil_image in samples:
+        layout = registry.find_layout(DecodedImage(pil_image))[1] if registry is not None else None
+        layouts_found += layout is not None
+        images.append((pil_image, layout))
+
+    cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+    detector = FaceDetector.from_config(config)
+    variants = [
+        ("full resolution", lambda decoded, layout: full_resolution(cascade, decoded)),
+        ("downscaled", lambda decoded, layout: detector.detect(decoded)),
+        ("downscaled+layout", detector.detect),
+    ]
+
+    width, height = samples[0][1].size
+    print(f"Images: {len(images)} ({width}x{height} first), layouts recognised: {layouts_found}")
+    print(f"{'variant':<20}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}{'faces %':>10}{'recall %':>10}")
+    reference = None
+    for name, detect in variants:
+        latencies, found = timed(detect, images)
+        if reference is None:
+            reference = found
+        positives = sum(reference)
+        recall = sum(a and b for a, b in zip(reference, found)) / positives * 100 if positives else float("nan")
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{name:<20}{p50:>10.1f}{p95:>10.1f}{statistics.mean(latencies):>10.1f}"
+              f"{sum(found) / len(found) * 100:>10.1f}{recall:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
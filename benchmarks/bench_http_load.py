@@ -0,0 +1,204 @@
+"""
+End-to-end load test of a running server (uvicorn main:app). Replays a
+request log written by the recorder (the "recording" section of config.json)
+or, without --log, the images in tests/sample_inputs, cycling through them.
+
+Two ways to drive the server, each over one or more levels so the results form
+a curve:
+    --concurrency 1 2 4 8   closed loop: that many clients, each sending its next
+                            request as soon as the previous one is answered
+    --rate 5 10 20          open loop: requests started at that many per second
+                            (evenly spaced, or Poisson arrivals with --poisson),
+                            whether or not earlier ones have been answered
+
+Open-loop latency is counted from when a request was due to be sent, so a
+server that falls behind shows up as growing latency instead of a slower send
+rate. Every level reports throughput, error rate by status and p50/p95/p99.
+Send Cache-Control: no-cache with --bypass-cache, or repeated images will be
+answered from the result cache.
+
+Usage (from the repository root, with the server on port 8000):
+    python -m benchmarks.bench_http_load --concurrency 1 2 4 8 16 --duration 30 --bypass-cache
+    python -m benchmarks.bench_http_load --log .cache/recorded_requests.jsonl --rate 2 5 10
+"""
+import argparse
+import asyncio
+import base64
+import itertools
+import json
+import math
+import os
+import random
+import time
+from collections import Counter
+
+import httpx
+
+from request_recorder import read_recorded
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(ROOT, "tests", "sample_inputs")
+
+
+def load_requests(log_path, sample_dir):
+    """(endpoint, user_id, image_bytes, no_cache) tuples to replay."""
+    if log_path:
+        return [(r["endpoint"], r["user_id"], r["image_bytes"], r.get("no_cache", False))
+                for r in read_recorded(log_path)]
+    requests = []
+    for root, _, files in sorted(os.walk(sample_dir)):
+        for name in sorted(files):
+            if name.lower().endswith((".jpg", ".jpeg", ".png")):
+                with open(os.path.join(root, name), "rb") as f:
+                    requests.append(("/validate-id", os.path.splitext(name)[0], f.read(), False))
+    return requests
+
+
+def build_sender(client, requests, bypass_cache):
+    """
+    Encode every request once up front, so the client's own base64/JSON work is
+    not part of the measured latency. Returns an async send(index) -> status code.
+    """
+    prepared = []
+    for endpoint, user_id, image_bytes, no_cache in requests:
+        headers = {"Cache-Control": "no-cache"} if bypass_cache or no_cache else {}
+        if endpoint == "/validate-id/upload":
+            headers["Content-Type"] = "application/octet-stream"
+            prepared.append((endpoint, {"content": image_bytes, "params": {"user_id": user_id}, "headers": headers}))
+        else:
+            body = json.dumps({"user_id": user_id, "image_base64": base64.b64encode(image_bytes).decode("ascii")})
+            headers["Content-Type"] = "application/json"
+            prepared.append(("/validate-id", {"content": body.encode("utf-8"), "headers": headers}))
+
+    async def send(index):
+        endpoint, kwargs = prepared[index % len(prepared)]
+        try:
+            response = await client.post(endpoint, **kwargs)
+            return response.status_code
+        except httpx.TimeoutException:
+            return "timeout"
+        except httpx.HTTPError as e:
+            return type(e).__name__
+
+    return send
+
+
+async def closed_loop(send, concurrency, duration):
+    """concurrency clients back to back for duration seconds; returns [(latency s, status), ...]."""
+    results = []
+    counter = itertools.count()
+    deadline = time.perf_counter() + duration
+
+    async def client():
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            status = await send(next(counter))
+            results.append((time.perf_counter() - start, status))
+
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    return results
+
+
+async def open_loop(send, rate, duration, poisson, seed=0):
+    """Requests started at rate per second for duration seconds; latency counts from the due time."""
+    results = []
+    rng = random.Random(seed)
+    tasks = []
+    start = time.perf_counter()
+
+    async def one(index, due):
+        status = await send(index)
+        results.append((time.perf_counter() - due, status))
+
+    due = start
+    for index in itertools.count():
+        due += rng.expovariate(rate) if poisson else 1.0 / rate
+        if due - start > duration:
+            break
+        delay = due - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(one(index, due)))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    return sorted_values[min(len(sorted_values) - 1, max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1))]
+
+
+def summarize(results, elapsed):
+    statuses = Counter(status for _, status in results)
+    ok = sorted(latency * 1000 for latency, status in results if status == 200)
+    total = len(results)
+    return {
+        "requests": total,
+        "ok": len(ok),
+        "error_rate": round((total - len(ok)) / total, 4) if total else 0.0,
+        "errors": {str(status): count for status, count in statuses.items() if status != 200},
+        "throughput_per_s": round(len(ok) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(ok, 50), 1) if ok else None,
+        "p95_ms": round(percentile(ok, 95), 1) if ok else None,
+        "p99_ms": round(percentile(ok, 99), 1) if ok else None,
+        "max_ms": round(ok[-1], 1) if ok else None,
+    }
+
+
+def _ms(value):
+    return f"{value:>10.1f}" if value is not None else f"{'-':>10}"
+
+
+async def run(args):
+    requests = load_requests(args.log, args.samples)
+    if not requests:
+        raise SystemExit(f"No requests to replay in {args.log or args.samples}")
+    mode, levels = ("rate", args.rate) if args.rate else ("concurrency", args.concurrency or [1])
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=None)
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout, limits=limits) as client:
+        send = build_sender(client, requests, args.bypass_cache)
+        if args.warmup > 0:
+            await closed_loop(send, 1, args.warmup)
+
+        print(f"Replaying {len(requests)} requests against {args.url}, {args.duration:g} s per level")
+        print(f"{mode:<12}{'requests':>10}{'ok/s':>9}{'errors %':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+              f"  errors by status")
+        report = []
+        for level in levels:
+            start = time.perf_counter()
+            if mode == "rate":
+                results = await open_loop(send, level, args.duration, args.poisson)
+            else:
+                results = await closed_loop(send, int(level), args.duration)
+            summary = dict(summarize(results, time.perf_counter() - start), **{mode: level})
+            report.append(summary)
+            print(f"{level:<12g}{summary['requests']:>10}{summary['throughput_per_s']:>9.2f}"
+                  f"{summary['error_rate'] * 100:>10.2f}{_ms(summary['p50_ms'])}{_ms(summary['p95_ms'])}"
+                  f"{_ms(summary['p99_ms'])}  {summary['errors'] or ''}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"url": args.url, "mode": mode, "duration": args.duration, "levels": report}, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--log", help="Recorder JSONL to replay, with the job workers' logs next to it (default: tests/sample_inputs)")
+    parser.add_argument("--samples", default=SAMPLE_DIR)
+    drive = parser.add_mutually_exclusive_group()
+    drive.add_argument("--concurrency", type=int, nargs="+", help="Closed-loop client counts")
+    drive.add_argument("--rate", type=float, nargs="+", help="Open-loop arrival rates (requests per second)")
+    parser.add_argument("--poisson", action="store_true", help="Poisson arrivals instead of evenly spaced ones")
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds per level")
+    parser.add_argument("--warmup", type=float, default=3.0, help="Seconds of single-client traffic first")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--bypass-cache", action="store_true", help="Send Cache-Control: no-cache")
+    parser.add_argument("--output", help="Also write the results as JSON")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Compare the pytesseract subprocess path with the persistent tesserocr engine
+over tests/sample_inputs: per-call latency, warmup cost and whether both
+engines read the same text.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_ocr_engines --repeat 3
+"""
+import argparse
+import glob
+import os
+import statistics
+import time
+
+import numpy as np
+from PIL import Image
+
+from ocr_engine import PytesseractEngine, TesserocrEngine, tesserocr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(ROOT, "tests", "sample_inputs")
+
+
+def load_images(sample_dir, limit):
+    paths = sorted(
+        p for p in glob.glob(os.path.join(sample_dir, "**", "*"), recursive=True)
+        if p.lower().endswith((".jpg", ".jpeg", ".png"))
+    )[:limit]
+    return [np.asarray(Image.open(p).convert("RGB")) for p in paths]
+
+
+def run(engine, images, repeat):
+    engine.warmup()
+    latencies = []
+    texts = []
+    for _ in range(repeat):
+        texts = []
+        for rgb in images:
+            start = time.perf_counter()
+            texts.append(engine.image_to_string(rgb))
+            latencies.append((time.perf_counter() - start) * 1000)
+    return latencies, texts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=SAMPLE_DIR)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--tesseract-cmd", default=None, help="Path to the tesseract binary for pytesseract")
+    args = parser.parse_args()
+
+    images = load_images(args.samples, args.limit)
+    if not images:
+        raise SystemExit(f"No sample images found under {args.samples}")
+
+    engines = [PytesseractEngine(tesseract_cmd=args.tesseract_cmd)]
+    if tesserocr is not None:
+        engines.append(TesserocrEngine())
+    else:
+        print("tesserocr is not installed; only the pytesseract path is measured")
+
+    results = {}
+    print(f"Images: {len(images)}, passes: {args.repeat}")
+    print(f"{'engine':<14}{'warmup ms':>11}{'p50 ms':>10}{'p95 ms':>10}{'mean ms':>10}")
+    for engine in engines:
+        latencies, texts = run(engine, images, args.repeat)
+        results[engine.name] = (statistics.mean(latencies), texts)
+        latencies.sort()
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        print(f"{engine.name:<14}{engine.warmup_time * 1000:>11.1f}{p50:>10.1f}{p95:>10.1f}"
+              f"{statistics.mean(latencies):>10.1f}")
+
+    if len(results) == 2:
+        (base_mean, base_texts), (fast_mean, fast_texts) = results["pytesseract"], results["tesserocr"]
+        same = sum(a.split() == b.split() for a, b in zip(base_texts, fast_texts))
+        print(f"Speedup: {base_mean / fast_mean:.2f}x, identical text on {same}/{len(images)} images")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Classifier preprocessing over tests/sample_inputs: the original LANCZOS path
+(several float temporaries per image) against the fused Preprocessor writing
+into a reused buffer, from a decoded image and from the upload bytes (where
+the fused path also decodes JPEGs at a reduced DCT scale).
+
+Equivalence is the mean and max absolute difference of the normalised tensors
+against the original output; the run fails if the mean exceeds --tolerance.
+Peak memory is what tracemalloc sees numpy and PIL allocate per call.
+--upscale enlarges the samples first to mimic phone photos.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_preprocessing --upscale 4 --repeat 5
+"""
+import argparse
+import io
+import os
+import statistics
+import time
+import tracemalloc
+
+import numpy as np
+from PIL import Image
+
+from preprocessing import MEAN, STD, Preprocessor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(ROOT, "tests", "sample_inputs")
+
+
+def original_preprocess(pil_image):
+    """main.preprocess_image before the fused path, kept as the reference."""
+    if pil_image.mode != 'RGB':
+        pil_image = pil_image.convert('RGB')
+    img = pil_image.resize((224, 224), Image.Resampling.LANCZOS)
+    img_array = np.array(img).astype(np.float32) / 255.0
+    mean = np.array(MEAN, dtype=np.float32)
+    std = np.array(STD, dtype=np.float32)
+    img_array = (img_array - mean) / std
+    img_array = np.transpose(img_array, (2, 0, 1))
+    img_array = np.expand_dims(img_array, axis=0).astype(np.float32)
+    return img_array
+
+
+def load_samples(sample_dir, limit, upscale):
+    paths = sorted(
+        p for p in (os.path.join(root, name) for root, _, files in os.walk(sample_dir) for name in files)
+        if p.lower().endswith((".jpg", ".jpeg", ".png"))
+    )[:limit]
+    samples = []
+    for path in paths:
+        pil_image = Image.open(path).convert("RGB")
+        if upscale != 1:
+            pil_image = pil_image.resize((pil_image.width * upscale, pil_image.height * upscale), Image.BICUBIC)
+        buffer = io.BytesIO()
+        pil_image.save(buffer, format="JPEG", quality=90)
+        samples.append((pil_image, buffer.getvalue()))
+    return samples
+
+
+def measure(func, inputs, repeat):
+    """Per-call latencies (ms), mean peak traced memory (KB) and the outputs of the last pass."""
+    latencies, peaks, outputs = [], [], []
+    func(inputs[0])  # warmup
+    for _ in range(repeat):
+        outputs = []
+        for item in inputs:
+            start = time.perf_counter()
+            outputs.append(np.array(func(item)).reshape(3, 224, 224))
+            latencies.append((time.perf_counter() - start) * 1000)
+    for item in inputs:
+        tracemalloc.start()
+        func(item)
+        peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+        tracemalloc.stop()
+    latencies.sort()
+    return latencies, statistics.mean(peaks), outputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=SAMPLE_DIR)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--upscale", type=int, default=1)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--resample", default="bilinear")
+    parser.add_argument("--reducing-gap", type=float, default=3.0)
+    parser.add_argument("--tolerance", type=float, default=0.05,
+                        help="Largest acceptable mean absolute difference in normalised units")
+    args = parser.parse_args()
+
+    samples = load_samples(args.samples, args.limit, args.upscale)
+    if not samples:
+        raise SystemExit(f"No sample images found under {args.samples}")
+    images = [pil_image for pil_image, _ in samples]
+    payloads = [data for _, data in samples]
+
+    preprocessor = Preprocessor(resample=args.resample, reducing_gap=args.reducing_gap)
+    out = np.empty(preprocessor.shape, dtype=np.float32)
+    variants = [
+        ("original (image)", images, original_preprocess),
+        ("fused (image)", images, lambda pil_image: preprocessor(pil_image, out)),
+        ("original (bytes)", payloads, lambda data: original_preprocess(Image.open(io.BytesIO(data)))),
+        ("fused+draft (bytes)", payloads, lambda data: preprocessor(preprocessor.open(data), out)),
+    ]
+
+    width, height = images[0].size
+    print(f"Images: {len(images)} ({width}x{height} first), passes: {args.repeat}, "
+          f"filter: {args.resample}, reducing_gap: {args.reducing_gap}")
+    print(f"{'variant':<22}{'p50 ms':>10}{'p95 ms':>10}{'peak KB':>10}{'speedup':>10}{'mean diff':>12}{'max diff':>10}")
+    failed = False
+    reference = None
+    for name, inputs, func in variants:
+        latencies, peak, outputs = measure(func, inputs, args.repeat)
+        p50 = latencies[len(latencies) // 2]
+        p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+        if name.startswith("original"):
+            reference, baseline = outputs, p50
+        diffs = [np.abs(a - b) for a, b in zip(outputs, reference)]
+        mean_diff = statistics.mean(float(d.mean()) for d in diffs)
+        max_diff = max(float(d.max()) for d in diffs)
+        failed |= mean_diff > args.tolerance
+        print(f"{name:<22}{p50:>10.2f}{p95:>10.2f}{peak:>10.0f}{baseline / p50:>9.2f}x"
+              f"{mean_diff:>12.4f}{max_diff:>10.3f}")
+    if failed:
+        raise SystemExit(f"Mean difference above tolerance {args.tolerance}")
+
+
+if __name__ == "__main__":
+    main()
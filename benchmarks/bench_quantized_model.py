@@ -0,0 +1,111 @@
+"""
+FP32 classifier against its INT8 export over tests/sample_inputs: file size,
+session load time, single-image latency, accuracy (labels taken from the
+genuine/fake/suspicious folder names) and how often the two models agree.
+
+Images go through the serving path: decoded as DecodedImage and turned into
+the classifier input by the Preprocessor configured in config.json.
+
+Produce the INT8 model first:
+    python image_classifier.py --quantize-only --quantize static
+
+Usage (from the repository root):
+    python -m benchmarks.bench_quantized_model --repeat 5
+"""
+import argparse
+import glob
+import json
+import os
+import statistics
+import time
+
+import numpy as np
+import onnxruntime as ort
+
+from image_context import DecodedImage
+from preprocessing import Preprocessor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(ROOT, "tests", "sample_inputs")
+MODEL_PATH = os.path.join(ROOT, "model", "image_model.onnx")
+QUANTIZED_MODEL_PATH = os.path.join(ROOT, "model", "image_model.int8.onnx")
+CLASS_NAMES = ["genuine", "fake", "suspicious"]
+
+
+def load_samples(sample_dir, preprocessor):
+    samples = []
+    for label in CLASS_NAMES:
+        for path in sorted(glob.glob(os.path.join(sample_dir, label, "*"))):
+            if path.lower().endswith((".jpg", ".jpeg", ".png")):
+                with open(path, "rb") as f:
+                    decoded = DecodedImage.from_bytes(f.read())
+                samples.append((preprocessor(decoded.pil)[np.newaxis], CLASS_NAMES.index(label)))
+    return samples
+
+
+def measure(path, samples, repeat, loads):
+    load_times = []
+    for _ in range(loads):
+        start = time.perf_counter()
+        session = ort.InferenceSession(path, providers=["CPUExecutionProvider"])
+        load_times.append((time.perf_counter() - start) * 1000)
+    input_name = session.get_inputs()[0].name
+
+    session.run(None, {input_name: samples[0][0]})  # warmup
+    latencies = []
+    predictions = []
+    for _ in range(repeat):
+        predictions = []
+        for tensor, _ in samples:
+            start = time.perf_counter()
+            scores = session.run(None, {input_name: tensor})[0]
+            latencies.append((time.perf_counter() - start) * 1000)
+            predictions.append(int(scores[0].argmax()))
+    latencies.sort()
+    correct = sum(pred == label for pred, (_, label) in zip(predictions, samples))
+    return {
+        "size_mb": os.path.getsize(path) / 2**20,
+        "load_ms": statistics.mean(load_times),
+        "p50_ms": latencies[len(latencies) // 2],
+        "p95_ms": latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))],
+        "accuracy": correct / len(samples) * 100,
+        "predictions": predictions,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fp32", default=MODEL_PATH)
+    parser.add_argument("--int8", default=QUANTIZED_MODEL_PATH)
+    parser.add_argument("--config", default=os.path.join(ROOT, "config.json"),
+                        help="config.json whose preprocessing settings the server uses")
+    parser.add_argument("--samples", default=SAMPLE_DIR)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--loads", type=int, default=3)
+    args = parser.parse_args()
+
+    for path in (args.fp32, args.int8):
+        if not os.path.exists(path):
+            raise SystemExit(f"Model not found: {path}")
+    with open(args.config, "r") as f:
+        preprocessor = Preprocessor.from_config(json.load(f))
+    samples = load_samples(args.samples, preprocessor)
+    if not samples:
+        raise SystemExit(f"No sample images found under {args.samples}")
+
+    results = {"fp32": measure(args.fp32, samples, args.repeat, args.loads),
+               "int8": measure(args.int8, samples, args.repeat, args.loads)}
+
+    print(f"Images: {len(samples)}, passes: {args.repeat}")
+    print(f"{'model':<8}{'size MB':>10}{'load ms':>10}{'p50 ms':>10}{'p95 ms':>10}{'accuracy %':>12}")
+    for name, r in results.items():
+        print(f"{name:<8}{r['size_mb']:>10.1f}{r['load_ms']:>10.1f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+              f"{r['accuracy']:>12.1f}")
+    fp32, int8 = results["fp32"], results["int8"]
+    agree = sum(a == b for a, b in zip(fp32["predictions"], int8["predictions"]))
+    print(f"Size: {fp32['size_mb'] / int8['size_mb']:.1f}x smaller, latency: {fp32['p50_ms'] / int8['p50_ms']:.2f}x, "
+          f"same prediction on {agree}/{len(samples)} images")
+
+
+if __name__ == "__main__":
+    main()
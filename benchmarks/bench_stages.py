@@ -0,0 +1,248 @@
+"""
+Per-function latency of the validation stages over tests/sample_inputs
+(genuine, fake and suspicious), each measured in isolation:
+
+    preprocess_image, classify_image_onnx  pipeline.py (importing it loads the model)
+    detect_face, validate_id_card          ocr_validator, set up as pipeline.py does
+    match_template                         template_matcher.matcher
+    decide_label                           decision, over a grid of stage outcomes
+
+Every stage gets --warmup untimed passes over the inputs, then --repeat timed
+passes. Inputs are rebuilt before each call (outside the timing), so cached
+grey and downscaled variants of a DecodedImage never carry over between calls.
+Reports p50/p95/p99 and single-thread throughput per stage.
+
+--save writes the results to the baseline file. Without it, a run is compared
+with the baseline when one exists: a stage whose p50 or p95 is more than
+--tolerance slower is flagged, and the script exits with status 1.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_stages --repeat 5 --save
+    python -m benchmarks.bench_stages --repeat 5 --tolerance 0.2
+"""
+import argparse
+import datetime
+import json
+import logging
+import math
+import os
+import platform
+import time
+
+from PIL import Image
+
+from image_context import DecodedImage
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SAMPLE_DIR = os.path.join(ROOT, "tests", "sample_inputs")
+CLASS_FOLDERS = ("genuine", "fake", "suspicious")
+DEFAULT_BASELINE = os.path.join(ROOT, "benchmarks", "baselines", "stages.json")
+COMPARED = ("p50_ms", "p95_ms")
+
+
+def load_images(sample_dir, limit):
+    images = []
+    for folder in CLASS_FOLDERS:
+        for name in sorted(os.listdir(os.path.join(sample_dir, folder))):
+            if name.lower().endswith((".jpg", ".jpeg", ".png")):
+                with Image.open(os.path.join(sample_dir, folder, name)) as img:
+                    images.append(img.convert("RGB"))
+    return images[:limit]
+
+
+def load_config():
+    with open(os.path.join(ROOT, "config.json"), "r") as f:
+        return json.load(f)
+
+
+# Each setup returns (func, inputs, prepare): prepare(input) builds the call's
+# arguments untimed, func(*args) is what gets timed
+
+def setup_preprocess(config, images):
+    import pipeline
+    return pipeline.preprocess_image, images, lambda pil_image: (pil_image,)
+
+
+def setup_classifier(config, images):
+    import pipeline
+
+    def classify(pil_image):
+        with pipeline.session_pool.session() as session:
+            return pipeline.classify_image_onnx(pil_image, session, pipeline.class_names)
+    return classify, images, lambda pil_image: (pil_image,)
+
+
+def configure_validator(config):
+    """The ocr_validator globals pipeline.py installs at startup; returns the college matcher."""
+    import ocr_validator
+    from card_layouts import LayoutRegistry
+    from college_matcher import CollegeMatcher
+    from face_detector import FaceDetector
+    from ocr_engine import create_ocr_engine
+    from template_matcher import descriptor_cache_dir
+
+    ocr_validator.set_ocr_engine(create_ocr_engine(config.get("ocr")))
+    ocr_validator.set_layout_registry(LayoutRegistry.from_config(config, base_dir=ROOT, cache_dir=descriptor_cache_dir))
+    ocr_validator.set_face_detector(FaceDetector.from_config(config))
+    with open(os.path.join(ROOT, "approved_colleges.json"), "r") as f:
+        return CollegeMatcher.from_config(config, json.load(f))
+
+
+def setup_detect_face(config, images):
+    import ocr_validator
+    configure_validator(config)
+    return ocr_validator.detect_face, images, lambda pil_image: (DecodedImage(pil_image),)
+
+
+def setup_match_template(config, images):
+    from template_matcher import matcher
+    return matcher.match_template, images, lambda pil_image: (DecodedImage(pil_image).gray,)
+
+
+def setup_validate(config, images):
+    import ocr_validator
+    college_matcher = configure_validator(config)
+    min_fields = config["ocr_min_fields"]
+    return ocr_validator.validate_id_card, images, lambda pil_image: (DecodedImage(pil_image), college_matcher, min_fields)
+
+
+def setup_decide(config, images):
+    from decision import decide_label
+    threshold = config["validation_threshold"]
+    grid = [
+        (score, {"fields_detected": fields, "is_valid": fields >= config["ocr_min_fields"]}, template)
+        for score in (0.3, 0.5, 0.7, 0.9)
+        for fields in range(5)
+        for template in (0.0, 0.2, 0.6)
+    ]
+    return decide_label, grid, lambda case: case + (threshold,)
+
+
+STAGES = {
+    "preprocess_image": setup_preprocess,
+    "classify_image_onnx": setup_classifier,
+    "detect_face": setup_detect_face,
+    "match_template": setup_match_template,
+    "validate_id_card": setup_validate,
+    "decide_label": setup_decide,
+}
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile of an ascending list."""
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def measure(func, inputs, prepare, warmup, repeat):
+    for _ in range(warmup):
+        for item in inputs:
+            func(*prepare(item))
+    latencies = []
+    for _ in range(repeat):
+        for item in inputs:
+            args = prepare(item)
+            start = time.perf_counter()
+            func(*args)
+            latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    ms = [value * 1000 for value in latencies]
+    return {
+        "calls": len(ms),
+        "p50_ms": round(percentile(ms, 50), 4),
+        "p95_ms": round(percentile(ms, 95), 4),
+        "p99_ms": round(percentile(ms, 99), 4),
+        "mean_ms": round(sum(ms) / len(ms), 4),
+        "throughput_per_s": round(len(latencies) / sum(latencies), 1),
+    }
+
+
+def compare(results, baseline, tolerance):
+    """{stage: [(metric, baseline value, current value), ...]} for metrics slower than tolerance allows."""
+    regressions = {}
+    for stage, current in results.items():
+        previous = baseline.get(stage)
+        if not previous or "error" in current or "error" in previous:
+            continue
+        slower = [(metric, previous[metric], current[metric]) for metric in COMPARED
+                  if current[metric] > previous[metric] * (1 + tolerance)]
+        if slower:
+            regressions[stage] = slower
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=SAMPLE_DIR)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--stages", nargs="+", choices=list(STAGES), default=list(STAGES))
+    parser.add_argument("--warmup", type=int, default=1, help="Untimed passes over the inputs")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed passes over the inputs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="Write this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a regression is flagged")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args()
+
+    images = load_images(args.samples, args.limit)
+    if not images:
+        raise SystemExit(f"No sample images found under {args.samples}")
+    config = load_config()
+
+    results = {}
+    for stage in args.stages:
+        try:
+            func, inputs, prepare = STAGES[stage](config, images)
+        except Exception as e:  # missing model, Tesseract or templates: report and move on
+            results[stage] = {"error": f"{type(e).__name__}: {e}"}
+            continue
+        logging.getLogger().setLevel(args.log_level)  # pipeline.py switches logging to INFO on import
+        results[stage] = measure(func, inputs, prepare, args.warmup, args.repeat)
+
+    baseline = None
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline, "r") as f:
+            baseline = json.load(f)["stages"]
+    regressions = compare(results, baseline, args.tolerance) if baseline else {}
+
+    print(f"Images: {len(images)}, warmup passes: {args.warmup}, timed passes: {args.repeat}")
+    header = f"{'stage':<22}{'calls':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'per s':>10}"
+    print(header + (f"{'vs base p50':>13}" if baseline else ""))
+    for stage, r in results.items():
+        if "error" in r:
+            print(f"{stage:<22}  skipped ({r['error']})")
+            continue
+        line = (f"{stage:<22}{r['calls']:>7}{r['p50_ms']:>10.3f}{r['p95_ms']:>10.3f}{r['p99_ms']:>10.3f}"
+                f"{r['throughput_per_s']:>10.1f}")
+        previous = (baseline or {}).get(stage)
+        if previous and "error" not in previous:
+            line += f"{r['p50_ms'] / previous['p50_ms']:>12.2f}x"
+        if stage in regressions:
+            line += "  REGRESSION"
+        print(line)
+
+    if args.save:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, "w") as f:
+            json.dump({
+                "created": datetime.datetime.now().isoformat(timespec="seconds"),
+                "python": platform.python_version(),
+                "machine": platform.platform(),
+                "images": len(images),
+                "warmup": args.warmup,
+                "repeat": args.repeat,
+                "stages": results,
+            }, f, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    elif baseline is None:
+        print(f"No baseline at {args.baseline}; rerun with --save to create one")
+
+    if regressions:
+        for stage, slower in regressions.items():
+            details = ", ".join(f"{metric} {old:.3f} -> {new:.3f}" for metric, old, new in slower)
+            print(f"Regression in {stage}: {details} (tolerance {args.tolerance:.0%})")
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Per-query cost of TemplateMatcher with brute-force matching versus the LSH
+template index, at 10, 100, 1,000 and 10,000 templates, and how often the two
+reach the same decision (matched or not at the threshold, and which template).
+
+The real templates in templates/ and test_template/ come first. Larger sets
+are filled with ORB descriptors from generated_ids/ with a share of their bits
+flipped, so the fillers are distinct cards rather than near-copies of one card
+(which would make the best template a near-tie and any comparison noise).
+Queries are every other image under tests/sample_inputs plus the template
+images themselves, so there are both matches and mismatches to agree on.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_template_index --sizes 10 100 1000 10000
+"""
+import argparse
+import glob
+import logging
+import os
+import time
+
+import cv2
+import numpy as np
+
+from template_matcher import TemplateMatcher
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp")
+
+
+def image_paths(*folders):
+    paths = []
+    for folder in folders:
+        for path in sorted(glob.glob(os.path.join(ROOT, folder, "**", "*"), recursive=True)):
+            if path.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(path)
+    return paths
+
+
+def extract(matcher, path):
+    img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
+    if img is None:
+        return None
+    keypoints, descriptors = matcher.orb.detectAndCompute(cv2.resize(img, matcher.resize_dim), None)
+    if descriptors is None:
+        return None
+    return len(keypoints), descriptors
+
+
+def perturb(descriptors, rng, flip_fraction):
+    """Flip a random fraction of descriptor bits to make a synthetic template."""
+    bits = np.unpackbits(descriptors, axis=1)
+    flips = rng.random(bits.shape) < flip_fraction
+    return np.packbits(bits ^ flips, axis=1)
+
+
+def build_templates(real, fillers, size, rng, flip_fraction):
+    templates = list(real[:size])
+    while len(templates) < size:
+        kp_count, descriptors = fillers[len(templates) % len(fillers)]
+        templates.append((f"filler_{len(templates):05d}", kp_count, perturb(descriptors, rng, flip_fraction)))
+    return templates
+
+
+def time_queries(matcher, queries, threshold, repeat):
+    decisions = []
+    start = time.perf_counter()
+    for _ in range(repeat):
+        decisions = []
+        for query in queries:
+            matched, name, _ = matcher.is_match(query, threshold=threshold, resized=True)
+            decisions.append((matched, name if matched else None))
+    elapsed = time.perf_counter() - start
+    return elapsed / (repeat * len(queries)) * 1000, decisions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--threshold", type=float, default=0.15, help="is_match threshold the decisions use")
+    parser.add_argument("--flip-fraction", type=float, default=0.25)
+    parser.add_argument("--shortlist", type=int, default=5)
+    parser.add_argument("--skip-brute-above", type=int, default=1000,
+                        help="Skip the brute-force run for larger template counts (about 18 ms per template per query)")
+    args = parser.parse_args()
+
+    logging.getLogger("template_matcher").setLevel(logging.WARNING)
+
+    extractor = TemplateMatcher(template_dir=None)
+    template_files = image_paths("templates", "test_template")
+    real = [(os.path.basename(p),) + f for p in template_files if (f := extract(extractor, p))]
+    fillers = [f for f in (extract(extractor, p) for p in image_paths("generated_ids")) if f]
+    query_files = image_paths(os.path.join("tests", "sample_inputs"))[::2] + template_files
+    queries = [cv2.resize(cv2.imread(p, cv2.IMREAD_GRAYSCALE), extractor.resize_dim) for p in query_files]
+    print(f"Real templates: {len(real)}, filler sources: {len(fillers)}, queries: {len(queries)}")
+    print(f"{'templates':>10}{'build s':>10}{'brute ms/q':>12}{'index ms/q':>12}{'speedup':>10}{'agree':>9}")
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        templates = build_templates(real, fillers, size, rng, args.flip_fraction)
+
+        brute = TemplateMatcher(template_dir=None, index_min_templates=float("inf"))
+        brute.set_templates(templates)
+
+        indexed = TemplateMatcher(template_dir=None, index_min_templates=0, shortlist_size=args.shortlist)
+        start = time.perf_counter()
+        indexed.set_templates(templates)
+        build_time = time.perf_counter() - start
+
+        index_ms, index_decisions = time_queries(indexed, queries, args.threshold, args.repeat)
+        if size <= args.skip_brute_above:
+            brute_ms, brute_decisions = time_queries(brute, queries, args.threshold, 1)
+            agree = sum(a == b for a, b in zip(brute_decisions, index_decisions))
+            print(f"{size:>10}{build_time:>10.2f}{brute_ms:>12.1f}{index_ms:>12.1f}"
+                  f"{brute_ms / index_ms:>9.1f}x{f'{agree}/{len(queries)}':>9}")
+        else:
+            print(f"{size:>10}{build_time:>10.2f}{'-':>12}{index_ms:>12.1f}{'-':>10}{'-':>9}")
+
+
+if __name__ == "__main__":
+    main()
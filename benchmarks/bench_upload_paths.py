@@ -0,0 +1,102 @@
+"""
+Compare the per-request cost of the JSON/base64 upload path (/validate-id)
+with the raw binary path (/validate-id/upload), up to the point where the
+image bytes are handed to the decoder.
+
+Usage (from the repository root):
+    python -m benchmarks.bench_upload_paths --repeat 50
+"""
+import argparse
+import base64
+import json
+import os
+import time
+import tracemalloc
+
+from schemas import ValidateIDRequest
+
+SAMPLE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "tests", "sample_inputs")
+CHUNK_SIZE = 64 * 1024  # uvicorn hands the body over in chunks of roughly this size
+
+
+def load_samples(sample_dir, limit=None):
+    paths = []
+    for root, _, files in os.walk(sample_dir):
+        for name in sorted(files):
+            if name.lower().endswith((".jpg", ".jpeg", ".png")):
+                paths.append(os.path.join(root, name))
+    paths = sorted(paths)[:limit]
+    samples = []
+    for path in paths:
+        with open(path, "rb") as f:
+            samples.append(f.read())
+    return samples
+
+
+def json_path(body):
+    """What FastAPI does for /validate-id: parse JSON, validate the model, b64decode."""
+    request = ValidateIDRequest(**json.loads(body))
+    return base64.b64decode(request.image_base64)
+
+
+def raw_path(chunks):
+    """What read_body does for /validate-id/upload: join the streamed chunks once."""
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+
+def to_chunks(data):
+    return [data[i:i + CHUNK_SIZE] for i in range(0, len(data), CHUNK_SIZE)]
+
+
+def measure(func, payloads, repeat):
+    """Mean CPU time (ms) and mean peak traced memory (KB) per call."""
+    cpu = 0.0
+    peak = 0
+    for _ in range(repeat):
+        for payload in payloads:
+            tracemalloc.start()
+            start = time.process_time()
+            func(payload)
+            cpu += time.process_time() - start
+            peak += tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    calls = repeat * len(payloads)
+    return cpu / calls * 1000, peak / calls / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--samples", default=SAMPLE_DIR, help="Folder with sample ID card images")
+    parser.add_argument("--limit", type=int, default=None, help="Use at most this many images")
+    parser.add_argument("--repeat", type=int, default=20, help="Passes over the sample set")
+    args = parser.parse_args()
+
+    images = load_samples(args.samples, args.limit)
+    if not images:
+        raise SystemExit(f"No sample images found under {args.samples}")
+
+    json_bodies = [
+        json.dumps({"user_id": "bench", "image_base64": base64.b64encode(img).decode("ascii")}).encode()
+        for img in images
+    ]
+    raw_bodies = [to_chunks(img) for img in images]
+
+    # Sanity check: both paths hand the decoder identical bytes
+    for body, chunks, img in zip(json_bodies, raw_bodies, images):
+        assert json_path(body) == raw_path(chunks) == img
+
+    raw_size = sum(len(img) for img in images) / len(images) / 1024
+    json_size = sum(len(body) for body in json_bodies) / len(json_bodies) / 1024
+    json_cpu, json_mem = measure(json_path, json_bodies, args.repeat)
+    raw_cpu, raw_mem = measure(raw_path, raw_bodies, args.repeat)
+
+    print(f"Images: {len(images)}, passes: {args.repeat}")
+    print(f"{'path':<10}{'body KB':>12}{'CPU ms/req':>14}{'peak KB/req':>14}")
+    print(f"{'json':<10}{json_size:>12.1f}{json_cpu:>14.3f}{json_mem:>14.1f}")
+    print(f"{'raw':<10}{raw_size:>12.1f}{raw_cpu:>14.3f}{raw_mem:>14.1f}")
+    print(f"Saved per request: {json_cpu - raw_cpu:.3f} ms CPU, {json_mem - raw_mem:.1f} KB peak memory, "
+          f"{json_size - raw_size:.1f} KB on the wire")
+
+
+if __name__ == "__main__":
+    main()
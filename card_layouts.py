@@ -0,0 +1,125 @@
+import json
+import logging
+import os
+
+import cv2
+
+from request_log import detail_logger
+from template_matcher import TemplateMatcher
+
+logger = logging.getLogger(__name__)
+detail = detail_logger(__name__)
+
+BAND_PADDING = 4  # pixels (in layout space) above and left of each text line
+
+
+def field_regions(layout, image_width, image_height):
+    """
+    Text bands of one card layout mapped onto an image of the given size.
+
+    Layout coordinates are in the pixel space of the layout's reference card
+    ("size"); the upload is assumed to show the card full-frame, so they scale
+    linearly to the image.
+
+    Returns:
+        dict: field name -> (x0, y0, x1, y1) in image pixels
+    """
+    ref_width, ref_height = layout["size"]
+    sx = image_width / float(ref_width)
+    sy = image_height / float(ref_height)
+    x, y = layout["text_start"]
+    gap = layout["line_gap"]
+
+    regions = {}
+    for i, field in enumerate(layout["fields"]):
+        top = y + i * gap - BAND_PADDING
+        x0 = max(0, round((x - BAND_PADDING) * sx))
+        y0 = max(0, round(top * sy))
+        x1 = min(image_width, round(ref_width * sx))
+        y1 = min(image_height, round((top + gap) * sy))
+        if x1 > x0 and y1 > y0:
+            regions[field] = (x0, y0, x1, y1)
+    return regions
+
+
+def photo_region(layout, image_width, image_height):
+    """Photo box of the layout as (x0, y0, x1, y1) in image pixels, or None."""
+    if "photo" not in layout:
+        return None
+    ref_width, ref_height = layout["size"]
+    sx = image_width / float(ref_width)
+    sy = image_height / float(ref_height)
+    x, y, w, h = layout["photo"]
+    return (
+        max(0, round(x * sx)),
+        max(0, round(y * sy)),
+        min(image_width, round((x + w) * sx)),
+        min(image_height, round((y + h) * sy)),
+    )
+
+
+class LayoutRegistry:
+    def __init__(self, registry_path, template_dir, min_score=0.15, line_height=48, cache_dir=None):
+        """
+        Card layouts keyed by template file name, plus a matcher that picks the
+        layout of an upload.
+
+        Args:
+            registry_path (str): JSON file of layouts (see card_layouts.json)
+            template_dir (str): Reference card images the layouts were drawn on
+            min_score (float): Template match score needed to trust a layout
+            line_height (int): Height in pixels each text band is scaled to before
+                OCR, so Tesseract sees the same text size whatever the upload resolution
+            cache_dir (str): Descriptor cache folder for the layout matcher
+        """
+        with open(registry_path, "r") as f:
+            self.layouts = json.load(f)
+        self.min_score = min_score
+        self.line_height = line_height
+        self.matcher = TemplateMatcher(template_dir=template_dir, cache_dir=cache_dir)
+        logger.info(f"Loaded {len(self.layouts)} card layouts from {registry_path}")
+
+    @classmethod
+    def from_config(cls, config, base_dir=".", cache_dir=None):
+        """Build the registry from the "layouts" section of config.json, or None if disabled."""
+        settings = config.get("layouts", {})
+        if not settings.get("enabled", False):
+            return None
+        return cls(
+            registry_path=os.path.join(base_dir, settings.get("registry", "card_layouts.json")),
+            template_dir=os.path.join(base_dir, settings.get("template_dir", "templates")),
+            min_score=settings.get("min_score", 0.15),
+            line_height=settings.get("line_height", 48),
+            cache_dir=cache_dir,
+        )
+
+    def find_layout(self, decoded):
+        """
+        Match the upload against the layout templates.
+
+        Returns:
+            tuple: (template name, layout), or (None, None) when no layout is trusted
+        """
+        name, score = self.matcher.match_template(decoded.resized_gray(self.matcher.resize_dim), resized=True)
+        if name in self.layouts and score >= self.min_score:
+            detail.debug("Using card layout %s (match score %.3f)", name, score)
+            return name, self.layouts[name]
+        return None, None
+
+    def field_crops(self, decoded, layout):
+        """
+        Crop each text band from the RGB image and scale it to line_height.
+
+        Returns:
+            dict: field name -> RGB crop ready for single-line OCR
+        """
+        height, width = decoded.shape[:2]
+        crops = {}
+        for field, (x0, y0, x1, y1) in field_regions(layout, width, height).items():
+            crop = decoded.rgb[y0:y1, x0:x1]
+            scale = self.line_height / float(y1 - y0)
+            if abs(scale - 1.0) > 0.05:
+                interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_CUBIC
+                crop = cv2.resize(crop, None, fx=scale, fy=scale, interpolation=interpolation)
+            crops[field] = crop
+        return crops
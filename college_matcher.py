@@ -0,0 +1,341 @@
+import heapq
+import logging
+from collections import Counter, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Common educational institution keywords
+EDU_KEYWORDS = [
+    "college", "university", "institute", "school",
+    "education", "polytechnic", "academy"
+]
+
+# Words most institution names share: a fuzzy match on these alone says little
+# about which institution it is ("Fake University of Nowhere" is not Anna University)
+GENERIC_WORDS = frozenset(EDU_KEYWORDS + [
+    "of", "the", "and", "for", "in", "at", "engineering", "technology", "science", "sciences",
+    "arts", "commerce", "management", "medical", "campus", "national", "state", "government",
+])
+GENERIC_WEIGHT = 0.25  # per character, against 1.0 for distinctive words
+SHORT_NAME_CHARS = 8  # names with fewer distinctive characters get the stricter threshold
+
+# Characters str.splitlines() breaks on
+LINE_BREAKS = frozenset("\n\r\x0b\x0c\x1c\x1d\x1e\x85\u2028\u2029")
+
+
+class AhoCorasick:
+    def __init__(self, patterns: Iterable[str]):
+        """
+        Multi-pattern automaton: finds every occurrence of every pattern in one
+        left-to-right pass, whatever the number of patterns.
+
+        Args:
+            patterns: Strings to search for; match ids are their positions
+        """
+        self.patterns = list(patterns)
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[int, ...]] = [()]
+
+        own_out: List[List[int]] = [[]]
+        for pattern_id, pattern in enumerate(self.patterns):
+            if not pattern:
+                continue
+            state = 0
+            for ch in pattern:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    own_out.append([])
+                    self._out.append(())
+                state = nxt
+            own_out[state].append(pattern_id)
+
+        # Breadth-first: failure links, and outputs merged along them
+        queue = deque()
+        for state in self._goto[0].values():
+            self._out[state] = tuple(own_out[state])
+            queue.append(state)
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._out[nxt] = tuple(own_out[nxt]) + self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    def step(self, state: int, ch: str) -> int:
+        goto, fail = self._goto, self._fail
+        while state and ch not in goto[state]:
+            state = fail[state]
+        return goto[state].get(ch, 0)
+
+    def outputs(self, state: int) -> Tuple[int, ...]:
+        return self._out[state]
+
+    def iter_matches(self, text: str):
+        """Yield (end index, pattern id) for every occurrence in text."""
+        state = 0
+        for i, ch in enumerate(text):
+            state = self.step(state, ch)
+            for pattern_id in self._out[state]:
+                yield i, pattern_id
+
+
+class CollegeMatcher:
+    def __init__(self, approved_colleges: List[str], keywords: List[str] = EDU_KEYWORDS,
+                 min_similarity: float = 0.8):
+        """
+        Finds approved college names and institution keywords in OCR text in a
+        single pass, using one automaton built over both lists, with a fuzzy
+        n-gram index behind it for names the OCR misspelled.
+
+        Args:
+            approved_colleges: Approved institution names (matched case-insensitively)
+            keywords: Generic institution words accepted when no approved name is found
+            min_similarity: Similarity a misspelled name needs to count as approved
+        """
+        self.keywords = list(keywords)
+        self.min_similarity = min_similarity
+        self.set_colleges(approved_colleges)
+
+    @classmethod
+    def from_config(cls, config, approved_colleges):
+        """Build the matcher with the "college_match" section of config.json."""
+        settings = config.get("college_match", {})
+        return cls(approved_colleges, min_similarity=settings.get("min_similarity", 0.8))
+
+    def set_colleges(self, approved_colleges: List[str]) -> None:
+        """Replace the approved list and rebuild the automaton and fuzzy index."""
+        self.colleges = list(approved_colleges)
+        patterns = [college.lower() for college in self.colleges] + [k.lower() for k in self.keywords]
+        self._automaton = AhoCorasick(patterns)
+        self.fuzzy = FuzzyCollegeIndex(self.colleges, min_similarity=self.min_similarity)
+        logger.info(f"Built college automaton over {len(self.colleges)} colleges and {len(self.keywords)} keywords")
+
+    def find(self, text: str) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Same rules as before, in one pass over the text:
+        - the approved college that comes first in the approved list, if any appears;
+        - otherwise the first line containing an institution keyword plus more
+          text, trying keywords in list order.
+
+        Returns:
+            tuple: (approved college name or None, institution line or None)
+        """
+        text_lower = text.lower()
+        if len(text_lower) != len(text):
+            text = text_lower  # a few characters lower-case to two; keep offsets aligned
+        automaton = self._automaton
+        college_count = len(self.colleges)
+
+        best_college = None
+        keyword_lines = {}  # keyword pattern id -> first line where it names an institution
+        line_keywords = set()
+        line_start = 0
+        state = 0
+        for i, ch in enumerate(text_lower):
+            if ch in LINE_BREAKS:
+                if line_keywords:
+                    self._close_line(text, text_lower, line_start, i, line_keywords, keyword_lines)
+                    line_keywords = set()
+                line_start = i + 1
+                state = 0
+                continue
+
+            state = automaton.step(state, ch)
+            for pattern_id in automaton.outputs(state):
+                if pattern_id < college_count:
+                    if best_college is None or pattern_id < best_college:
+                        best_college = pattern_id
+                else:
+                    line_keywords.add(pattern_id)
+
+        if best_college is not None:
+            return self.colleges[best_college], None
+        if line_keywords:
+            self._close_line(text, text_lower, line_start, len(text_lower), line_keywords, keyword_lines)
+        if keyword_lines:
+            return None, keyword_lines[min(keyword_lines)]
+        return None, None
+
+    def closest(self, text: str) -> Tuple[Optional[str], float]:
+        """Approved college the text names, allowing OCR errors: (name, similarity) or (None, 0.0)."""
+        return self.fuzzy.lookup(text)
+
+    def _close_line(self, text, text_lower, start, end, line_keywords, keyword_lines):
+        """Record the line for each keyword it contains with some other text beside it."""
+        length = len(text_lower[start:end].strip())
+        for pattern_id in line_keywords:
+            if pattern_id not in keyword_lines and length > len(self._automaton.patterns[pattern_id]):
+                keyword_lines[pattern_id] = text[start:end].strip()
+
+
+def normalize_name(text: str) -> str:
+    """Lower-case, punctuation to spaces, whitespace collapsed."""
+    return " ".join("".join(ch if ch.isalnum() else " " for ch in text.lower()).split())
+
+
+def ngrams(text: str, n: int = 3) -> set:
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def substring_distance(pattern: str, text: str) -> int:
+    """
+    Smallest edit distance between pattern and any substring of text, so a college
+    name still scores well when the OCR line carries extra words around it.
+
+    Myers' bit-parallel algorithm: one column of the edit-distance table is held
+    as bit vectors in Python ints, so each text character costs a handful of
+    integer operations whatever the pattern length.
+    """
+    m = len(pattern)
+    if m == 0:
+        return 0
+    peq: Dict[str, int] = {}
+    for i, ch in enumerate(pattern):
+        peq[ch] = peq.get(ch, 0) | (1 << i)
+    mask = (1 << m) - 1
+    high = 1 << (m - 1)
+
+    pv, mv = mask, 0  # vertical +1 / -1 deltas
+    score = best = m
+    for ch in text:
+        eq = peq.get(ch, 0)
+        xv = eq | mv
+        xh = (((eq & pv) + pv) ^ pv) | eq
+        ph = mv | (~(xh | pv) & mask)
+        mh = pv & xh
+        if ph & high:
+            score += 1
+        elif mh & high:
+            score -= 1
+        # No carry into row 0: a match may start anywhere in text
+        ph = (ph << 1) & mask
+        mh = (mh << 1) & mask
+        pv = mh | (~(xv | ph) & mask)
+        mv = ph & xv
+        if score < best:
+            best = score
+    return best
+
+
+def name_weights(name: str) -> List[Tuple[str, float]]:
+    """(word, weight per character) for a normalized name; generic words count GENERIC_WEIGHT."""
+    return [(word, GENERIC_WEIGHT if word in GENERIC_WORDS else 1.0) for word in name.split()]
+
+
+def weighted_similarity(weights: List[Tuple[str, float]], line: str) -> float:
+    """
+    Similarity of a name to a line, word by word: each word scores
+    1 - substring distance / length, weighted by its length and weight, so a
+    misread or missing distinctive word costs more than a generic one.
+    """
+    total = scored = 0.0
+    for word, weight in weights:
+        distance = min(substring_distance(word, line), len(word))
+        total += weight * len(word)
+        scored += weight * (len(word) - distance)
+    return scored / total if total else 0.0
+
+
+class FuzzyCollegeIndex:
+    def __init__(self, colleges: List[str], min_similarity: float = 0.8, n: int = 3,
+                 max_candidates: int = 8, max_postings: int = 1000):
+        """
+        Trigram inverted index over the approved names for lookups that survive OCR
+        errors ("Instltute of Technologv").
+
+        Candidates come from counting shared n-grams per OCR line, then only the few
+        that can still reach min_similarity are verified by edit distance: each edit
+        destroys at most n of a name's n-grams, so a name within k edits keeps all
+        but n * k of them.
+
+        A verified name needs both most of it to align with the line (edit
+        distance) and its distinctive words to be there (weighted_similarity, with
+        generic words like "University" or "of" counting less). Names with fewer
+        than SHORT_NAME_CHARS distinctive characters ("Anna University") need the
+        word score to reach halfway between min_similarity and 1.
+
+        Args:
+            colleges: Approved institution names
+            min_similarity: 1 - edit distance / name length needed to accept a name
+            n: n-gram length
+            max_candidates: Most names verified by edit distance per lookup
+            max_postings: n-grams shared by more names than this ("col", "uni" in a
+                large list) are left out of candidate counting to keep it cheap
+        """
+        self.colleges = list(colleges)
+        self.min_similarity = min_similarity
+        self.n = n
+        self.max_candidates = max_candidates
+
+        self._names = [normalize_name(college) for college in self.colleges]
+        postings: Dict[str, List[int]] = {}
+        for college_id, name in enumerate(self._names):
+            for gram in ngrams(name, n):
+                postings.setdefault(gram, []).append(college_id)
+        self._postings = {gram: ids for gram, ids in postings.items() if len(ids) <= max_postings}
+
+        # Shared n-grams a name needs (over the grams that are still indexed) to be
+        # within the edit budget min_similarity allows
+        self._indexed = []
+        self._min_shared = []
+        for name in self._names:
+            indexed = sum(1 for gram in ngrams(name, n) if gram in self._postings)
+            budget = int((1.0 - min_similarity) * len(name))
+            self._indexed.append(indexed)
+            self._min_shared.append(max(1, indexed - n * budget))
+
+        self._weights = [name_weights(name) for name in self._names]
+        strict = 1.0 - (1.0 - min_similarity) / 2
+        self._min_weighted = [
+            strict if sum(len(word) for word, weight in weights if weight == 1.0) < SHORT_NAME_CHARS
+            else min_similarity
+            for weights in self._weights
+        ]
+
+    def lookup(self, text: str) -> Tuple[Optional[str], float]:
+        """
+        Approved name that accounts for the most characters of the text (so
+        "X Campus 2" wins over "X" when both are close enough).
+
+        Returns:
+            tuple: (college name, similarity), or (None, 0.0) when no name reaches
+                min_similarity
+        """
+        candidates = []
+        for line in text.splitlines():
+            line = normalize_name(line)
+            if len(line) < self.n:
+                continue
+            counts = Counter()
+            for gram in ngrams(line, self.n):
+                college_ids = self._postings.get(gram)
+                if college_ids:
+                    counts.update(college_ids)
+            min_shared, indexed = self._min_shared, self._indexed
+            for college_id, shared in counts.items():
+                if shared >= min_shared[college_id]:
+                    candidates.append((shared / indexed[college_id], college_id, line))
+
+        # Names sharing the largest part of their n-grams with a line go first
+        best_name, best_similarity, best_matched = None, 0.0, 0
+        for _, college_id, line in heapq.nlargest(self.max_candidates, candidates):
+            name = self._names[college_id]
+            if len(name) <= best_matched:
+                continue
+            distance = substring_distance(name, line)
+            similarity = 1.0 - distance / len(name)
+            if similarity < self.min_similarity or len(name) - distance <= best_matched:
+                continue
+            if weighted_similarity(self._weights[college_id], line) >= self._min_weighted[college_id]:
+                best_name, best_similarity, best_matched = self.colleges[college_id], similarity, len(name) - distance
+        return best_name, round(best_similarity, 3)
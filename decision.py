@@ -1,7 +1,40 @@
 import json
 import logging
 
+from request_log import annotate, detail_logger
+
 logger = logging.getLogger(__name__)
+detail = detail_logger(__name__)
+
+GENUINE_SCORE = 0.85
+FAKE_SCORE = 0.4
+OCR_FAILED_CONFIDENCE = 0.5
+LOW_OCR_CONFIDENCE = 0.75
+TEMPLATE_FAIL_SCORE = 0.3
+
+# Placeholder passed to decide_label when the cascade skips OCR
+SKIPPED_OCR_RESULT = {"fields_detected": 0, "is_valid": False, "skipped": True}
+
+def ocr_confidence(ocr_result):
+    """Fraction of expected fields found by OCR (college, name, roll/class, face)."""
+    total_possible_fields = 4  # college, name, roll/class, face
+    
+    # Cap fields at 2 for non-college IDs (e.g., certificates)
+    if "certificate" in ocr_result.get("type", "").lower():
+        total_possible_fields = 2  # Only require name and ID fields
+        
+    return ocr_result["fields_detected"] / total_possible_fields
+
+def classifier_settles_label(validation_score):
+    """True when the classifier score alone decides the outcome (always fake below FAKE_SCORE)."""
+    return validation_score < FAKE_SCORE
+
+def template_can_change_label(ocr_result):
+    """
+    The template score only reaches the decision through the fake rule, which also
+    needs OCR to have failed; with usable OCR, template matching cannot change the label.
+    """
+    return ocr_confidence(ocr_result) < OCR_FAILED_CONFIDENCE
 
 def decide_label(validation_score, ocr_result, template_match_score, threshold):
     """
@@ -20,44 +53,29 @@ def decide_label(validation_score, ocr_result, template_match_score, threshold):
         template_match_score: Template matching score (0.0 to 1.0)
         threshold: Minimum threshold for validation
     """
-    logger.info("\n=== Decision Process ===")
-    logger.info(f"Validation score: {validation_score:.3f}")
-    logger.info(f"Template match score: {template_match_score:.3f}")
-    
     # Calculate OCR confidence
-    fields_detected = ocr_result["fields_detected"]
-    total_possible_fields = 4  # college, name, roll/class, face
-    
-    # Cap fields at 2 for non-college IDs (e.g., certificates)
-    if "certificate" in ocr_result.get("type", "").lower():
-        total_possible_fields = 2  # Only require name and ID fields
-        
-    ocr_confidence = fields_detected / total_possible_fields
-    logger.info(f"OCR fields detected: {fields_detected}/{total_possible_fields}")
-    logger.info(f"OCR confidence: {ocr_confidence:.3f}")
+    ocr_conf = ocr_confidence(ocr_result)
     
     # OCR failure = less than 50% fields detected
-    ocr_failed = ocr_confidence < 0.5
+    ocr_failed = ocr_conf < OCR_FAILED_CONFIDENCE
     # Low OCR confidence = less than 75% fields detected
-    low_ocr_confidence = ocr_confidence < 0.75
-    
-    logger.info(f"OCR failed (< 50%): {ocr_failed}")
-    logger.info(f"Low OCR confidence (< 75%): {low_ocr_confidence}")
+    low_ocr_confidence = ocr_conf < LOW_OCR_CONFIDENCE
     
     # Combine scores with adjusted weights
     combined_score = (validation_score * 0.5 + 
-                     ocr_confidence * 0.3 + 
+                     ocr_conf * 0.3 + 
                      template_match_score * 0.2)
-    logger.info(f"Combined score: {combined_score:.3f}")
+    annotate(ocr_confidence=round(ocr_conf, 3), combined_score=round(combined_score, 3))
+    detail.debug("Decision inputs: score=%.3f template=%.3f fields=%s ocr_confidence=%.3f ocr_failed=%s "
+                 "low_ocr_confidence=%s combined=%.3f", validation_score, template_match_score,
+                 ocr_result["fields_detected"], ocr_conf, ocr_failed, low_ocr_confidence, combined_score)
 
     # Decision logic with relaxed thresholds
-    if validation_score > 0.85 and ocr_confidence >= 0.75:
-        logger.info("Decision: GENUINE (high validation score and good OCR)")
+    if validation_score > GENUINE_SCORE and ocr_conf >= LOW_OCR_CONFIDENCE:
         return "genuine", "approved", "High confidence in validation and OCR"
-    elif validation_score < 0.4 or (ocr_failed and template_match_score < 0.3):
-        logger.info(f"Decision: FAKE (very low scores or multiple failures)")
-        logger.info(f"Reason: score < 0.4 = {validation_score < 0.4}, OCR failed = {ocr_failed}, template_match < 0.3 = {template_match_score < 0.3}")
+    elif validation_score < FAKE_SCORE or (ocr_failed and template_match_score < TEMPLATE_FAIL_SCORE):
+        detail.debug("Fake because: score < 0.4 = %s, OCR failed = %s, template_match < 0.3 = %s",
+                     validation_score < FAKE_SCORE, ocr_failed, template_match_score < TEMPLATE_FAIL_SCORE)
         return "fake", "rejected", "Very low confidence scores or multiple validation failures"
     else:
-        logger.info("Decision: SUSPICIOUS (medium confidence or mixed results)")
         return "suspicious", "manual_review", "Medium confidence scores or inconsistent validation results"
@@ -0,0 +1,156 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+EXECUTOR_MODES = ("thread", "process")
+
+
+def _timed_call(func, args, kwargs):
+    """Run func inside the worker and report when it actually started/finished.
+
+    time.monotonic() is system-wide on Linux, so timestamps taken in a worker
+    process can be compared with the submission time taken on the event loop.
+    """
+    started = time.monotonic()
+    result = func(*args, **kwargs)
+    return result, started, time.monotonic()
+
+
+class StageExecutor:
+    def __init__(self, mode="thread", max_workers=None, initializer=None):
+        """
+        Runs blocking validation stages (ONNX, Tesseract, ORB) off the event loop.
+
+        Args:
+            mode (str): "thread" or "process". Process mode needs picklable,
+                module-level stage functions and arguments.
+            max_workers (int): Pool size. Defaults to the number of CPUs.
+            initializer (callable): Run once in every worker thread as it starts,
+                for per-thread state such as Tesseract APIs (thread mode only;
+                process workers set themselves up when they import the stages)
+        """
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode '{mode}', expected one of {EXECUTOR_MODES}")
+
+        self.mode = mode
+        self.max_workers = max_workers or os.cpu_count() or 1
+        if mode == "process":
+            self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage",
+                                            initializer=initializer)
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._stages = {}
+        self._observers = []
+        logger.info(f"Stage executor started: mode={self.mode}, max_workers={self.max_workers}")
+
+    @classmethod
+    def from_config(cls, config, initializer=None):
+        """Build an executor from the "executor" section of config.json."""
+        settings = config.get("executor", {})
+        return cls(mode=settings.get("mode", "thread"), max_workers=settings.get("max_workers"),
+                   initializer=initializer)
+
+    def start_workers(self):
+        """
+        Start every worker thread now, so the initializer runs at startup rather
+        than in front of the first requests (threads are otherwise started lazily).
+        """
+        if self.mode != "thread":
+            return
+        started = threading.Barrier(self.max_workers)
+        for future in [self._pool.submit(started.wait) for _ in range(self.max_workers)]:
+            future.result()
+
+    async def run(self, stage, func, *args, **kwargs):
+        """
+        Run func(*args, **kwargs) in the pool and await its result.
+
+        Args:
+            stage (str): Stage name used for the wait/run time statistics
+            func (callable): Blocking function to execute
+
+        Returns:
+            Whatever func returns. Exceptions raised by func propagate.
+        """
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        with self._lock:
+            self._in_flight += 1
+        try:
+            call = functools.partial(_timed_call, func, args, kwargs)
+            if self.mode == "thread":
+                # Carry the caller's context variables (the request log) into the worker thread
+                call = functools.partial(contextvars.copy_context().run, call)
+            result, started, finished = await loop.run_in_executor(self._pool, call)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+        self._record(stage, started - submitted, finished - started)
+        return result
+
+    def add_observer(self, observer):
+        """Call observer(stage, wait_seconds, run_seconds) after every completed stage."""
+        self._observers.append(observer)
+
+    def _record(self, stage, wait, run):
+        for observer in self._observers:
+            observer(stage, wait, run)
+        with self._lock:
+            self._completed += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            entry = self._stages.setdefault(stage, {"count": 0, "wait": 0.0, "run": 0.0})
+            entry["count"] += 1
+            entry["wait"] += wait
+            entry["run"] += run
+
+    @property
+    def queue_depth(self):
+        """Number of submitted stages still waiting for a free worker."""
+        with self._lock:
+            return max(0, self._in_flight - self.max_workers)
+
+    def stats(self):
+        """Snapshot of queue depth and wait/run times, in milliseconds."""
+        with self._lock:
+            stages = {
+                name: {
+                    "count": entry["count"],
+                    "avg_wait_ms": round(entry["wait"] / entry["count"] * 1000, 3),
+                    "avg_run_ms": round(entry["run"] / entry["count"] * 1000, 3),
+                }
+                for name, entry in self._stages.items()
+            }
+            return {
+                "mode": self.mode,
+                "max_workers": self.max_workers,
+                "in_flight": self._in_flight,
+                "queue_depth": max(0, self._in_flight - self.max_workers),
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": round(self._total_wait / self._completed * 1000, 3) if self._completed else 0.0,
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+                "stages": stages,
+            }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
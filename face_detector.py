@@ -0,0 +1,124 @@
+import logging
+import threading
+
+import cv2
+
+from card_layouts import photo_region
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CASCADE = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+
+
+class FaceDetector:
+    def __init__(self, cascade_path=DEFAULT_CASCADE, max_side=640, scale_factor=1.1, min_neighbors=5,
+                 min_face_ratio=0.08, max_face_ratio=0.9, use_layout=True, photo_margin=0.15):
+        """
+        Haar-cascade face detection on a bounded-size copy of the upload.
+
+        The cascade cost grows with the pixel count and the number of pyramid
+        scales it walks, so a 12 MP phone photo is searched at max_side pixels
+        instead, only for face sizes a card photo can have, and (when the card
+        layout is known) only around the layout's photo box. Boxes are returned
+        in the coordinates of the original upload.
+
+        Args:
+            cascade_path (str): OpenCV cascade XML
+            max_side (int): Longest side of the image the cascade runs on
+            scale_factor (float): detectMultiScale pyramid step
+            min_neighbors (int): detectMultiScale neighbour threshold
+            min_face_ratio (float): Smallest face side as a fraction of the card's shorter side
+            max_face_ratio (float): Largest face side as a fraction of the card's shorter side
+            use_layout (bool): Search the layout photo region first when a layout is given
+            photo_margin (float): Padding around the photo box, as a fraction of its size
+        """
+        self.cascade_path = cascade_path
+        self.max_side = max_side
+        self.scale_factor = scale_factor
+        self.min_neighbors = min_neighbors
+        self.min_face_ratio = min_face_ratio
+        self.max_face_ratio = max_face_ratio
+        self.use_layout = use_layout
+        self.photo_margin = photo_margin
+        # CascadeClassifier keeps per-call scratch state and is not safe to share
+        # between threads, so each executor thread loads its own copy
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the detector from the "face_detection" section of config.json."""
+        settings = config.get("face_detection", {})
+        return cls(
+            cascade_path=settings.get("cascade_path", DEFAULT_CASCADE),
+            max_side=settings.get("max_side", 640),
+            scale_factor=settings.get("scale_factor", 1.1),
+            min_neighbors=settings.get("min_neighbors", 5),
+            min_face_ratio=settings.get("min_face_ratio", 0.08),
+            max_face_ratio=settings.get("max_face_ratio", 0.9),
+            use_layout=settings.get("use_layout", True),
+            photo_margin=settings.get("photo_margin", 0.15),
+        )
+
+    @property
+    def cascade(self):
+        cascade = getattr(self._local, "cascade", None)
+        if cascade is None:
+            cascade = cv2.CascadeClassifier(self.cascade_path)
+            if cascade.empty():
+                raise RuntimeError(f"Cannot load face cascade from {self.cascade_path}")
+            self._local.cascade = cascade
+        return cascade
+
+    def detect(self, decoded, layout=None):
+        """
+        Find faces in a DecodedImage.
+
+        Args:
+            decoded (DecodedImage): The upload
+            layout (dict): Card layout of the upload, if recognised (see card_layouts.json)
+
+        Returns:
+            list: (x, y, w, h) boxes in original image pixels
+        """
+        height, width = decoded.shape[:2]
+        small, scale = decoded.downscaled(self.max_side)
+        small_height, small_width = small.shape[:2]
+        card_side = min(small_width, small_height)
+        min_size = max(1, int(card_side * self.min_face_ratio))
+        max_size = max(min_size, int(card_side * self.max_face_ratio))
+
+        regions = []
+        if self.use_layout and layout is not None:
+            box = photo_region(layout, width, height)
+            if box is not None:
+                regions.append(self._padded(box, scale, small_width, small_height))
+        regions.append((0, 0, small_width, small_height))  # whole card, if the photo box finds nothing
+
+        for x0, y0, x1, y1 in regions:
+            if x1 - x0 < min_size or y1 - y0 < min_size:
+                continue
+            faces = self.cascade.detectMultiScale(
+                small[y0:y1, x0:x1],
+                scaleFactor=self.scale_factor,
+                minNeighbors=self.min_neighbors,
+                minSize=(min_size, min_size),
+                maxSize=(max_size, max_size),
+            )
+            if len(faces) > 0:
+                return [
+                    (round((x + x0) * scale), round((y + y0) * scale), round(w * scale), round(h * scale))
+                    for x, y, w, h in faces
+                ]
+        return []
+
+    def _padded(self, box, scale, small_width, small_height):
+        """Photo box in downscaled pixels, grown by photo_margin on each side."""
+        x0, y0, x1, y1 = (v / scale for v in box)
+        pad_x = (x1 - x0) * self.photo_margin
+        pad_y = (y1 - y0) * self.photo_margin
+        return (
+            max(0, int(x0 - pad_x)),
+            max(0, int(y0 - pad_y)),
+            min(small_width, int(round(x1 + pad_x))),
+            min(small_height, int(round(y1 + pad_y))),
+        )
@@ -213,6 +213,8 @@ import numpy as np
 from PIL import Image
 import onnx
 import onnxruntime as ort
+from onnxruntime.quantization import CalibrationDataReader, QuantFormat, QuantType, quantize_dynamic, quantize_static
+from onnxruntime.quantization.shape_inference import quant_pre_process
 import torch
 import torch.nn as nn
 import torch.optim as optim
@@ -223,8 +225,16 @@ import torchvision.transforms as transforms
 IMAGE_SIZE = (224, 224)
 BATCH_SIZE = 16
 MODEL_PATH = "model/image_model.onnx"
+QUANTIZED_MODEL_PATH = "model/image_model.int8.onnx"
 DATA_DIR = "generated_ids/"
 
+# Inference-time preprocessing (no augmentation)
+EVAL_TRANSFORM = transforms.Compose([
+    transforms.Resize(IMAGE_SIZE),
+    transforms.ToTensor(),
+    transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
+])
+
 class IDCardDataset(Dataset):
     def __init__(self, data_dir, transform=None):
         self.data_dir = data_dir
@@ -410,6 +420,58 @@ def train_and_save_model():
                                         'output': {0: 'batch_size'}})
             print(f"New best model saved in ONNX format to {MODEL_PATH}")
 
+class IDCardCalibrationReader(CalibrationDataReader):
+    """Feeds generated_ids/ images, one at a time, to static INT8 calibration."""
+
+    def __init__(self, data_dir, input_name, max_images=100):
+        dataset = IDCardDataset(data_dir, transform=EVAL_TRANSFORM)
+        step = max(1, len(dataset) // max_images)  # spread the sample over all classes
+        self.dataset = dataset
+        self.input_name = input_name
+        self.indices = iter(range(0, len(dataset), step)[:max_images])
+
+    def get_next(self):
+        idx = next(self.indices, None)
+        if idx is None:
+            return None
+        img_tensor, _ = self.dataset[idx]
+        return {self.input_name: img_tensor.unsqueeze(0).numpy().astype(np.float32)}
+
+def quantize_model(mode="static", fp32_path=MODEL_PATH, int8_path=QUANTIZED_MODEL_PATH,
+                   calibration_dir=DATA_DIR, max_calibration_images=100):
+    """
+    Write an INT8 copy of the exported FP32 model.
+
+    "dynamic" stores weights as INT8 and quantizes activations on the fly; only
+    MatMul/Gemm layers are converted, which covers the 128*28*28 x 128 Linear
+    layer holding most of the parameters. "static" also converts the
+    convolutions, with activation ranges calibrated on calibration_dir
+    (QDQ format, per-channel weights).
+    """
+    os.makedirs(os.path.dirname(int8_path), exist_ok=True)
+    if mode == "dynamic":
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    elif mode == "static":
+        prepared_path = int8_path + ".prep.onnx"
+        quant_pre_process(fp32_path, prepared_path)  # shape inference + graph cleanup before calibration
+        input_name = onnx.load(prepared_path).graph.input[0].name
+        reader = IDCardCalibrationReader(calibration_dir, input_name, max_images=max_calibration_images)
+        try:
+            quantize_static(prepared_path, int8_path, reader,
+                            quant_format=QuantFormat.QDQ,
+                            activation_type=QuantType.QUInt8,
+                            weight_type=QuantType.QInt8,
+                            per_channel=True)
+        finally:
+            os.remove(prepared_path)
+    else:
+        raise ValueError(f"Unknown quantization mode '{mode}' (expected 'static' or 'dynamic')")
+
+    fp32_mb = os.path.getsize(fp32_path) / 2**20
+    int8_mb = os.path.getsize(int8_path) / 2**20
+    print(f"INT8 ({mode}) model saved to {int8_path}: {int8_mb:.1f} MB (FP32 {fp32_mb:.1f} MB)")
+    return int8_path
+
 def load_trained_model():
     return ort.InferenceSession(MODEL_PATH)
 
@@ -423,12 +485,7 @@ def classify_image(pil_image, model, class_names):
         label: predicted class label (str)
         confidence: prediction confidence (float)
     """
-    transform = transforms.Compose([
-        transforms.Resize(IMAGE_SIZE),
-        transforms.ToTensor(),
-        transforms.Normalize(mean=[0.485, 0.456, 0.406], std=[0.229, 0.224, 0.225])
-    ])
-    img_tensor = transform(pil_image).unsqueeze(0).numpy()
+    img_tensor = EVAL_TRANSFORM(pil_image).unsqueeze(0).numpy()
     
     input_name = model.get_inputs()[0].name
     output_name = model.get_outputs()[0].name
@@ -441,5 +498,16 @@ def classify_image(pil_image, model, class_names):
     return label, confidence
 
 if __name__ == "__main__":
-    print("Starting training...")
-    train_and_save_model()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Train the ID card classifier and export it to ONNX")
+    parser.add_argument("--quantize", choices=["static", "dynamic", "none"], default="static",
+                        help="INT8 export written next to the FP32 model (default: static, calibrated on generated_ids/)")
+    parser.add_argument("--quantize-only", action="store_true", help="Skip training; quantize the existing FP32 export")
+    args = parser.parse_args()
+
+    if not args.quantize_only:
+        print("Starting training...")
+        train_and_save_model()
+    if args.quantize != "none":
+        quantize_model(args.quantize)
@@ -0,0 +1,141 @@
+import io
+import logging
+import threading
+
+import cv2
+import numpy as np
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+
+class DecodedImage:
+    def __init__(self, pil_image):
+        """
+        One decoded upload shared by every validation stage.
+
+        The JPEG/PNG is decoded exactly once; grayscale and resized variants are
+        derived lazily from the RGB pixels and cached, so the classifier, OCR,
+        face detection and template matching never decode or convert twice.
+
+        Args:
+            pil_image (PIL.Image.Image): Decoded image, converted to RGB if needed
+        """
+        if pil_image.mode != "RGB":
+            pil_image = pil_image.convert("RGB")
+        self._pil = pil_image
+        self.rgb = np.asarray(pil_image)  # HxWx3 uint8, read-only view for the stages
+        self._gray = None
+        self._variants = {}
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_bytes(cls, image_bytes):
+        """
+        Decode raw upload bytes, turned upright by their EXIF orientation as
+        cv2.imdecode does (phone photos are often stored sideways). Raises
+        ValueError if they are not an image.
+        """
+        try:
+            pil_image = Image.open(io.BytesIO(image_bytes))
+            pil_image.load()
+        except Exception as e:
+            raise ValueError(f"Invalid image data - cannot decode: {e}")
+        try:
+            pil_image = ImageOps.exif_transpose(pil_image)
+        except Exception as e:  # unreadable EXIF: keep the pixels as stored
+            logger.debug(f"Ignoring EXIF orientation: {e}")
+        return cls(pil_image)
+
+    @property
+    def pil(self):
+        """PIL view of the RGB pixels (rebuilt on first use after pickling)."""
+        if self._pil is None:
+            with self._lock:
+                if self._pil is None:
+                    self._pil = Image.fromarray(self.rgb)
+        return self._pil
+
+    @property
+    def shape(self):
+        return self.rgb.shape
+
+    @property
+    def gray(self):
+        """Single-channel uint8 image, computed on first use."""
+        if self._gray is None:
+            with self._lock:
+                if self._gray is None:
+                    self._gray = cv2.cvtColor(self.rgb, cv2.COLOR_RGB2GRAY)
+        return self._gray
+
+    def resized_gray(self, dsize, interpolation=cv2.INTER_LINEAR):
+        """Grayscale image resized to dsize=(width, height), cached per size."""
+        key = ("gray", tuple(dsize), interpolation)
+        return self._variant(key, lambda: cv2.resize(self.gray, tuple(dsize), interpolation=interpolation))
+
+    def downscaled(self, max_side, gray=True):
+        """
+        Image shrunk so its longest side is at most max_side (never upscaled).
+
+        Returns:
+            tuple: (image, scale) where scale maps downscaled coordinates back to
+                the original (original = downscaled * scale)
+        """
+        height, width = self.rgb.shape[:2]
+        scale = max(height, width) / float(max_side)
+        source = self.gray if gray else self.rgb
+        if scale <= 1.0:
+            return source, 1.0
+        key = ("down", int(max_side), gray)
+        dsize = (max(1, round(width / scale)), max(1, round(height / scale)))
+        image = self._variant(key, lambda: cv2.resize(source, dsize, interpolation=cv2.INTER_AREA))
+        return image, scale
+
+    def dhash(self, hash_size=8):
+        """
+        Difference hash of the grayscale image as a hash_size**2-bit int.
+
+        Survives rescaling, re-compression and small re-photographing changes,
+        so near-duplicate uploads land within a few bits of each other.
+        """
+        key = ("dhash", hash_size)
+        return self._variant(key, lambda: self._compute_dhash(hash_size))
+
+    def thumbnail(self, size=32):
+        """size x size grayscale thumbnail, kept with a hash to confirm that two uploads show one card."""
+        return self.resized_gray((size, size), cv2.INTER_AREA)
+
+    def _compute_dhash(self, hash_size):
+        small = cv2.resize(self.gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+        bits = (small[:, 1:] > small[:, :-1]).flatten()
+        return int.from_bytes(np.packbits(bits).tobytes(), "big")
+
+    def _variant(self, key, build):
+        image = self._variants.get(key)
+        if image is None:
+            with self._lock:
+                image = self._variants.get(key)
+                if image is None:
+                    image = build()
+                    self._variants[key] = image
+        return image
+
+    # Locks cannot be pickled; process-mode executors get a fresh one per copy.
+    # The PIL image duplicates the RGB pixels, so only the array is sent.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_pil"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.RLock()
+
+
+def as_decoded(image):
+    """Accept either a DecodedImage or raw image bytes (legacy callers)."""
+    if isinstance(image, DecodedImage):
+        return image
+    return DecodedImage.from_bytes(image)
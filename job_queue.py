@@ -0,0 +1,187 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+JOB_STATUSES = ("queued", "running", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT NOT NULL,
+    status TEXT NOT NULL,
+    image BLOB,
+    callback_url TEXT,
+    callback_result TEXT,
+    result TEXT,
+    error TEXT,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    worker TEXT,
+    lease_until REAL,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_status_created ON jobs (status, created_at);
+"""
+
+PUBLIC_COLUMNS = ("id", "user_id", "status", "attempts", "created_at", "started_at", "finished_at",
+                  "result", "error", "callback_url", "callback_result")
+
+
+class JobQueue:
+    def __init__(self, path, max_attempts=3):
+        """
+        Durable validation job queue in a SQLite file, shared by the API process
+        (submit, get) and the job worker processes (claim, complete, fail).
+
+        A claimed job is leased to one worker until lease_until; the worker keeps
+        renewing the lease while it runs. If the worker or the whole server dies,
+        the lease runs out and the next claim() picks the job up again, so queued
+        and interrupted jobs survive a restart. A job whose lease ran out
+        max_attempts times is failed instead of retried forever.
+
+        Args:
+            path (str): SQLite database file (parent folders are created)
+            max_attempts (int): Claims allowed per job before it is failed
+        """
+        self.path = path
+        self.max_attempts = max(1, int(max_attempts))
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        self._db().executescript(SCHEMA)
+
+    @classmethod
+    def from_config(cls, config, base_dir="."):
+        """Open the queue from the "jobs" section of config.json, or None if the job API is disabled."""
+        settings = config.get("jobs", {})
+        if not settings.get("enabled", False):
+            return None
+        return cls(os.path.join(base_dir, settings.get("path", ".cache/jobs.sqlite3")),
+                   max_attempts=settings.get("max_attempts", 3))
+
+    def _db(self):
+        # sqlite3 connections may not be shared between threads; one per thread
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")  # pollers read while a writer commits
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def _transaction(self):
+        return _Transaction(self._db())
+
+    def submit(self, user_id, image_bytes, callback_url=None):
+        """Store a job and return its id; it is on disk when this returns."""
+        job_id = uuid.uuid4().hex
+        with self._transaction() as db:
+            db.execute(
+                "INSERT INTO jobs (id, user_id, status, image, callback_url, created_at) VALUES (?, ?, 'queued', ?, ?, ?)",
+                (job_id, user_id, sqlite3.Binary(image_bytes), callback_url, time.time()),
+            )
+        return job_id
+
+    def claim(self, worker, lease_seconds):
+        """
+        Lease the oldest queued job (or one whose lease ran out) to worker.
+
+        Returns:
+            dict: id, user_id, image, callback_url and attempts, or None when idle
+        """
+        now = time.time()
+        with self._transaction() as db:
+            # Jobs that keep losing their worker are given up on, not retried again
+            db.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, finished_at = ?, image = NULL, lease_until = NULL "
+                "WHERE status = 'running' AND lease_until < ? AND attempts >= ?",
+                (f"Abandoned after {self.max_attempts} attempts", now, now, self.max_attempts),
+            )
+            row = db.execute(
+                "SELECT id, user_id, image, callback_url, attempts FROM jobs "
+                "WHERE status = 'queued' OR (status = 'running' AND lease_until < ?) "
+                "ORDER BY created_at LIMIT 1",
+                (now,),
+            ).fetchone()
+            if row is None:
+                return None
+            db.execute(
+                "UPDATE jobs SET status = 'running', worker = ?, attempts = attempts + 1, started_at = ?, "
+                "lease_until = ? WHERE id = ?",
+                (worker, now, now + lease_seconds, row["id"]),
+            )
+        job = dict(row)
+        job["image"] = bytes(job["image"])
+        job["attempts"] += 1
+        return job
+
+    def renew(self, worker, lease_seconds):
+        """Extend the leases of every job worker is running; returns how many."""
+        with self._transaction() as db:
+            return db.execute(
+                "UPDATE jobs SET lease_until = ? WHERE worker = ? AND status = 'running'",
+                (time.time() + lease_seconds, worker),
+            ).rowcount
+
+    def complete(self, job_id, result):
+        """Store the result of a finished job and drop its image."""
+        self._finish(job_id, "done", result=json.dumps(result))
+
+    def fail(self, job_id, error):
+        self._finish(job_id, "failed", error=str(error))
+
+    def _finish(self, job_id, status, result=None, error=None):
+        with self._transaction() as db:
+            db.execute(
+                "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ?, image = NULL, lease_until = NULL "
+                "WHERE id = ?",
+                (status, result, error, time.time(), job_id),
+            )
+
+    def set_callback_result(self, job_id, outcome):
+        with self._transaction() as db:
+            db.execute("UPDATE jobs SET callback_result = ? WHERE id = ?", (str(outcome), job_id))
+
+    def get(self, job_id):
+        """Public view of a job (no image), or None if the id is unknown."""
+        row = self._db().execute(f"SELECT {', '.join(PUBLIC_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def purge(self, older_than_seconds):
+        """Delete finished jobs older than the retention period; returns how many."""
+        with self._transaction() as db:
+            return db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND finished_at < ?",
+                (time.time() - older_than_seconds,),
+            ).rowcount
+
+    def stats(self):
+        counts = dict(self._db().execute("SELECT status, COUNT(*) FROM jobs GROUP BY status").fetchall())
+        return {status: counts.get(status, 0) for status in JOB_STATUSES}
+
+
+class _Transaction:
+    """Connection wrapper whose with-block is one IMMEDIATE transaction (the write lock is taken up front)."""
+
+    def __init__(self, db):
+        self.db = db
+
+    def __enter__(self):
+        self.db.execute("BEGIN IMMEDIATE")
+        return self.db
+
+    def __exit__(self, exc_type, exc, tb):
+        self.db.execute("ROLLBACK" if exc_type is not None else "COMMIT")
+        return False
@@ -0,0 +1,241 @@
+import asyncio
+import ipaddress
+import json
+import logging
+import multiprocessing
+import os
+import socket
+import time
+import urllib.request
+from urllib.parse import urlparse
+
+from fastapi import HTTPException
+
+from job_queue import JobQueue
+
+logger = logging.getLogger(__name__)
+
+PURGE_INTERVAL = 60.0  # seconds between retention sweeps of an idle worker
+
+
+def check_callback_url(url, allowed_hosts=()):
+    """
+    Refuse callback URLs that would make the service call into its own network.
+
+    With allowed_hosts, only those host names are accepted. Without, the host must
+    resolve to public addresses only: loopback, private, link-local (cloud metadata
+    at 169.254.169.254), reserved, multicast and unspecified ones are refused.
+    The check resolves the name, so it blocks; run it off the event loop.
+
+    Raises:
+        ValueError: Why the URL is refused
+    """
+    parsed = urlparse(url)
+    if parsed.scheme not in ("http", "https") or not parsed.hostname:
+        raise ValueError("callback_url must be an http or https URL")
+    host = parsed.hostname.lower()
+    if allowed_hosts:
+        if host not in {allowed.lower() for allowed in allowed_hosts}:
+            raise ValueError(f"callback_url host {host} is not in jobs.callback_allowed_hosts")
+        return
+    try:
+        addresses = {info[4][0] for info in socket.getaddrinfo(host, parsed.port or 80, proto=socket.IPPROTO_TCP)}
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"callback_url host {host} does not resolve: {e}")
+    for address in addresses:
+        ip = ipaddress.ip_address(address.split("%", 1)[0])
+        if (ip.is_private or ip.is_loopback or ip.is_link_local or ip.is_reserved
+                or ip.is_multicast or ip.is_unspecified):
+            raise ValueError(f"callback_url host {host} resolves to a non-public address ({ip})")
+
+
+class _NoRedirects(urllib.request.HTTPRedirectHandler):
+    """A redirect would skip check_callback_url: report it as the callback's outcome instead."""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+_callback_opener = urllib.request.build_opener(_NoRedirects)
+
+
+class JobWorkers:
+    def __init__(self, queue_path, max_attempts=3, processes=2, concurrency=2, lease_seconds=60.0,
+                 poll_interval=0.5, retention_hours=24.0, callback_timeout=10.0, callback_allowed_hosts=()):
+        """
+        Worker processes that drain the job queue (job_queue.JobQueue).
+
+        Each process imports pipeline, not the API module, so it loads its own
+        model, executor, batcher and result cache once, and keeps up to
+        concurrency jobs in the pipeline at once. The duplicate index is shared
+        with the API through its SQLite store, so jobs are checked against every
+        upload. The processes are spawned rather than forked: the API process
+        holds ONNX and thread pool state that must not be copied mid-flight.
+
+        Args:
+            queue_path (str): SQLite file of the job queue
+            max_attempts (int): Claims allowed per job (see JobQueue)
+            processes (int): Worker processes to start
+            concurrency (int): Jobs each process runs at the same time
+            lease_seconds (float): How long a claimed job stays with its worker
+                without a renewal; a crashed worker's jobs are retried after this
+            poll_interval (float): Sleep between claims while the queue is empty
+            retention_hours (float): Age at which finished jobs are deleted
+            callback_timeout (float): Timeout of the completion callback POST
+            callback_allowed_hosts (list): Hosts callbacks may go to (see check_callback_url)
+        """
+        self.processes = max(1, int(processes))
+        self.settings = {
+            "queue_path": queue_path,
+            "max_attempts": max_attempts,
+            "concurrency": max(1, int(concurrency)),
+            "lease_seconds": max(1.0, float(lease_seconds)),
+            "poll_interval": max(0.01, float(poll_interval)),
+            "retention_seconds": float(retention_hours) * 3600.0,
+            "callback_timeout": float(callback_timeout),
+            "callback_allowed_hosts": list(callback_allowed_hosts),
+        }
+        self._context = multiprocessing.get_context("spawn")
+        self._stop = None
+        self._workers = []
+
+    @classmethod
+    def from_config(cls, config, queue):
+        """Workers draining queue, from the "jobs" section of config.json; None if disabled or set to 0 workers."""
+        settings = config.get("jobs", {})
+        if not settings.get("enabled", False) or settings.get("workers", 2) <= 0:
+            return None
+        return cls(
+            queue.path,
+            max_attempts=queue.max_attempts,
+            processes=settings.get("workers", 2),
+            concurrency=settings.get("concurrency_per_worker", 2),
+            lease_seconds=settings.get("lease_seconds", 60),
+            poll_interval=settings.get("poll_interval", 0.5),
+            retention_hours=settings.get("retention_hours", 24),
+            callback_timeout=settings.get("callback_timeout", 10),
+            callback_allowed_hosts=settings.get("callback_allowed_hosts", []),
+        )
+
+    def start(self):
+        self._stop = self._context.Event()
+        for index in range(self.processes):
+            # Not daemonic: a worker may start its own process pool (executor mode "process")
+            worker = self._context.Process(target=run_worker, args=(self.settings, self._stop),
+                                           name=f"job-worker-{index}")
+            worker.start()
+            self._workers.append(worker)
+        logger.info(f"Job workers started: processes={self.processes}, "
+                    f"concurrency={self.settings['concurrency']}")
+
+    def stop(self, timeout=30.0):
+        """Let the workers finish their current jobs, then terminate any still running after timeout."""
+        if self._stop is None:
+            return
+        self._stop.set()
+        deadline = time.monotonic() + timeout
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+            if worker.is_alive():
+                logger.warning(f"{worker.name} did not stop in time; its jobs are retried when their lease runs out")
+                worker.terminate()
+        self._workers = []
+
+    def stats(self):
+        return {
+            "processes": self.processes,
+            "alive": sum(worker.is_alive() for worker in self._workers),
+            "concurrency": self.settings["concurrency"],
+        }
+
+
+def run_worker(settings, stop_event):
+    """Entry point of a worker process."""
+    import pipeline  # loads the model and builds the pipeline in this process
+
+    worker_id = f"{socket.gethostname()}-{os.getpid()}"
+    queue = JobQueue(settings["queue_path"], max_attempts=settings["max_attempts"])
+    asyncio.run(_work(pipeline, queue, worker_id, settings, stop_event))
+
+
+async def _work(pipeline, queue, worker_id, settings, stop_event):
+    loop = asyncio.get_running_loop()
+    parent = os.getppid()
+    slots = asyncio.Semaphore(settings["concurrency"])
+    running = set()
+    heartbeat = asyncio.ensure_future(_renew_leases(queue, worker_id, settings["lease_seconds"]))
+    last_purge = 0.0
+    logger.info(f"Job worker {worker_id} started")
+    try:
+        # A worker whose API process died exits too; its leases then run out
+        while not stop_event.is_set() and os.getppid() == parent:
+            await slots.acquire()
+            job = await loop.run_in_executor(None, queue.claim, worker_id, settings["lease_seconds"])
+            if job is None:
+                slots.release()
+                if time.monotonic() - last_purge > PURGE_INTERVAL:
+                    last_purge = time.monotonic()
+                    purged = await loop.run_in_executor(None, queue.purge, settings["retention_seconds"])
+                    if purged:
+                        logger.info(f"Purged {purged} finished jobs")
+                await asyncio.sleep(settings["poll_interval"])
+                continue
+            task = asyncio.ensure_future(_run_job(pipeline, queue, job, settings))
+            running.add(task)
+            task.add_done_callback(running.discard)
+            task.add_done_callback(lambda _: slots.release())
+        if running:
+            await asyncio.gather(*running, return_exceptions=True)
+    finally:
+        heartbeat.cancel()
+        await pipeline.close()
+    logger.info(f"Job worker {worker_id} stopped")
+
+
+async def _renew_leases(queue, worker_id, lease_seconds):
+    loop = asyncio.get_running_loop()
+    while True:
+        await asyncio.sleep(lease_seconds / 3)
+        try:
+            await loop.run_in_executor(None, queue.renew, worker_id, lease_seconds)
+        except Exception as e:
+            logger.warning(f"Could not renew job leases: {e}")
+
+
+async def _run_job(pipeline, queue, job, settings):
+    loop = asyncio.get_running_loop()
+    try:
+        response = await pipeline.serve_validation("/jobs", job["user_id"], job["image"])
+    except HTTPException as e:
+        await loop.run_in_executor(None, queue.fail, job["id"], e.detail)
+    except Exception as e:
+        logger.exception(f"Job {job['id']} failed")
+        await loop.run_in_executor(None, queue.fail, job["id"], e)
+    else:
+        await loop.run_in_executor(None, queue.complete, job["id"], response.model_dump(exclude_none=True))
+    if job["callback_url"]:
+        await loop.run_in_executor(None, _deliver_callback, queue, job["id"], job["callback_url"],
+                                   settings["callback_timeout"], settings["callback_allowed_hosts"])
+
+
+def _deliver_callback(queue, job_id, url, timeout, allowed_hosts=()):
+    """POST the finished job (as GET /jobs/{id} returns it) to its callback URL, once."""
+    # Checked again here: the name may resolve elsewhere than when the job was submitted
+    try:
+        check_callback_url(url, allowed_hosts)
+    except ValueError as e:
+        logger.warning(f"Callback for job {job_id} refused: {e}")
+        queue.set_callback_result(job_id, f"refused: {e}")
+        return
+
+    job = queue.get(job_id)
+    job["job_id"] = job.pop("id")
+    body = json.dumps(job).encode("utf-8")
+    request = urllib.request.Request(url, data=body, method="POST", headers={"Content-Type": "application/json"})
+    try:
+        with _callback_opener.open(request, timeout=timeout) as response:
+            outcome = f"HTTP {response.status}"
+    except Exception as e:
+        logger.warning(f"Callback for job {job_id} to {url} failed: {e}")
+        outcome = f"error: {e}"
+    queue.set_callback_result(job_id, outcome)
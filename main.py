@@ -1,19 +1,21 @@
+import asyncio
 import base64
-import json
-import logging
-from fastapi import FastAPI, HTTPException, BackgroundTasks
-from schemas import ValidateIDRequest, ValidateIDResponse
-import onnxruntime as ort
-from ocr_validator import validate_id_card
-from template_matcher import check_template
-from decision import decide_label
-from PIL import Image
+import functools
 import io
-import numpy as np
 import os
-
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
+import zipfile
+from typing import Optional
+from fastapi import FastAPI, HTTPException, File, UploadFile, Request, Query, Header
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from schemas import (ValidateIDRequest, ValidateIDResponse, BatchValidateIDRequest, ValidateIDError, JobRequest,
+                     JobAccepted, JobStatus)
+import pipeline
+from pipeline import (config, serve_validation, executor, session_pool, batcher, ocr_engine, cascade_skips,
+                      result_cache, duplicate_checker, recorder, INVALID_IMAGE_DETAIL)
+from ocr_validator import field_extractor
+from job_queue import JobQueue
+from job_workers import JobWorkers, check_callback_url
+from metrics import registry as metrics_registry, process_memory, CONTENT_TYPE as METRICS_CONTENT_TYPE
 
 app = FastAPI(title="College ID Validator")
 
@@ -21,83 +23,293 @@ app = FastAPI(title="College ID Validator")
 def read_root():
     return {"message": "🎉 AI ID Card Validator is running!"}
 
-def load_model():
-    try:
-        model_path = os.path.abspath(os.path.join(os.path.dirname(__file__), "model", "image_model.onnx"))
-        session = ort.InferenceSession(model_path)
-        logger.info("✅ ONNX Model loaded successfully")
-        return session
-    except Exception as e:
-        logger.error(f"❌ Error loading ONNX model: {e}")
-        raise RuntimeError(f"❌ Error loading ONNX model: {e}")
-
-def load_json(path):
-    try:
-        with open(os.path.abspath(os.path.join(os.path.dirname(__file__), path)), "r") as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"❌ Error loading {path}: {e}")
-        raise RuntimeError(f"❌ Error loading {path}: {e}")
-
-model_session = load_model()
-config = load_json("config.json")
-approved_colleges = load_json("approved_colleges.json")
-class_names = config.get("class_names", ["genuine", "fake", "suspicious"])
-
-def preprocess_image(pil_image):
-    if pil_image.mode != 'RGB':
-        pil_image = pil_image.convert('RGB')
-    img = pil_image.resize((224, 224), Image.Resampling.LANCZOS)
-    img_array = np.array(img).astype(np.float32) / 255.0
-    mean = np.array([0.485, 0.456, 0.406], dtype=np.float32)
-    std = np.array([0.229, 0.224, 0.225], dtype=np.float32)
-    img_array = (img_array - mean) / std
-    img_array = np.transpose(img_array, (2, 0, 1))
-    img_array = np.expand_dims(img_array, axis=0).astype(np.float32)
-    return img_array
-
-def classify_image_onnx(pil_image, session, class_names):
-    input_name = session.get_inputs()[0].name
-    img_array = preprocess_image(pil_image)
-    outputs = session.run(None, {input_name: img_array})
-    scores = outputs[0][0]
-    exp_scores = np.exp(scores - np.max(scores))
-    probs = exp_scores / exp_scores.sum()
-    pred_idx = np.argmax(probs)
-    return class_names[pred_idx], float(probs[pred_idx])
-
 @app.get("/health")
 async def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "executor": executor.stats(),
+        "onnx": dict(session_pool.stats(), settings=session_pool.report()),
+        "batching": batcher.stats() if batcher is not None else None,
+        "ocr": ocr_engine.stats(),
+        "field_patterns": field_extractor.stats(),  # this process only; process-mode workers count their own
+        "cascade_skips": dict(cascade_skips),
+        "result_cache": result_cache.stats() if result_cache is not None else None,
+        "duplicate_index": duplicate_checker.stats() if duplicate_checker is not None else None,
+        "recording": recorder.stats() if recorder is not None else None,
+        "jobs": dict(job_queue.stats(), workers=job_workers.stats() if job_workers is not None else None)
+        if job_queue is not None else None,
+    }
 
 @app.get("/version")
 async def version():
     return {"version": "1.0.0"}
 
+@app.on_event("shutdown")
+async def shutdown_pipeline():
+    await pipeline.close()
+
+ARCHIVE_IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".webp", ".bmp")
+
+def _cache_lookups():
+    if result_cache is None:
+        return None
+    stats = result_cache.stats()
+    return {("hit",): stats["hits"], ("miss",): stats["misses"], ("coalesced",): stats["coalesced"]}
+
+def _duplicate_events():
+    if duplicate_checker is None:
+        return None
+    return {(event,): duplicate_checker.events[event] for event in ("reused", "flagged")}
+
+# Everything below is read when /metrics is scraped, not on the request path
+metrics_registry.callback("idcard_requests_in_flight", "Validation requests being processed",
+                          lambda: pipeline.requests_in_flight)
+metrics_registry.callback("idcard_executor_in_flight", "Stages submitted to the executor and not yet finished",
+                          lambda: executor.stats()["in_flight"])
+metrics_registry.callback("idcard_executor_queue_depth", "Stages waiting for a free executor worker",
+                          lambda: executor.queue_depth)
+metrics_registry.callback("idcard_batcher_pending", "Images waiting for the next classifier batch",
+                          lambda: batcher.stats()["pending"] if batcher is not None else None)
+metrics_registry.callback("idcard_onnx_sessions_idle", "ONNX sessions not running a batch",
+                          lambda: session_pool.stats()["idle"])
+metrics_registry.callback("idcard_result_cache_lookups_total", "Result cache lookups by outcome", _cache_lookups,
+                          kind="counter", labelnames=("result",))
+metrics_registry.callback("idcard_result_cache_hit_ratio", "Share of result cache lookups answered from the cache",
+                          lambda: result_cache.stats()["hit_rate"] if result_cache is not None else None)
+metrics_registry.callback("idcard_result_cache_entries", "Verdicts held in the result cache",
+                          lambda: result_cache.stats()["entries"] if result_cache is not None else None)
+metrics_registry.callback("idcard_duplicate_events_total", "Re-uploaded cards by outcome", _duplicate_events,
+                          kind="counter", labelnames=("event",))
+metrics_registry.callback("idcard_cascade_skips_total", "Stages skipped by the cascade pipeline",
+                          lambda: {(stage,): count for stage, count in cascade_skips.items()},
+                          kind="counter", labelnames=("stage",))
+metrics_registry.callback("idcard_process_memory_bytes", "Memory of the API process",
+                          lambda: {(kind,): value for kind, value in process_memory().items()},
+                          labelnames=("type",))
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text exposition of request, stage, queue, cache and memory metrics."""
+    return PlainTextResponse(metrics_registry.render(), media_type=METRICS_CONTENT_TYPE)
+
+def _no_cache(cache_control):
+    return cache_control is not None and "no-cache" in cache_control.lower()
+
 @app.post("/validate-id", response_model=ValidateIDResponse, response_model_exclude_none=True)
-async def validate_id(request: ValidateIDRequest, background_tasks: BackgroundTasks):
+async def validate_id(
+    request: ValidateIDRequest,
+    cache_control: Optional[str] = Header(None),
+):
     try:
         image_bytes = base64.b64decode(request.image_base64)
-        pil_image = Image.open(io.BytesIO(image_bytes)).convert("RGB")
     except Exception:
-        raise HTTPException(status_code=400, detail="Invalid base64 image encoding or image data")
+        raise HTTPException(status_code=400, detail=INVALID_IMAGE_DETAIL)
+    return await serve_validation("/validate-id", request.user_id, image_bytes, bypass_cache=_no_cache(cache_control))
+
+async def read_body(request, max_bytes):
+    """
+    Stream the raw request body and join it once into a single bytes object.
+
+    io.BytesIO wraps a bytes object without copying it, so the decoder reads the
+    very buffer built here (a preallocated bytearray would be copied again).
+    """
+    expected = int(request.headers.get("content-length") or 0)
+    if expected > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload larger than {max_bytes} bytes")
+
+    chunks = []
+    size = 0
+    async for chunk in request.stream():
+        size += len(chunk)
+        if size > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload larger than {max_bytes} bytes")
+        chunks.append(chunk)
+    return chunks[0] if len(chunks) == 1 else b"".join(chunks)
+
+@app.post("/validate-id/upload", response_model=ValidateIDResponse, response_model_exclude_none=True)
+async def validate_id_upload(
+    request: Request,
+    user_id: Optional[str] = Query(None),
+    x_user_id: Optional[str] = Header(None),
+    cache_control: Optional[str] = Header(None),
+):
+    """
+    Validate a raw image upload without base64/JSON overhead.
 
+    Accepts either a multipart form (file field "file", optional "user_id" field)
+    or an application/octet-stream body. user_id may also be passed as a query
+    parameter or X-User-Id header.
+    """
+    max_bytes = config.get("max_upload_bytes", 10 * 1024 * 1024)
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Multipart upload needs a 'file' field")
+        image_bytes = await upload.read()
+        if len(image_bytes) > max_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload larger than {max_bytes} bytes")
+        user_id = user_id or x_user_id or form.get("user_id")
+    else:
+        image_bytes = await read_body(request, max_bytes)
+        user_id = user_id or x_user_id
+
+    if not user_id:
+        raise HTTPException(status_code=400, detail="user_id is required (query, X-User-Id header or form field)")
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail=INVALID_IMAGE_DETAIL)
+    return await serve_validation("/validate-id/upload", user_id, image_bytes, bypass_cache=_no_cache(cache_control))
+
+async def _stream_batch(endpoint, items):
+    """
+    Validate (user_id, load_bytes) items in parallel and yield one NDJSON line
+    per item as soon as it finishes (completion order, not submission order).
+    """
+    limit = asyncio.Semaphore(config.get("batch", {}).get("max_concurrency", 8))
+
+    async def run_item(user_id, load_bytes):
+        async with limit:
+            try:
+                image_bytes = load_bytes()
+            except HTTPException as e:
+                return ValidateIDError(user_id=user_id, status_code=e.status_code, error=str(e.detail))
+            except Exception:
+                return ValidateIDError(user_id=user_id, status_code=400, error=INVALID_IMAGE_DETAIL)
+            try:
+                return await serve_validation(endpoint, user_id, image_bytes)
+            except HTTPException as e:
+                return ValidateIDError(user_id=user_id, status_code=e.status_code, error=str(e.detail))
+
+    tasks = [asyncio.ensure_future(run_item(user_id, load_bytes)) for user_id, load_bytes in items]
     try:
-        validation_label, validation_score = classify_image_onnx(pil_image, model_session, class_names)
-        ocr_result = validate_id_card(image_bytes, approved_colleges, config["ocr_min_fields"])
-        template_match = check_template(image_bytes)
-        label, status, reason = decide_label(validation_score, ocr_result, template_match, config["validation_threshold"])
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
-
-    return ValidateIDResponse(
-        user_id=request.user_id,
-        validation_score=validation_score,
-        label=label,
-        status=status,
-        reason=reason,
-        threshold=config["validation_threshold"]
-    )
+        for next_done in asyncio.as_completed(tasks):
+            result = await next_done
+            yield result.model_dump_json(exclude_none=True) + "\n"
+    finally:
+        # Client went away or streaming finished: drop anything still queued
+        for task in tasks:
+            task.cancel()
+
+def _check_batch_size(count):
+    max_items = config.get("batch", {}).get("max_items", 1000)
+    if count > max_items:
+        raise HTTPException(status_code=413, detail=f"Batch has {count} items, limit is {max_items}")
+
+def _check_batch_bytes(total):
+    max_total = config.get("batch", {}).get("max_total_bytes", 100 * 1024 * 1024)
+    if total > max_total:
+        raise HTTPException(status_code=413, detail=f"Batch holds {total} bytes of images, limit is {max_total}")
+
+def _check_item_size(size, max_bytes):
+    if size > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload larger than {max_bytes} bytes")
+
+def _decode_item(image_base64, max_bytes):
+    image_bytes = base64.b64decode(image_base64)
+    _check_item_size(len(image_bytes), max_bytes)
+    return image_bytes
+
+def _read_member(bundle, info, max_bytes):
+    """Read one archive entry, never more than max_bytes + 1 whatever its header claims."""
+    _check_item_size(info.file_size, max_bytes)
+    with bundle.open(info) as member:
+        image_bytes = member.read(max_bytes + 1)
+    _check_item_size(len(image_bytes), max_bytes)
+    return image_bytes
+
+@app.post("/validate-id/batch")
+async def validate_id_batch(request: BatchValidateIDRequest):
+    """
+    Validate many ID cards; streams one ValidateIDResponse (or ValidateIDError) per line.
+    Items over max_upload_bytes fail on their own with status 413.
+    """
+    _check_batch_size(len(request.items))
+    _check_batch_bytes(sum(len(item.image_base64) for item in request.items) * 3 // 4)
+    max_bytes = config.get("max_upload_bytes", 10 * 1024 * 1024)
+    items = [(item.user_id, functools.partial(_decode_item, item.image_base64, max_bytes)) for item in request.items]
+    return StreamingResponse(_stream_batch("/validate-id/batch", items), media_type="application/x-ndjson")
+
+@app.post("/validate-id/batch/archive")
+async def validate_id_batch_archive(archive: UploadFile = File(...)):
+    """
+    Validate every image in a zip archive; the user_id is each file name without extension.
+    Entries are only decompressed one at a time, and only up to max_upload_bytes (413 per
+    entry beyond that); the declared total may not exceed batch.max_total_bytes.
+    """
+    if archive.size is not None:
+        _check_batch_bytes(archive.size)
+    try:
+        bundle = zipfile.ZipFile(io.BytesIO(await archive.read()))
+    except zipfile.BadZipFile:
+        raise HTTPException(status_code=400, detail="Archive must be a zip file")
+
+    entries = [info for info in bundle.infolist()
+               if not info.is_dir() and info.filename.lower().endswith(ARCHIVE_IMAGE_EXTENSIONS)]
+    _check_batch_size(len(entries))
+    max_bytes = config.get("max_upload_bytes", 10 * 1024 * 1024)
+    _check_batch_bytes(sum(info.file_size for info in entries if info.file_size <= max_bytes))
+    items = [(os.path.splitext(os.path.basename(info.filename))[0],
+              functools.partial(_read_member, bundle, info, max_bytes)) for info in entries]
+    return StreamingResponse(_stream_batch("/validate-id/batch/archive", items), media_type="application/x-ndjson")
+
+# Durable queue behind POST /jobs, drained by separate worker processes (None when disabled in config.json).
+# The workers import pipeline, not this module, and share the duplicate index through its SQLite store.
+job_queue = JobQueue.from_config(config, base_dir=os.path.dirname(os.path.abspath(__file__)))
+job_workers = JobWorkers.from_config(config, job_queue) if job_queue is not None else None
+
+@app.on_event("startup")
+def start_job_workers():
+    if job_workers is not None:
+        job_workers.start()
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    if job_workers is not None:
+        job_workers.stop()
+
+def _require_job_queue():
+    if job_queue is None:
+        raise HTTPException(status_code=503, detail="Job API is disabled (jobs.enabled in config.json)")
+
+@app.post("/jobs", status_code=202, response_model=JobAccepted)
+async def submit_job(request: JobRequest):
+    """
+    Queue one ID card for validation and return at once with its job id.
+
+    The job is committed to disk before the response is sent, so it survives a
+    restart; poll GET /jobs/{job_id} or pass callback_url to be notified.
+    """
+    _require_job_queue()
+    if request.callback_url is not None:
+        allowed_hosts = config.get("jobs", {}).get("callback_allowed_hosts", [])
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                None, check_callback_url, request.callback_url, allowed_hosts)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    try:
+        image_bytes = base64.b64decode(request.image_base64)
+    except Exception:
+        raise HTTPException(status_code=400, detail=INVALID_IMAGE_DETAIL)
+    if not image_bytes:
+        raise HTTPException(status_code=400, detail=INVALID_IMAGE_DETAIL)
+    max_bytes = config.get("max_upload_bytes", 10 * 1024 * 1024)
+    if len(image_bytes) > max_bytes:
+        raise HTTPException(status_code=413, detail=f"Upload larger than {max_bytes} bytes")
+
+    job_id = await asyncio.get_running_loop().run_in_executor(
+        None, job_queue.submit, request.user_id, image_bytes, request.callback_url)
+    return JobAccepted(job_id=job_id, status="queued", status_url=f"/jobs/{job_id}")
+
+@app.get("/jobs/{job_id}", response_model=JobStatus, response_model_exclude_none=True)
+async def get_job(job_id: str):
+    """Status of a queued job, with its ValidateIDResponse once done or its error once failed."""
+    _require_job_queue()
+    job = await asyncio.get_running_loop().run_in_executor(None, job_queue.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return JobStatus(job_id=job.pop("id"), **job)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,180 @@
+import bisect
+import math
+import os
+import threading
+import time
+
+# Seconds; covers a cached verdict (sub-millisecond) up to a slow full-page OCR
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _number(value):
+    if value == math.inf:
+        return "+Inf"
+    if isinstance(value, float) and value.is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(value)
+
+
+class CounterMetric:
+    def __init__(self, name, help_text, labelnames=()):
+        """Monotonic count per label combination."""
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}")
+        return lines
+
+
+class HistogramMetric:
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """
+        Bucketed distribution per label combination. observe() is one bisect and
+        three additions under a lock; cumulative counts are only built at scrape time.
+        """
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # labels -> [per-bucket counts (+Inf last), sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def time(self, *labels):
+        """Context manager observing the elapsed seconds of its block."""
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((labels, (list(counts), total, count)) for labels, (counts, total, count) in self._series.items())
+        for labels, (counts, total, count) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                le = 'le="' + _number(float(bound)) + '"'
+                lines.append(f"{self.name}_bucket{_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labelnames, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class _Timer:
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+        return False
+
+
+class CallbackMetric:
+    def __init__(self, name, help_text, read, kind="gauge", labelnames=()):
+        """
+        Value read from its owner at scrape time, so the hot path pays nothing.
+        read() returns a number, or a {label values tuple: number} dict when
+        labelnames are given; None leaves the metric out of this scrape.
+        """
+        self.name = name
+        self.help = help_text
+        self.read = read
+        self.kind = kind
+        self.labelnames = tuple(labelnames)
+
+    def render(self):
+        value = self.read()
+        if value is None:
+            return []
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        if self.labelnames:
+            for labels, number in sorted(value.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, labels)} {_number(number)}")
+        else:
+            lines.append(f"{self.name} {_number(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        """Metrics rendered together in the Prometheus text exposition format."""
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._add(CounterMetric(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._add(HistogramMetric(name, help_text, labelnames, buckets))
+
+    def callback(self, name, help_text, read, kind="gauge", labelnames=()):
+        return self._add(CallbackMetric(name, help_text, read, kind, labelnames))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+def process_memory():
+    """Resident and virtual memory of this process in bytes (zeros where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            size, resident = f.read().split()[:2]
+        page = os.sysconf("SC_PAGE_SIZE")
+        return {"rss": int(resident) * page, "vms": int(size) * page}
+    except (OSError, ValueError, AttributeError):
+        return {"rss": 0, "vms": 0}
+
+
+# Shared by the modules that time their own work (stages running in process-mode
+# workers are counted in that worker, not here)
+registry = MetricsRegistry()
+stage_seconds = registry.histogram(
+    "idcard_stage_seconds", "Time spent in each validation stage", labelnames=("stage",))
@@ -0,0 +1,186 @@
+import logging
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+import pytesseract
+
+try:
+    import tesserocr
+except ImportError:  # optional: falls back to the pytesseract subprocess path
+    tesserocr = None
+
+logger = logging.getLogger(__name__)
+
+# Where the Windows installer puts tesseract; used when it exists and no other path is configured
+WINDOWS_TESSERACT_CMD = r"C:\Program Files\Tesseract-OCR\tesseract.exe"
+
+
+def use_tesseract_cmd(path):
+    """Point pytesseract at path if that binary exists; otherwise it keeps looking on PATH."""
+    if not path or not (os.path.isfile(path) or shutil.which(path)):
+        return False
+    pytesseract.pytesseract.tesseract_cmd = path
+    return True
+
+
+class OCREngine:
+    """Common timing/statistics for the OCR backends."""
+
+    name = "base"
+
+    def __init__(self, psm=3):
+        self.psm = psm
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.warmup_time = None
+
+    def image_to_string(self, rgb, psm=None):
+        """
+        Args:
+            rgb (np.ndarray): HxWx3 uint8 RGB image
+            psm (int): Page segmentation mode for this call (e.g. 7 for a single
+                text line); defaults to the engine's configured mode
+
+        Returns:
+            str: Recognized text
+        """
+        start = time.perf_counter()
+        text = self._recognize(rgb, self.psm if psm is None else psm)
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.calls += 1
+            self.total_time += elapsed
+            self.max_time = max(self.max_time, elapsed)
+        return text
+
+    def _recognize(self, rgb, psm):
+        raise NotImplementedError
+
+    def warmup(self):
+        """
+        Load language data up front so the first request does not pay for it.
+        Run it on the threads that will do the OCR (see StageExecutor's
+        initializer). A failure is logged, not raised: the service still starts
+        and the OCR stage reports the problem per request.
+
+        Returns:
+            bool: whether the engine recognized the test image
+        """
+        start = time.perf_counter()
+        try:
+            self._recognize(np.full((64, 256, 3), 255, dtype=np.uint8), self.psm)
+        except Exception as e:
+            logger.warning(f"OCR engine '{self.name}' warmup failed: {e}")
+            return False
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self.warmup_time = elapsed if self.warmup_time is None else max(self.warmup_time, elapsed)
+        logger.info(f"OCR engine '{self.name}' warmed up in {elapsed * 1000:.1f} ms")
+        return True
+
+    def stats(self):
+        with self._lock:
+            return {
+                "engine": self.name,
+                "calls": self.calls,
+                "avg_ms": round(self.total_time / self.calls * 1000, 3) if self.calls else 0.0,
+                "max_ms": round(self.max_time * 1000, 3),
+                "warmup_ms": round(self.warmup_time * 1000, 3) if self.warmup_time is not None else None,
+            }
+
+
+class PytesseractEngine(OCREngine):
+    """Original path: pytesseract writes a temp file and forks `tesseract` for every call."""
+
+    name = "pytesseract"
+
+    def __init__(self, lang="eng", psm=3, tesseract_cmd=None):
+        super().__init__(psm=psm)
+        self.lang = lang
+        if tesseract_cmd is None:
+            use_tesseract_cmd(WINDOWS_TESSERACT_CMD)
+        elif not use_tesseract_cmd(tesseract_cmd):
+            logger.warning(f"tesseract_cmd '{tesseract_cmd}' not found; looking for tesseract on PATH")
+
+    def _recognize(self, rgb, psm):
+        return pytesseract.image_to_string(rgb, lang=self.lang, config=f"--psm {psm}")
+
+
+class TesserocrEngine(OCREngine):
+    """
+    Keeps one initialized Tesseract API per worker thread (Tesseract's C API is not
+    thread-safe) and hands it the in-memory pixels directly: no temp file, no fork,
+    no reloading of language data per request.
+    """
+
+    name = "tesserocr"
+
+    def __init__(self, lang="eng", psm=3, tessdata_path=None):
+        if tesserocr is None:
+            raise RuntimeError("tesserocr is not installed")
+        super().__init__(psm=psm)
+        self.lang = lang
+        self.tessdata_path = tessdata_path
+        self._local = threading.local()
+        self._apis = []
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            kwargs = {"lang": self.lang, "psm": self.psm}
+            if self.tessdata_path:
+                kwargs["path"] = self.tessdata_path
+            api = tesserocr.PyTessBaseAPI(**kwargs)
+            self._local.api = api
+            with self._lock:
+                self._apis.append(api)
+        return api
+
+    def _recognize(self, rgb, psm):
+        rgb = np.ascontiguousarray(rgb)
+        height, width, channels = rgb.shape
+        api = self._api()
+        api.SetPageSegMode(psm)
+        api.SetImageBytes(rgb.tobytes(), width, height, channels, width * channels)
+        try:
+            return api.GetUTF8Text()
+        finally:
+            api.Clear()
+
+    def close(self):
+        with self._lock:
+            apis, self._apis = self._apis, []
+        for api in apis:
+            api.End()
+
+
+def create_ocr_engine(settings=None):
+    """
+    Build the OCR backend from the "ocr" section of config.json.
+
+    engine "auto" (default) uses tesserocr when it is installed and falls back
+    to pytesseract otherwise; "tesserocr" and "pytesseract" force a backend.
+    The engine is not warmed up here: warmup() has to run on the stage threads.
+    """
+    settings = settings or {}
+    choice = settings.get("engine", "auto")
+    lang = settings.get("lang", "eng")
+    psm = settings.get("psm", 3)
+
+    if choice == "tesserocr" or (choice == "auto" and tesserocr is not None):
+        engine = TesserocrEngine(lang=lang, psm=psm, tessdata_path=settings.get("tessdata_path"))
+    elif choice in ("auto", "pytesseract"):
+        if choice == "auto":
+            logger.warning("tesserocr is not installed; OCR falls back to pytesseract, "
+                           "which starts a tesseract process for every image")
+        engine = PytesseractEngine(lang=lang, psm=psm, tesseract_cmd=settings.get("tesseract_cmd"))
+    else:
+        raise ValueError(f"Unknown OCR engine '{choice}'")
+
+    logger.info(f"Using OCR engine: {engine.name}")
+    return engine
@@ -1,145 +1,170 @@
-import pytesseract
-import cv2
-import numpy as np
-import re
 import logging
-from typing import List
+from typing import Dict, List, Optional, Tuple, Union
+from image_context import DecodedImage, as_decoded
+from ocr_engine import OCREngine, PytesseractEngine
+from college_matcher import CollegeMatcher
+from face_detector import FaceDetector
+from metrics import stage_seconds
+from request_log import annotate, detail_logger, detail_enabled
+from field_extractor import FieldExtractor, BLACKLIST_NAMES  # BLACKLIST_NAMES still importable from here
 
 logger = logging.getLogger(__name__)
+detail = detail_logger(__name__)
+
+# OCR backend and card layouts used by validate_id_card; pipeline.py installs the configured ones at startup
+ocr_engine = None
+layout_registry = None
+face_detector = None
+college_matcher = None  # automaton over the last approved list seen (see get_college_matcher)
+
+SINGLE_LINE_PSM = 7  # Tesseract page segmentation mode for one text line
+
+def set_ocr_engine(engine: OCREngine) -> None:
+    global ocr_engine
+    ocr_engine = engine
+
+def set_layout_registry(registry) -> None:
+    """Install a card_layouts.LayoutRegistry (None disables region-of-interest OCR)."""
+    global layout_registry
+    layout_registry = registry
+
+def set_face_detector(detector: FaceDetector) -> None:
+    global face_detector
+    face_detector = detector
+
+def get_face_detector() -> FaceDetector:
+    """Configured detector, or one with default settings for standalone callers."""
+    global face_detector
+    if face_detector is None:
+        face_detector = FaceDetector()
+    return face_detector
+
+def get_ocr_engine() -> OCREngine:
+    """Configured engine, or the plain pytesseract path for standalone callers."""
+    global ocr_engine
+    if ocr_engine is None:
+        ocr_engine = PytesseractEngine()
+    return ocr_engine
+
+# Name and roll/class patterns, compiled once into a single scanner
+field_extractor = FieldExtractor()
+
+def get_college_matcher(approved_colleges: Union[List[str], CollegeMatcher]) -> CollegeMatcher:
+    """
+    Automaton for the approved list. A CollegeMatcher is used as is; a plain list
+    reuses the last automaton built and only rebuilds it when the list has changed.
+    """
+    global college_matcher
+    if isinstance(approved_colleges, CollegeMatcher):
+        return approved_colleges
+    if college_matcher is None:
+        college_matcher = CollegeMatcher(approved_colleges)
+    elif college_matcher.colleges != approved_colleges:
+        college_matcher.set_colleges(approved_colleges)
+    return college_matcher
+
+def find_college(text: str, approved_colleges: Union[List[str], CollegeMatcher]) -> Tuple[Optional[str], Optional[str]]:
+    """
+    Scan the OCR text once for approved college names and institution keywords.
 
-# Set up Tesseract path (adjust to your environment)
-pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
+    Returns:
+        tuple: (approved college name or None, institution line or None)
+    """
+    college, institution_line = get_college_matcher(approved_colleges).find(text)
+    detail.debug("College: approved=%r institution_line=%r", college, institution_line)
+    return college, institution_line
 
-# Load OpenCV's Haar Cascade for face detection once (do not reload on every call)
-face_cascade = cv2.CascadeClassifier(cv2.data.haarcascades + 'haarcascade_frontalface_default.xml')
+def closest_college(text: str, approved_colleges: Union[List[str], CollegeMatcher]) -> Optional[Dict[str, object]]:
+    """
+    Approved college the OCR text names despite misread characters
+    ("Instltute of Technologv"), via the matcher's n-gram index.
 
-# Blacklist of fake or placeholder names to reject
-BLACKLIST_NAMES = {
-    "mickey mouse", "iron man", "elon musk", "donald duck", "batman",
-    "spiderman", "tony stark", "steve jobs", "captain america", "naruto",
-    "goku", "superman", "barack obama", "modi", "saitama"
-}
+    Returns:
+        dict: {"name", "similarity"} of the best candidate, or None if none is close enough
+    """
+    name, similarity = get_college_matcher(approved_colleges).closest(text)
+    detail.debug("Closest approved college: %r (similarity %.3f)", name, similarity)
+    if name is None:
+        return None
+    return {"name": name, "similarity": similarity}
+
+def detect_college(text: str, approved_colleges: Union[List[str], CollegeMatcher]) -> bool:
+    """Check if any approved college name (or an institution line) appears in the OCR text."""
+    college, institution_line = find_college(text, approved_colleges)
+    return college is not None or institution_line is not None
+
+def extract_fields(text: str) -> Dict[str, Optional[Dict[str, str]]]:
+    """
+    Scan the OCR text once for a name and a roll number/class pattern.
 
-def detect_college(text: str, approved_colleges: List[str]) -> bool:
-    """Check if any approved college name appears in the OCR text."""
-    text_lower = text.lower()
-    logger.info("Checking for college name in text:")
-    logger.info(f"Text sample: {text[:200]}")
-    
-    # First check exact matches from approved list
-    for college in approved_colleges:
-        if college.lower() in text_lower:
-            logger.info(f"Found approved college: {college}")
-            return True
-    
-    # Common educational institution keywords
-    edu_keywords = [
-        "college", "university", "institute", "school",
-        "education", "polytechnic", "academy"
-    ]
-    
-    # Check for educational keywords
-    for keyword in edu_keywords:
-        if keyword in text_lower:
-            # Look for full institution name pattern
-            lines = text.splitlines()
-            for line in lines:
-                if keyword in line.lower() and len(line.strip()) > len(keyword):
-                    logger.info(f"Found educational institution: {line.strip()}")
-                    return True
-    
-    logger.info("No approved college or educational institution found in text")
-    return False
+    Returns:
+        dict: {"name", "roll_number"}, each {"value", "pattern"} or None
+    """
+    fields = field_extractor.extract(text)
+    detail.debug("Fields: %s", fields)
+    return fields
 
 def detect_name(text: str) -> bool:
     """Detect a valid name in OCR text, ignoring blacklisted names."""
-    logger.info("Looking for name in text")
-    
-    # Multiple name patterns to try
-    name_patterns = [
-        r'name[:\-]?\s*([A-Za-z\. ]+)',  # Name: John Doe
-        r'(?:mr|mrs|ms|dr)[.\s]+([A-Za-z\. ]+)',  # Mr. John Doe
-        r'student[:\-]?\s*([A-Za-z\. ]+)',  # Student: John Doe
-        r'^([A-Z][A-Za-z\. ]+(?:\s+[A-Z][A-Za-z\. ]+){1,3})$',  # JOHN DOE
-    ]
-    
-    # Try each pattern
-    for pattern in name_patterns:
-        for line in text.splitlines():
-            match = re.search(pattern, line.strip(), re.IGNORECASE)
-            if match:
-                name_found = match.group(1).strip().lower()
-                logger.info(f"Found name with pattern '{pattern}': {name_found}")
-                
-                # Clean name and check blacklist
-                name_clean = re.sub(r'[^a-z\. ]', '', name_found).strip()
-                if name_clean in BLACKLIST_NAMES:
-                    logger.info(f"Name '{name_clean}' found in blacklist")
-                    continue
-                    
-                if len(name_clean.replace('.', '').replace(' ', '')) >= 3:
-                    logger.info(f"Valid name found: {name_clean}")
-                    return True
-                
-    logger.info("No valid name pattern found")
-    return False
+    return field_extractor.extract(text)["name"] is not None
 
 def detect_roll_number(text: str) -> bool:
     """Detect roll number or class/section patterns in the OCR text."""
-    logger.info("Looking for roll number/class patterns")
-    roll_patterns = [
-        # Original college patterns
-        r'\b\d{4}-\d{5}[A-Z]{2}\b',   # e.g. 2025-01334CE
-        r'\b\d{5}[A-Z]\d{4}\b',       # e.g. 22891A0678
-        r'\b\d{2}[A-Z]{2}\d{4}\b',    # e.g. 21CS1001
-        r'\b\d{2}[A-Z]{2}\d{6}\b',    # e.g. 19EC123456
-        r'\b\d{4}BTECH\d{4}\b',       # e.g. 2019BTECH0001
-        r'\b\d{12}\b',                # e.g. 123456789012
-        # School patterns
-        r'Class\s+\d+',               # e.g. Class 28
-        r'Sec\.\s*[A-Z]+',           # e.g. Sec. ZA
-        r'\b\d{1,2}(st|nd|rd|th)?\s*(Grade|Class|Std\.?)',  # Various class formats
-        r'Section\s*[A-Z]',           # Section format
-        # Course patterns
-        r'Course\s*(ID|Number|No\.?)?\s*[:=]?\s*[\w\d-]+',  # Course ID/Number
-        r'Certificate\s*(ID|Number|No\.?)?\s*[:=]?\s*[\w\d-]+',  # Certificate number
-        # Additional patterns
-        r'Roll\s*[Nn]o\.?\s*[:=]?\s*\d+',  # Roll No: 123
-        r'Admission\s*[Nn]o\.?\s*[:=]?\s*[\w\d/-]+',  # Admission No: ABC123
-        r'Registration\s*[Nn]o\.?\s*[:=]?\s*[\w\d/-]+',  # Registration No: XYZ789
-        r'Student\s*(ID|Number|No\.?)?\s*[:=]?\s*[\w\d/-]+',  # Student ID
-        r'\b[A-Z]{2,4}\d{3,8}\b',  # Generic alphanumeric ID pattern
-        r'Session\s*[:=]?\s*\d{4}[-/]\d{2,4}'  # Session: 2013-2014
-    ]
-    
-    text_upper = text.upper()
-    logger.info("Text sample for roll number search:")
-    logger.info(text_upper[:200])
-    
-    # Check for either class or section
-    for pattern in roll_patterns:
-        if re.search(pattern, text_upper, re.IGNORECASE):
-            logger.info(f"Found matching pattern: {pattern}")
-            return True
-    logger.info("No roll number/class patterns found")
-    return False
-
-def detect_face(image_bytes: bytes) -> bool:
-    """Detect face(s) in the image using OpenCV Haar Cascade."""
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    if img is None:
+    return field_extractor.extract(text)["roll_number"] is not None
+
+def find_faces(image: Union[DecodedImage, bytes], layout: Optional[dict] = None) -> List[Tuple[int, int, int, int]]:
+    """
+    Face boxes (x, y, w, h) in original image pixels, searched on a downscaled copy
+    and, when the card layout is known, around its photo box first.
+    """
+    try:
+        decoded = as_decoded(image)
+    except ValueError:
         logger.error("Cannot decode image for face detection")
-        return False
-    gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
-    faces = face_cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5)
-    if len(faces) > 0:
-        logger.info(f"Found {len(faces)} face(s) in image")
-        return True
-    logger.info("No faces detected in image")
-    return False
-
-def validate_id_card(image_bytes: bytes, approved_colleges: List[str], min_fields: int) -> dict:
+        return []
+    with stage_seconds.time("face"):
+        faces = get_face_detector().detect(decoded, layout)
+    detail.debug("Faces: %s", faces)
+    return faces
+
+def detect_face(image: Union[DecodedImage, bytes], layout: Optional[dict] = None) -> bool:
+    """Detect face(s) in the image using OpenCV Haar Cascade."""
+    return len(find_faces(image, layout)) > 0
+
+def find_card_layout(decoded: DecodedImage) -> Tuple[Optional[str], Optional[dict]]:
+    """(layout name, layout) of the upload, or (None, None) when unknown or layouts are disabled."""
+    if layout_registry is None:
+        return None, None
+    return layout_registry.find_layout(decoded)
+
+def read_card_text(decoded: DecodedImage, card_layout: Optional[Tuple[Optional[str], Optional[dict]]] = None) -> Tuple[str, Optional[str], Dict[str, str]]:
+    """
+    OCR the card. When the upload matches a known card layout, only its text bands
+    (name, course, roll, college) are read, each scaled to a fixed line height and
+    recognized as a single line; otherwise, or if the bands come back empty, the
+    whole image is read.
+
+    Args:
+        decoded: The upload
+        card_layout: Result of find_card_layout if the caller already has it
+
+    Returns:
+        tuple: (text, matched layout name or None, per-field text)
+    """
+    engine = get_ocr_engine()
+    if layout_registry is not None:
+        layout_name, layout = card_layout if card_layout is not None else find_card_layout(decoded)
+        if layout is not None:
+            field_text = {
+                field: engine.image_to_string(crop, psm=SINGLE_LINE_PSM).strip()
+                for field, crop in layout_registry.field_crops(decoded, layout).items()
+            }
+            if any(field_text.values()):
+                return "\n".join(field_text.values()), layout_name, field_text
+            detail.debug("Layout %s text bands were empty; falling back to full-page OCR", layout_name)
+    return engine.image_to_string(decoded.rgb), None, {}
+
+def validate_id_card(image: Union[DecodedImage, bytes], approved_colleges: Union[List[str], CollegeMatcher], min_fields: int) -> dict:
     """
     Validate ID card by checking OCR fields and face detection.
     
@@ -152,62 +177,60 @@ def validate_id_card(image_bytes: bytes, approved_colleges: List[str], min_field
     Missing or unrecognized fields will lower the confidence score.
 
     Args:
-        image_bytes: Image in bytes (e.g. decoded base64)
-        approved_colleges: List of approved institution names to validate against
+        image: DecodedImage shared across stages, or raw image bytes (decoded here)
+        approved_colleges: Approved institution names to validate against, or a
+            CollegeMatcher already built over them
         min_fields: Minimum number of required valid fields for ID to be considered valid
 
     Returns:
         dict: Validation results with boolean flags, count, and OCR sample text.
     """
-    logger.info("\n=== Starting ID Card Validation ===")
-    
-    # Decode image bytes to OpenCV format
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-    if img is None:
-        raise ValueError("Invalid image data - cannot decode")
-
-    # Run OCR with Tesseract on the image
-    text = pytesseract.image_to_string(img)
-    logger.info("OCR Text extracted:")
-    logger.info("-------------------")
-    logger.info(text[:500])
-    logger.info("-------------------")
+    # Reuse the request's decoded image (raises ValueError if bytes cannot be decoded)
+    decoded = as_decoded(image)
+
+    # Run OCR with Tesseract, on the layout's text bands when the card layout is known
+    card_layout = find_card_layout(decoded)
+    text, layout_name, field_text = read_card_text(decoded, card_layout)
+    if detail_enabled():
+        detail.debug("OCR text (layout %s): %r", layout_name, text[:500])
 
     # Run each detection step
-    college_found = detect_college(text, approved_colleges)
-    name_found = detect_name(text)
-    roll_found = detect_roll_number(text)
-    face_found = detect_face(image_bytes)
+    college_name, institution_line = find_college(text, approved_colleges)
+    college_found = college_name is not None or institution_line is not None
+    # Reported for review only: a misread name is not enough to verify the college
+    college_candidate = closest_college(text, approved_colleges) if college_name is None else None
+    fields = extract_fields(text)
+    name_found = fields["name"] is not None
+    roll_found = fields["roll_number"] is not None
+    faces = find_faces(decoded, card_layout[1])
+    face_found = len(faces) > 0
 
     # Count how many fields are detected as True
     fields_detected = sum([college_found, name_found, roll_found, face_found])
     
-    # Log detailed validation results
-    logger.info("\n=== Validation Results ===")
-    logger.info(f"College found: {college_found}")
-    logger.info(f"Name found: {name_found}")
-    logger.info(f"Roll/Class found: {roll_found}")
-    logger.info(f"Face found: {face_found}")
-    logger.info(f"Total fields detected: {fields_detected}/{4}")
-
     # For college IDs, we expect all these fields
     # Missing college name or roll number indicates this might not be a college ID
     if not college_found or not roll_found:
-        logger.info("Missing critical college ID fields (college name or roll number)")
         fields_detected = min(fields_detected, 2)  # Cap at 2 if missing critical fields
 
     # Check if detected fields meet the minimum required
     is_valid = fields_detected >= min_fields
-    logger.info(f"Validation {'passed' if is_valid else 'failed'} (min fields: {min_fields})")
+    annotate(layout=layout_name, college=college_found, name=name_found, roll=roll_found, face=face_found,
+             fields_detected=fields_detected, college_candidate=college_candidate and college_candidate["name"])
 
     # Return detailed validation dictionary
     return {
         "college_verified": college_found,
+        "college_name": college_name,  # approved college matched, None if only an institution line was
+        "college_candidate": college_candidate,  # approved college the text may name despite OCR errors, with similarity; not counted in college_verified
         "name_verified": name_found,
         "roll_number_verified": roll_found,
+        "extracted_fields": fields,  # matched name / roll values and the pattern that fired
         "face_verified": face_found,
         "fields_detected": fields_detected,
         "is_valid": is_valid,
-        "ocr_text_sample": text[:200]  # first 200 chars for debugging/logging
+        "ocr_text_sample": text[:200],  # first 200 chars for debugging/logging
+        "face_boxes": [list(map(int, box)) for box in faces],  # (x, y, w, h) in upload pixels
+        "layout": layout_name,
+        "field_text": field_text
     }
\ No newline at end of file
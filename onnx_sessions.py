@@ -0,0 +1,133 @@
+import contextlib
+import logging
+import queue
+import threading
+import time
+
+import onnxruntime as ort
+
+logger = logging.getLogger(__name__)
+
+GRAPH_OPTIMIZATION_LEVELS = {
+    "disable": ort.GraphOptimizationLevel.ORT_DISABLE_ALL,
+    "basic": ort.GraphOptimizationLevel.ORT_ENABLE_BASIC,
+    "extended": ort.GraphOptimizationLevel.ORT_ENABLE_EXTENDED,
+    "all": ort.GraphOptimizationLevel.ORT_ENABLE_ALL,
+}
+
+EXECUTION_MODES = {
+    "sequential": ort.ExecutionMode.ORT_SEQUENTIAL,
+    "parallel": ort.ExecutionMode.ORT_PARALLEL,
+}
+
+
+def _lookup(table, value, setting):
+    try:
+        return table[value]
+    except KeyError:
+        raise ValueError(f"Unknown onnx.{setting} '{value}' (expected one of {', '.join(table)})")
+
+
+def session_options(settings=None):
+    """
+    SessionOptions from the "onnx" section of config.json. Thread counts of 0
+    leave the choice to ONNX Runtime (one intra-op thread per physical core).
+    """
+    settings = settings or {}
+    options = ort.SessionOptions()
+    options.intra_op_num_threads = int(settings.get("intra_op_num_threads", 0))
+    options.inter_op_num_threads = int(settings.get("inter_op_num_threads", 0))
+    options.graph_optimization_level = _lookup(
+        GRAPH_OPTIMIZATION_LEVELS, settings.get("graph_optimization_level", "all"), "graph_optimization_level")
+    options.execution_mode = _lookup(EXECUTION_MODES, settings.get("execution_mode", "sequential"), "execution_mode")
+    options.enable_cpu_mem_arena = bool(settings.get("enable_cpu_mem_arena", True))
+    options.enable_mem_pattern = bool(settings.get("enable_mem_pattern", True))
+    return options
+
+
+class SessionPool:
+    def __init__(self, model_path, size=1, settings=None):
+        """
+        A fixed set of InferenceSessions over one model, handed out one caller at a
+        time. A single session is thread-safe but runs one request's graph on its
+        own intra-op pool; several smaller sessions let concurrent batches run side
+        by side. Keep size * intra_op_num_threads near the core count.
+
+        Args:
+            model_path (str): ONNX model file
+            size (int): Number of sessions
+            settings (dict): "onnx" section of config.json (see session_options)
+        """
+        if size < 1:
+            raise ValueError("onnx.pool_size must be at least 1")
+        self.model_path = model_path
+        self.settings = dict(settings or {})
+        self.providers = self.settings.get("providers") or ["CPUExecutionProvider"]
+        self.size = size
+
+        start = time.perf_counter()
+        self.sessions = [
+            ort.InferenceSession(model_path, sess_options=session_options(self.settings), providers=self.providers)
+            for _ in range(size)
+        ]
+        self.load_time = time.perf_counter() - start
+        self._idle = queue.Queue()
+        for session in self.sessions:
+            self._idle.put(session)
+
+        self._lock = threading.Lock()
+        self.acquired = 0
+        self.waits = 0
+        self.wait_time = 0.0
+
+    @classmethod
+    def from_config(cls, config, model_path):
+        settings = config.get("onnx", {})
+        return cls(model_path, size=int(settings.get("pool_size", 1)), settings=settings)
+
+    @contextlib.contextmanager
+    def session(self):
+        """Borrow an idle session, waiting for one if all are busy."""
+        try:
+            session = self._idle.get_nowait()
+            waited = 0.0
+        except queue.Empty:
+            start = time.perf_counter()
+            session = self._idle.get()
+            waited = time.perf_counter() - start
+        with self._lock:
+            self.acquired += 1
+            if waited:
+                self.waits += 1
+                self.wait_time += waited
+        try:
+            yield session
+        finally:
+            self._idle.put(session)
+
+    def report(self):
+        """Effective settings, read back from the first session."""
+        session = self.sessions[0]
+        options = session.get_session_options()
+        return {
+            "model": self.model_path,
+            "pool_size": self.size,
+            "providers": session.get_providers(),
+            "intra_op_num_threads": options.intra_op_num_threads,
+            "inter_op_num_threads": options.inter_op_num_threads,
+            "graph_optimization_level": str(options.graph_optimization_level).split(".")[-1],
+            "execution_mode": str(options.execution_mode).split(".")[-1],
+            "enable_cpu_mem_arena": options.enable_cpu_mem_arena,
+            "enable_mem_pattern": options.enable_mem_pattern,
+            "load_ms": round(self.load_time * 1000, 1),
+        }
+
+    def stats(self):
+        with self._lock:
+            return {
+                "pool_size": self.size,
+                "idle": self._idle.qsize(),
+                "acquired": self.acquired,
+                "waits": self.waits,
+                "avg_wait_ms": round(self.wait_time / self.waits * 1000, 3) if self.waits else 0.0,
+            }
@@ -0,0 +1,363 @@
+import base64
+import hashlib
+import itertools
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STORE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS image_hashes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    hash TEXT NOT NULL,
+    record TEXT NOT NULL
+);
+"""
+
+
+class NearDuplicateIndex:
+    def __init__(self, max_distance=6, bits=64, chunk_bits=21, max_entries=None):
+        """
+        Hamming-radius index over perceptual image hashes (multi-index hashing).
+
+        Each hash is cut into bits / chunk_bits disjoint chunks, each indexed in its
+        own table. If two hashes are within max_distance bits, at least one chunk
+        differs by at most max_distance // chunks bits (pigeonhole), so a lookup only
+        probes those few chunk neighbours and verifies the entries found there,
+        instead of scanning every stored hash.
+
+        Args:
+            max_distance (int): Largest Hamming radius a search may use
+            bits (int): Hash length in bits
+            chunk_bits (int): Approximate width of one chunk; wider chunks mean
+                smaller buckets but more neighbours to probe (21 keeps lookups
+                under a millisecond at a million hashes with max_distance=6)
+            max_entries (int): Keep only the newest max_entries hashes (None keeps all);
+                the oldest are dropped in batches of a tenth of the cap
+        """
+        self.max_distance = int(max_distance)
+        self.bits = int(bits)
+        if not 0 <= self.max_distance < self.bits:
+            raise ValueError(f"max_distance must be between 0 and {self.bits - 1}")
+        chunk_count = max(1, self.bits // max(1, int(chunk_bits)))
+        self.max_entries = int(max_entries) if max_entries else None
+        self._trim_batch = max(1, self.max_entries // 10) if self.max_entries else None
+
+        # (shift, mask) of each contiguous chunk
+        self._chunks = []
+        base, extra = divmod(self.bits, chunk_count)
+        shift = 0
+        for i in range(chunk_count):
+            width = base + (1 if i < extra else 0)
+            self._chunks.append((shift, (1 << width) - 1))
+            shift += width
+        self._flips = {}
+        self._tables = [{} for _ in self._chunks]
+        self._hashes = []
+        self._records = []
+        self._lock = threading.Lock()
+        self.persist_path = None
+        self._local = threading.local()
+        self._sync_lock = threading.Lock()
+        self._synced = 0  # last store row already in memory
+
+        self.lookups = 0
+        self.matches = 0
+
+    def _neighbour_flips(self, width, radius):
+        """XOR masks that change at most radius bits of a width-bit chunk (cached)."""
+        key = (width, radius)
+        flips = self._flips.get(key)
+        if flips is None:
+            flips = [0]
+            for count in range(1, radius + 1):
+                for positions in itertools.combinations(range(width), count):
+                    mask = 0
+                    for bit in positions:
+                        mask |= 1 << bit
+                    flips.append(mask)
+            self._flips[key] = flips
+        return flips
+
+    @classmethod
+    def from_config(cls, config, base_dir="."):
+        """
+        Build an index from the "duplicate_index" section of config.json, or None
+        if disabled. Entries are kept in the SQLite store at persist_path
+        (relative to base_dir), shared with the job worker processes.
+        """
+        settings = config.get("duplicate_index", {})
+        if not settings.get("enabled", False):
+            return None
+        index = cls(max_distance=settings.get("max_distance", 6), max_entries=settings.get("max_entries"))
+        path = settings.get("persist_path")
+        if path:
+            index.attach(os.path.join(base_dir, path))
+        return index
+
+    def __len__(self):
+        return len(self._hashes)
+
+    def add(self, image_hash, record):
+        """Store one hash with its record (any JSON-serialisable dict)."""
+        if self.persist_path is None:
+            self._add_local(image_hash, record)
+            return
+        with self._db() as db:
+            seq = db.execute("INSERT INTO image_hashes (hash, record) VALUES (?, ?)",
+                             (format(image_hash, "x"), json.dumps(record))).lastrowid
+            if self.max_entries and seq % self._trim_batch == 0:
+                db.execute("DELETE FROM image_hashes WHERE seq <= ?", (seq - self.max_entries,))
+        self.sync()
+
+    def _add_local(self, image_hash, record):
+        with self._lock:
+            idx = len(self._hashes)
+            self._hashes.append(image_hash)
+            self._records.append(record)
+            for table, (shift, mask) in zip(self._tables, self._chunks):
+                table.setdefault((image_hash >> shift) & mask, []).append(idx)
+            if self.max_entries and len(self._hashes) >= self.max_entries + self._trim_batch:
+                self._keep_newest(self.max_entries)
+
+    def _keep_newest(self, count):
+        # Rebuilding the tables is linear, but only runs once every _trim_batch additions
+        self._hashes = self._hashes[-count:]
+        self._records = self._records[-count:]
+        self._tables = [{} for _ in self._chunks]
+        for idx, image_hash in enumerate(self._hashes):
+            for table, (shift, mask) in zip(self._tables, self._chunks):
+                table.setdefault((image_hash >> shift) & mask, []).append(idx)
+
+    def search(self, image_hash, max_distance=None):
+        """
+        Records whose hash is within max_distance bits of image_hash.
+
+        Returns:
+            list: (distance, record) pairs, closest first
+        """
+        if self.persist_path is not None:
+            self.sync()
+        radius = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        chunk_radius = radius // len(self._chunks)
+        seen = set()
+        found = []
+        with self._lock:
+            for table, (shift, mask) in zip(self._tables, self._chunks):
+                chunk = (image_hash >> shift) & mask
+                bucket = table.get
+                for flip in self._neighbour_flips(mask.bit_length(), chunk_radius):
+                    for idx in bucket(chunk ^ flip, ()):
+                        if idx in seen:
+                            continue
+                        seen.add(idx)
+                        distance = (self._hashes[idx] ^ image_hash).bit_count()
+                        if distance <= radius:
+                            found.append((distance, self._records[idx]))
+            self.lookups += 1
+            if found:
+                self.matches += 1
+        found.sort(key=lambda item: item[0])
+        return found
+
+    def attach(self, path):
+        """
+        Keep the entries in a SQLite file shared by every process that attaches
+        it (the API and the job workers): add() writes there, and search() first
+        loads the rows other processes added since the last call.
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.persist_path = path
+        self._db().executescript(STORE_SCHEMA)
+        count = self.sync()
+        logger.info(f"Loaded {count} image hashes from {path}")
+
+    def _db(self):
+        # sqlite3 connections may not be shared between threads; one per thread
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.persist_path, timeout=5.0)
+            db.execute("PRAGMA journal_mode=WAL")  # readers never wait for a writer
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    def sync(self):
+        """Load the store rows not in memory yet; returns how many were added."""
+        with self._sync_lock:
+            rows = self._db().execute(
+                "SELECT seq, hash, record FROM image_hashes WHERE seq > ? ORDER BY seq", (self._synced,)).fetchall()
+            for seq, image_hash, record in rows:
+                self._add_local(int(image_hash, 16), json.loads(record))
+                self._synced = seq
+        return len(rows)
+
+    def stats(self):
+        return {
+            "entries": len(self._hashes),
+            "max_distance": self.max_distance,
+            "max_entries": self.max_entries,
+            "lookups": self.lookups,
+            "matches": self.matches,
+        }
+
+
+RECYCLED_REASON = "ID card image matches a card already submitted by another user"
+
+
+def content_digest(image_bytes):
+    """Exact identity of an upload; equal dHashes only mean two images look alike."""
+    return hashlib.sha256(image_bytes).hexdigest()
+
+
+def pack_thumbnail(thumbnail):
+    """Small grayscale thumbnail (uint8 array) as a JSON-friendly string."""
+    return base64.b64encode(np.ascontiguousarray(thumbnail, dtype=np.uint8).tobytes()).decode("ascii")
+
+
+def unpack_thumbnail(packed, size):
+    return np.frombuffer(base64.b64decode(packed), np.uint8).reshape(size, size)
+
+
+def thumbnail_difference(a, b, block=4):
+    """
+    Largest mean absolute difference over block x block tiles of two equally
+    sized thumbnails, each normalised to zero mean and unit variance first.
+
+    Re-encoding, rescaling and brightness changes spread a little noise over the
+    whole card; a different photo or name changes a few tiles a lot.
+    """
+    a = a.astype(np.float32)
+    b = b.astype(np.float32)
+    a = (a - a.mean()) / (a.std() + 1e-6)
+    b = (b - b.mean()) / (b.std() + 1e-6)
+    rows, cols = a.shape
+    tiles = np.abs(a - b).reshape(rows // block, block, cols // block, block).mean(axis=(1, 3))
+    return float(tiles.max())
+
+
+class DuplicateChecker:
+    def __init__(self, index, version, reuse_verdicts=False, flag_other_users=True, reuse_ttl_seconds=600.0,
+                 match_tolerance=0.2):
+        """
+        Flags cards sent by several users and reuses verdicts of re-uploaded
+        cards, from the records of a NearDuplicateIndex.
+
+        Cards printed on the same template have dHashes a few bits (often zero)
+        apart, so a hash match alone does not identify a card. Every candidate
+        within the index radius is confirmed on a 32x32 thumbnail stored with
+        its record (see thumbnail_difference): re-compressed, resized or
+        re-photographed copies pass, another student's card on the same template
+        does not. Reusing a verdict is stricter still: a thumbnail cannot tell a
+        card from a copy with an edited name, so only byte-identical uploads
+        (same content digest) computed by the same pipeline version less than
+        reuse_ttl_seconds ago are reused.
+
+        Args:
+            index (NearDuplicateIndex): Hashes and records of earlier uploads
+            version (str): Pipeline version stored with every new record
+            reuse_verdicts (bool): Answer exact re-uploads with their stored verdict
+            flag_other_users (bool): Send copies of another user's card to manual review
+            reuse_ttl_seconds (float): Age after which a stored verdict is recomputed
+            match_tolerance (float): Largest thumbnail_difference of the same card
+        """
+        self.index = index
+        self.version = version
+        self.reuse_verdicts = reuse_verdicts
+        self.flag_other_users = flag_other_users
+        self.reuse_ttl_seconds = float(reuse_ttl_seconds)
+        self.match_tolerance = float(match_tolerance)
+        self.events = Counter()
+        self._events_lock = threading.Lock()  # checks run on worker threads
+
+    @classmethod
+    def from_config(cls, config, version, base_dir="."):
+        """
+        Build a checker over the "duplicate_index" section of config.json, or None
+        if disabled or if neither reuse_verdicts nor flag_other_users is set (the
+        index would only cost a hash and a write per request).
+        """
+        settings = config.get("duplicate_index", {})
+        if not (settings.get("reuse_verdicts", False) or settings.get("flag_other_users", True)):
+            return None
+        index = NearDuplicateIndex.from_config(config, base_dir=base_dir)
+        if index is None:
+            return None
+        return cls(
+            index,
+            version,
+            reuse_verdicts=settings.get("reuse_verdicts", False),
+            flag_other_users=settings.get("flag_other_users", True),
+            reuse_ttl_seconds=settings.get("reuse_ttl_seconds", 600),
+            match_tolerance=settings.get("match_tolerance", 0.2),
+        )
+
+    def _same_card(self, image_hash, thumbnail):
+        found = []
+        for _, record in self.index.search(image_hash):
+            stored = record.get("thumbnail")
+            if stored is None:
+                continue
+            stored = unpack_thumbnail(stored, thumbnail.shape[0])
+            if thumbnail_difference(thumbnail, stored) <= self.match_tolerance:
+                found.append(record)
+        return found
+
+    def _reusable(self, record):
+        return record.get("version") == self.version and time.time() - record.get("time", 0) < self.reuse_ttl_seconds
+
+    def reused_verdict(self, image_hash, digest):
+        """Stored record of an exact re-upload whose verdict may be reused, or None."""
+        if not self.reuse_verdicts:
+            return None
+        for _, record in self.index.search(image_hash, max_distance=0):
+            if record.get("digest") == digest and self._reusable(record):
+                with self._events_lock:
+                    self.events["reused"] += 1
+                return record
+        return None
+
+    def check(self, user_id, image_hash, thumbnail, digest, result):
+        """
+        Record this user's upload and return result, sent to manual review when
+        flag_other_users is set and another user already sent the same card.
+
+        Args:
+            thumbnail (numpy.ndarray): Square grayscale thumbnail of the upload
+            digest (str): content_digest of the upload
+            result (dict): validation_score, label, status and reason of the upload
+
+        Returns:
+            tuple: (result, flagged)
+        """
+        same_card = self._same_card(image_hash, thumbnail)
+        if not any(record["user_id"] == user_id and record.get("digest") == digest and self._reusable(record)
+                   for record in same_card):
+            self.index.add(image_hash, {
+                "user_id": user_id,
+                "validation_score": result["validation_score"],
+                "label": result["label"],
+                "status": result["status"],
+                "reason": result["reason"],
+                "digest": digest,
+                "thumbnail": pack_thumbnail(thumbnail),
+                "version": self.version,
+                "time": time.time(),
+            })
+
+        other_users = any(record["user_id"] != user_id for record in same_card)
+        if not (other_users and self.flag_other_users and result["label"] != "fake"):
+            return result, False
+        with self._events_lock:
+            self.events["flagged"] += 1
+        return dict(result, label="suspicious", status="manual_review", reason=RECYCLED_REASON), True
+
+    def stats(self):
+        return dict(self.index.stats(), reused=self.events["reused"], flagged=self.events["flagged"])
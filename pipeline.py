@@ -0,0 +1,375 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import time
+from collections import Counter
+
+import numpy as np
+from fastapi import HTTPException
+
+from schemas import ValidateIDResponse
+from ocr_validator import validate_id_card, set_ocr_engine, set_layout_registry, set_face_detector
+from ocr_engine import create_ocr_engine
+from template_matcher import check_template, matcher as template_matcher, descriptor_cache_dir
+from card_layouts import LayoutRegistry
+from face_detector import FaceDetector
+from college_matcher import CollegeMatcher
+from decision import decide_label, classifier_settles_label, template_can_change_label, SKIPPED_OCR_RESULT
+from executor import StageExecutor
+from onnx_sessions import SessionPool
+from preprocessing import Preprocessor
+from batching import MicroBatcher
+from result_cache import ResultCache, content_key
+from phash_index import DuplicateChecker, content_digest
+from request_recorder import RequestRecorder
+from request_log import setup_logging, request_scope, annotate
+from metrics import registry as metrics_registry, stage_seconds
+from image_context import DecodedImage
+
+# The validation pipeline: model, stages, caches and metrics, built on import.
+# The API (main.py) and every job worker process (job_workers.py) import this
+# module, so it must not import main or start anything tied to the API process.
+
+logging.basicConfig(level=logging.INFO)  # until config.json is read; setup_logging replaces it
+logger = logging.getLogger(__name__)
+request_logger = logging.getLogger("requests")  # one summary record per validation request
+
+MODEL_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "model", "image_model.onnx"))
+QUANTIZED_MODEL_PATH = os.path.abspath(os.path.join(os.path.dirname(__file__), "model", "image_model.int8.onnx"))
+
+def served_model_path(config):
+    """FP32 model, or its INT8 export (image_classifier.quantize_model) when onnx.quantized is set."""
+    return QUANTIZED_MODEL_PATH if config.get("onnx", {}).get("quantized", False) else MODEL_PATH
+
+def load_model(config):
+    try:
+        pool = SessionPool.from_config(config, served_model_path(config))
+        logger.info("✅ ONNX Model loaded successfully")
+        logger.info(f"ONNX Runtime settings: {json.dumps(pool.report())}")
+        return pool
+    except Exception as e:
+        logger.error(f"❌ Error loading ONNX model: {e}")
+        raise RuntimeError(f"❌ Error loading ONNX model: {e}")
+
+def load_json(path):
+    try:
+        with open(os.path.abspath(os.path.join(os.path.dirname(__file__), path)), "r") as f:
+            return json.load(f)
+    except Exception as e:
+        logger.error(f"❌ Error loading {path}: {e}")
+        raise RuntimeError(f"❌ Error loading {path}: {e}")
+
+config = load_json("config.json")
+log_listener = setup_logging(config)
+session_pool = load_model(config)
+approved_colleges = load_json("approved_colleges.json")
+college_matcher = CollegeMatcher.from_config(config, approved_colleges)  # built once; call set_colleges() if the list is reloaded
+class_names = config.get("class_names", ["genuine", "fake", "suspicious"])
+ocr_engine = create_ocr_engine(config.get("ocr"))
+set_ocr_engine(ocr_engine)
+# tesserocr keeps one API per thread, so warm up on the stage threads that run the OCR
+executor = StageExecutor.from_config(
+    config, initializer=ocr_engine.warmup if config.get("ocr", {}).get("warmup", True) else None)
+executor.start_workers()
+set_layout_registry(LayoutRegistry.from_config(
+    config, base_dir=os.path.dirname(os.path.abspath(__file__)), cache_dir=descriptor_cache_dir
+))
+set_face_detector(FaceDetector.from_config(config))
+preprocessor = Preprocessor.from_config(config)
+
+def preprocess_image(pil_image):
+    """(1, 3, 224, 224) classifier input in a new array the caller may keep."""
+    return preprocessor(pil_image)[np.newaxis]
+
+def classify_batch_onnx(img_batch, session, class_names):
+    """Run one inference over an (N, 3, 224, 224) batch and return [(label, prob), ...]."""
+    input_name = session.get_inputs()[0].name
+    outputs = session.run(None, {input_name: img_batch})
+    scores = outputs[0]
+    exp_scores = np.exp(scores - scores.max(axis=1, keepdims=True))
+    probs = exp_scores / exp_scores.sum(axis=1, keepdims=True)
+    pred_idx = probs.argmax(axis=1)
+    return [(class_names[idx], float(probs[row, idx])) for row, idx in enumerate(pred_idx)]
+
+def classify_image_onnx(pil_image, session, class_names):
+    # The thread's scratch buffer is safe here: session.run is done with it before returning
+    return classify_batch_onnx(preprocessor.batch([pil_image]), session, class_names)[0]
+
+# Module-level stage wrappers so they can be shipped to thread or process workers
+def decode_image(image_bytes):
+    return DecodedImage.from_bytes(image_bytes)
+
+def run_classifier(decoded):
+    with session_pool.session() as session:
+        return classify_image_onnx(decoded.pil, session, class_names)
+
+def run_preprocess(decoded):
+    # A fresh array: it waits in the batcher while this thread preprocesses the next image
+    return preprocessor(decoded.pil)
+
+def run_classifier_batch(img_arrays):
+    img_batch = preprocessor.stack(img_arrays)
+    with session_pool.session() as session:
+        return classify_batch_onnx(img_batch, session, class_names)
+
+def run_fingerprint(decoded):
+    return decoded.dhash(), decoded.thumbnail()
+
+def run_ocr(decoded):
+    return validate_id_card(decoded, college_matcher, config["ocr_min_fields"])
+
+async def _classify_batch(img_arrays):
+    return await executor.run("classifier_batch", run_classifier_batch, img_arrays)
+
+# Concurrent requests share one batched ONNX call (None when batching is disabled)
+batcher = MicroBatcher.from_config(config, _classify_batch)
+
+async def classify(decoded):
+    """Classify one image, through the micro-batcher when batching is enabled."""
+    if batcher is None:
+        return await executor.run("classifier", run_classifier, decoded)
+    img_array = await executor.run("preprocess", run_preprocess, decoded)
+    return await batcher.submit(img_array)
+
+async def _timed_stage(timings, stage, awaitable):
+    start = time.perf_counter()
+    try:
+        return await awaitable
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 3)
+
+# How often the cascade skipped each stage (reported in /health)
+cascade_skips = Counter()
+
+# Request and executor metrics for /metrics; the stages observe stage_seconds themselves
+requests_total = metrics_registry.counter(
+    "idcard_requests_total", "Validation requests by endpoint, label and HTTP status", ("endpoint", "label", "status"))
+request_seconds = metrics_registry.histogram("idcard_request_seconds", "Validation request latency", ("endpoint",))
+executor_wait_seconds = metrics_registry.histogram(
+    "idcard_executor_wait_seconds", "Time a stage waited for a free executor worker", ("stage",))
+executor_run_seconds = metrics_registry.histogram(
+    "idcard_executor_run_seconds", "Time a stage ran on an executor worker", ("stage",))
+requests_in_flight = 0
+
+def _observe_executor(stage, wait, run):
+    executor_wait_seconds.observe(wait, stage)
+    executor_run_seconds.observe(run, stage)
+
+executor.add_observer(_observe_executor)
+
+async def _run_parallel(decoded, timings):
+    """Classifier, OCR and template matching only meet in decide_label, so run them concurrently."""
+    (_, validation_score), ocr_result, template_match = await asyncio.gather(
+        _timed_stage(timings, "classifier", classify(decoded)),
+        _timed_stage(timings, "ocr", executor.run("ocr", run_ocr, decoded)),
+        _timed_stage(timings, "template", executor.run("template", check_template, decoded)),
+    )
+    return validation_score, ocr_result, template_match, []
+
+async def _run_cascade(decoded, timings):
+    """
+    Run the cheap classifier first and the expensive stages only while they can
+    still change the label: a score below the fake threshold settles the card
+    without OCR, and usable OCR makes the template score irrelevant.
+    """
+    _, validation_score = await _timed_stage(timings, "classifier", classify(decoded))
+    if classifier_settles_label(validation_score):
+        return validation_score, SKIPPED_OCR_RESULT, 0.0, ["ocr", "template"]
+
+    ocr_result = await _timed_stage(timings, "ocr", executor.run("ocr", run_ocr, decoded))
+    if not template_can_change_label(ocr_result):
+        return validation_score, ocr_result, 0.0, ["template"]
+
+    template_match = await _timed_stage(timings, "template", executor.run("template", check_template, decoded))
+    return validation_score, ocr_result, template_match, []
+
+async def run_pipeline(decoded):
+    """
+    Run the validation stages and join them for the final decision.
+
+    pipeline_mode "parallel" (default) runs all stages concurrently, so latency
+    tracks the slowest stage; "cascade" runs them in order of cost and skips the
+    ones that cannot change the label, saving CPU on obvious fakes.
+
+    Returns:
+        dict: validation_score, label, status, reason, per-stage timings (ms)
+            and the list of skipped stages
+    """
+    timings = {}
+    start = time.perf_counter()
+    if config.get("pipeline_mode", "parallel") == "cascade":
+        validation_score, ocr_result, template_match, skipped = await _run_cascade(decoded, timings)
+    else:
+        validation_score, ocr_result, template_match, skipped = await _run_parallel(decoded, timings)
+    with stage_seconds.time("decision"):
+        label, status, reason = decide_label(validation_score, ocr_result, template_match, config["validation_threshold"])
+    timings["total"] = round((time.perf_counter() - start) * 1000, 3)
+    for stage in ("classifier", "ocr", "template"):
+        if stage in timings:
+            stage_seconds.observe(timings[stage] / 1000.0, stage)
+    cascade_skips.update(skipped)
+    annotate(timings=timings, skipped=skipped)
+    return {
+        "validation_score": validation_score,
+        "label": label,
+        "status": status,
+        "reason": reason,
+        "timings": timings,
+        "skipped_stages": skipped,
+    }
+
+INVALID_IMAGE_DETAIL = "Invalid base64 image encoding or image data"
+
+def pipeline_version():
+    """
+    Fingerprint of everything that can change a verdict for the same image:
+    model weights, config, approved colleges and template set.
+    """
+    digest = hashlib.sha256()
+    with open(session_pool.model_path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    digest.update(json.dumps(config, sort_keys=True).encode("utf-8"))
+    digest.update(json.dumps(approved_colleges, sort_keys=True).encode("utf-8"))
+    digest.update(json.dumps([name for name, _, _ in template_matcher.templates]).encode("utf-8"))
+    return digest.hexdigest()[:16]
+
+# Verdicts keyed on image content + pipeline version (None when disabled in config.json)
+result_cache = ResultCache.from_config(config)
+
+# Perceptual hashes of every validated card, for re-uploads and cards shared between users;
+# kept in a SQLite store shared with the job worker processes (None when disabled in config.json)
+uses_version = result_cache is not None or config.get("duplicate_index", {}).get("enabled", False)
+cache_version = pipeline_version() if uses_version else None
+duplicate_checker = DuplicateChecker.from_config(
+    config, cache_version, base_dir=os.path.dirname(os.path.abspath(__file__)))
+
+# The duplicate index reads and writes its SQLite store, so it never runs on the
+# event loop: a write waiting on a job worker's lock would stall every request.
+async def _reused_verdict(image_hash, digest):
+    """Verdict of an earlier upload of the very same card, so the stages can be skipped."""
+    record = await asyncio.get_running_loop().run_in_executor(
+        None, duplicate_checker.reused_verdict, image_hash, digest)
+    if record is None:
+        return None
+    annotate(duplicate="reused")
+    return {
+        "validation_score": record["validation_score"],
+        "label": record["label"],
+        "status": record["status"],
+        "reason": record["reason"],
+        "timings": {},
+        "skipped_stages": ["classifier", "ocr", "template"],
+    }
+
+async def _run_uncached(image_bytes, digest=None, bypass_cache=False):
+    try:
+        with stage_seconds.time("decode"):
+            decoded = await executor.run("decode", decode_image, image_bytes)
+    except Exception:
+        raise HTTPException(status_code=400, detail=INVALID_IMAGE_DETAIL)
+
+    try:
+        image_hash = thumbnail = None
+        result = None
+        if duplicate_checker is not None:
+            image_hash, thumbnail = await executor.run("dhash", run_fingerprint, decoded)
+            if not bypass_cache:
+                result = await _reused_verdict(image_hash, digest)
+        if result is None:
+            result = await run_pipeline(decoded)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    result["image_hash"] = image_hash
+    result["thumbnail"] = thumbnail
+    return result
+
+async def _check_recycled(user_id, digest, result):
+    """
+    Record this user's upload in the duplicate index and flag copies of a card
+    already sent by a different user (one card, many accounts).
+    """
+    result, flagged = await asyncio.get_running_loop().run_in_executor(
+        None, duplicate_checker.check, user_id, result["image_hash"], result["thumbnail"], digest, result)
+    if flagged:
+        annotate(duplicate="flagged")
+    return result
+
+async def validate_image_bytes(user_id, image_bytes, bypass_cache=False):
+    """
+    Decode one upload and run the full pipeline; raises HTTPException on failure.
+
+    Identical uploads are answered from the result cache unless bypass_cache is set
+    (clients send "Cache-Control: no-cache"). Failures are never cached. Exact
+    re-uploads may reuse their stored verdict; copies of a card another user sent
+    (re-compressed or resized too) are flagged (see DuplicateChecker).
+    """
+    digest = content_digest(image_bytes) if duplicate_checker is not None else None
+    cached = False
+    if result_cache is None or bypass_cache:
+        result = await _run_uncached(image_bytes, digest, bypass_cache=bypass_cache)
+    else:
+        key = content_key(image_bytes, cache_version)
+        result, cached = await result_cache.get_or_compute(key, lambda: _run_uncached(image_bytes, digest))
+        annotate(cache="hit" if cached else "miss")
+    if result.get("image_hash") is not None:
+        result = await _check_recycled(user_id, digest, result)
+
+    return ValidateIDResponse(
+        user_id=user_id,
+        validation_score=result["validation_score"],
+        label=result["label"],
+        status=result["status"],
+        reason=result["reason"],
+        threshold=config["validation_threshold"],
+        # A cached verdict carries the stage timings of the request that computed it
+        timings=result["timings"] if config.get("report_timings") and not cached else None,
+        skipped_stages=None if cached else result["skipped_stages"] or None,
+        cached=cached or None,
+    )
+
+# Sampled copy of incoming requests for replay (None when disabled in config.json)
+recorder = RequestRecorder.from_config(config, base_dir=os.path.dirname(os.path.abspath(__file__)))
+
+async def serve_validation(endpoint, user_id, image_bytes, bypass_cache=False):
+    """
+    validate_image_bytes with per-request metrics and one summary log record,
+    appending the request to the recorder log when it is sampled.
+    """
+    global requests_in_flight
+    record = recorder is not None and recorder.sampled()
+    requests_in_flight += 1
+    start = time.perf_counter()
+    status_code, label = 500, None
+    with request_scope(endpoint=endpoint, user_id=user_id, size=len(image_bytes)) as request_log:
+        try:
+            response = await validate_image_bytes(user_id, image_bytes, bypass_cache=bypass_cache)
+            status_code, label = 200, response.label
+            request_log.fields.update(score=round(response.validation_score, 3), status=response.status)
+            return response
+        except HTTPException as e:
+            status_code = e.status_code
+            request_log.fields["error"] = str(e.detail)
+            raise
+        finally:
+            requests_in_flight -= 1
+            elapsed = time.perf_counter() - start
+            requests_total.inc(endpoint, label or "error", str(status_code))
+            request_seconds.observe(elapsed, endpoint)
+            if record:
+                recorder.record(endpoint, user_id, image_bytes, status_code, round(elapsed * 1000, 3),
+                                label=label, no_cache=bypass_cache)
+            request_logger.info("validated", extra={"fields": dict(
+                request_log.fields, status_code=status_code, label=label, latency_ms=round(elapsed * 1000, 3))})
+
+async def close():
+    """Stop the batcher, executor, recorder and log listener (API shutdown or worker exit)."""
+    if batcher is not None:
+        await batcher.close()
+    executor.shutdown(wait=False)
+    if recorder is not None:
+        recorder.close()
+    if log_listener is not None:
+        log_listener.stop()  # flushes queued log records
@@ -0,0 +1,133 @@
+import io
+import threading
+
+import numpy as np
+from PIL import Image
+
+INPUT_SIZE = (224, 224)
+MEAN = (0.485, 0.456, 0.406)
+STD = (0.229, 0.224, 0.225)
+
+RESAMPLE_FILTERS = {
+    "nearest": Image.Resampling.NEAREST,
+    "box": Image.Resampling.BOX,
+    "bilinear": Image.Resampling.BILINEAR,
+    "bicubic": Image.Resampling.BICUBIC,
+    "lanczos": Image.Resampling.LANCZOS,
+}
+
+
+class Preprocessor:
+    def __init__(self, size=INPUT_SIZE, resample="bilinear", reducing_gap=3.0, mean=MEAN, std=STD):
+        """
+        Classifier input in one pass: shrink the image, then normalise it straight
+        into a float32 (3, H, W) array.
+
+        (x / 255 - mean) / std is folded into x * scale + offset with per-channel
+        constants computed here once, and both steps write into the output with
+        out=, so the only allocation per image is the resized uint8 copy. Large
+        uploads are first shrunk by an integer factor with Image.reduce (what
+        reducing_gap does) before the resampling filter runs on what is left.
+
+        Args:
+            size (tuple): (width, height) the model expects
+            resample (str): PIL filter name, see RESAMPLE_FILTERS
+            reducing_gap (float): Keep at least this many source pixels per output
+                pixel before resampling; None resamples from full resolution
+            mean (tuple): Per-channel mean of the training normalisation
+            std (tuple): Per-channel std of the training normalisation
+        """
+        try:
+            self.resample = RESAMPLE_FILTERS[resample]
+        except KeyError:
+            raise ValueError(f"Unknown preprocessing.resample '{resample}' "
+                             f"(expected one of {', '.join(RESAMPLE_FILTERS)})")
+        self.size = tuple(size)
+        self.reducing_gap = reducing_gap
+        std = np.asarray(std, dtype=np.float32)
+        self.scale = (1.0 / (255.0 * std)).reshape(3, 1, 1)
+        self.offset = (-np.asarray(mean, dtype=np.float32) / std).reshape(3, 1, 1)
+        # Scratch batches are reused by the thread that asked for them, so two
+        # executor threads never write into the same buffer
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, config):
+        """Build the preprocessor from the "preprocessing" section of config.json."""
+        settings = config.get("preprocessing", {})
+        return cls(
+            size=tuple(settings.get("size", INPUT_SIZE)),
+            resample=settings.get("resample", "bilinear"),
+            reducing_gap=settings.get("reducing_gap", 3.0),
+        )
+
+    @property
+    def shape(self):
+        width, height = self.size
+        return (3, height, width)
+
+    def open(self, image_bytes):
+        """
+        Decode upload bytes for the classifier alone. JPEGs are decoded at the
+        smallest DCT scale (1/2, 1/4 or 1/8) that still leaves reducing_gap
+        pixels per output pixel, which skips most of the decoding work.
+        """
+        try:
+            pil_image = Image.open(io.BytesIO(image_bytes))
+            if self.reducing_gap:
+                width, height = self.size
+                pil_image.draft("RGB", (int(width * self.reducing_gap), int(height * self.reducing_gap)))
+            pil_image.load()
+        except Exception as e:
+            raise ValueError(f"Invalid image data - cannot decode: {e}")
+        return pil_image
+
+    def resize(self, pil_image):
+        """RGB image at the model input size, as a PIL image."""
+        if pil_image.mode != "RGB":
+            pil_image = pil_image.convert("RGB")
+        if pil_image.size == self.size:
+            return pil_image
+        return pil_image.resize(self.size, self.resample, reducing_gap=self.reducing_gap)
+
+    def __call__(self, pil_image, out=None):
+        """
+        Normalised (3, H, W) float32 array for one image.
+
+        Args:
+            pil_image (PIL.Image.Image): Image of any size and mode
+            out (numpy.ndarray): float32 array of self.shape to write into;
+                a new one is allocated when omitted
+        """
+        if out is None:
+            out = np.empty(self.shape, dtype=np.float32)
+        pixels = np.asarray(self.resize(pil_image))  # HxWx3 uint8
+        np.multiply(pixels.transpose(2, 0, 1), self.scale, out=out)
+        np.add(out, self.offset, out=out)
+        return out
+
+    def batch_buffer(self, n):
+        """
+        (n, 3, H, W) float32 scratch owned by the calling thread. It is grown as
+        needed and overwritten by that thread's next call, so use it for one
+        inference and do not hand it to another thread.
+        """
+        buffer = getattr(self._local, "buffer", None)
+        if buffer is None or len(buffer) < n:
+            buffer = np.empty((n,) + self.shape, dtype=np.float32)
+            self._local.buffer = buffer
+        return buffer[:n]
+
+    def batch(self, pil_images):
+        """Preprocess several images into the calling thread's batch buffer."""
+        out = self.batch_buffer(len(pil_images))
+        for row, pil_image in enumerate(pil_images):
+            self(pil_image, out[row])
+        return out
+
+    def stack(self, arrays):
+        """Copy already preprocessed (3, H, W) arrays into the calling thread's batch buffer."""
+        out = self.batch_buffer(len(arrays))
+        for row, array in enumerate(arrays):
+            out[row] = array
+        return out
@@ -0,0 +1,164 @@
+import contextlib
+import contextvars
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import random
+
+DETAIL = "detail"  # parent of the per-module detail loggers
+
+# Share of requests whose detail records are kept (see setup_logging)
+detail_sample_rate = 0.0
+
+_current = contextvars.ContextVar("request_log", default=None)
+
+
+def detail_logger(name):
+    """
+    Logger for step-by-step detail of one module (pass __name__). Its DEBUG
+    records only reach the handlers for requests picked by detail_sample_rate.
+    """
+    return logging.getLogger(f"{DETAIL}.{name}")
+
+
+class Lazy:
+    def __init__(self, func, *args):
+        """
+        Log argument computed only if the record is actually formatted, e.g.
+        logger.debug("range %s", Lazy(lambda: (img.min(), img.max()))).
+        """
+        self.func = func
+        self.args = args
+
+    def __str__(self):
+        return str(self.func(*self.args))
+
+    __repr__ = __str__
+
+
+class RequestLog:
+    __slots__ = ("fields", "detail")
+
+    def __init__(self, detail=False):
+        """Fields collected while one request runs, logged as one summary record at the end."""
+        self.fields = {}
+        self.detail = detail
+
+
+@contextlib.contextmanager
+def request_scope(**fields):
+    """
+    Collect annotate() calls made while the block runs, in this task and in the
+    tasks and executor threads it starts, and decide once whether the request's
+    detail records are kept.
+    """
+    log = RequestLog(detail=detail_sample_rate > 0 and random.random() < detail_sample_rate)
+    log.fields.update(fields)
+    token = _current.set(log)
+    try:
+        yield log
+    finally:
+        _current.reset(token)
+
+
+def annotate(**fields):
+    """Add fields to the current request's summary record (no-op outside a request)."""
+    log = _current.get()
+    if log is not None:
+        log.fields.update(fields)
+
+
+def detail_enabled():
+    """True when the current request's detail records are kept; guards costly detail logging."""
+    log = _current.get()
+    return log is not None and log.detail
+
+
+class DetailSampler(logging.Filter):
+    """Drops detail-logger DEBUG records of requests that were not sampled."""
+
+    def filter(self, record):
+        if record.levelno > logging.DEBUG or not record.name.startswith(DETAIL + "."):
+            return True
+        return detail_enabled()
+
+
+def _resolve(value):
+    return str(value) if isinstance(value, Lazy) else value
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and the record's fields."""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in getattr(record, "fields", {}).items():
+            entry[key] = _resolve(value)
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """The usual one-line format, with the record's fields appended as key=value."""
+
+    def __init__(self):
+        super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", None)
+        if fields:
+            line += " " + " ".join(f"{key}={json.dumps(_resolve(value), default=str)}" for key, value in fields.items())
+        return line
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    # The stock prepare() formats the message on the calling thread; the queue
+    # never leaves this process, so pass the record as is and let the listener
+    # thread do the formatting (and evaluate any Lazy arguments)
+    def prepare(self, record):
+        return record
+
+
+def setup_logging(config):
+    """
+    Configure the root logger from the "logging" section of config.json.
+
+    Records are handed to a QueueHandler and written by a QueueListener thread,
+    so request threads never wait on formatting or the stream. Returns the
+    listener (stop() it at shutdown), or None when "queue" is false.
+    """
+    global detail_sample_rate
+    settings = config.get("logging", {})
+    level = logging.getLevelName(str(settings.get("level", "INFO")).upper())
+    detail_sample_rate = min(1.0, max(0.0, float(settings.get("detail_sample_rate", 0.0))))
+
+    target = logging.StreamHandler()
+    target.setFormatter(JsonFormatter() if settings.get("format", "text") == "json" else TextFormatter())
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+    # Detail loggers only create DEBUG records when some requests are sampled
+    logging.getLogger(DETAIL).setLevel(logging.DEBUG if detail_sample_rate > 0 else level)
+
+    if not settings.get("queue", True):
+        target.addFilter(DetailSampler())
+        root.addHandler(target)
+        return None
+    records = queue.SimpleQueue()
+    handler = _DeferredQueueHandler(records)
+    handler.addFilter(DetailSampler())  # runs on the calling thread, where the request context is
+    root.addHandler(handler)
+    listener = logging.handlers.QueueListener(records, target, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -0,0 +1,156 @@
+import base64
+import glob
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class RequestRecorder:
+    def __init__(self, path, sample_rate=1.0, max_pending=256, seed=None):
+        """
+        Appends a sample of incoming validation requests to a JSONL file, one
+        request per line with its image, so real traffic can be replayed later
+        (see benchmarks/bench_http_load.py).
+
+        record() only queues the request; a background thread base64-encodes and
+        writes it, so a slow disk never holds up a response. When more than
+        max_pending requests are waiting to be written, new ones are dropped and
+        counted instead of queued.
+
+        The log holds ID card images, which are personal data: keep it out of
+        version control and delete it once it has served its purpose.
+
+        Args:
+            path (str): JSONL file to append to (parent folders are created)
+            sample_rate (float): Fraction of requests recorded, 0.0 to 1.0
+            max_pending (int): Requests allowed to wait for the writer thread
+            seed (int): Seed for the sampling decisions (tests)
+        """
+        self.path = path
+        self.sample_rate = min(1.0, max(0.0, float(sample_rate)))
+        self._random = random.Random(seed)
+        self._queue = queue.Queue(maxsize=max(1, int(max_pending)))
+        self._lock = threading.Lock()
+        self.seen = 0
+        self.recorded = 0
+        self.dropped = 0
+        self.write_errors = 0
+        self._writer = threading.Thread(target=self._write_loop, name="request-recorder", daemon=True)
+        self._writer.start()
+
+    @classmethod
+    def from_config(cls, config, base_dir="."):
+        """
+        Build a recorder from the "recording" section of config.json, or None if
+        disabled. Other processes than the main one (job workers) append to a file
+        of their own next to it, e.g. recorded_requests.job-worker-0.jsonl, since
+        their lines could interleave with the main process's in one file.
+        """
+        settings = config.get("recording", {})
+        if not settings.get("enabled", False):
+            return None
+        path = os.path.join(base_dir, settings.get("path", ".cache/recorded_requests.jsonl"))
+        process = multiprocessing.current_process().name
+        if process != "MainProcess":
+            root, ext = os.path.splitext(path)
+            path = f"{root}.{process}{ext}"
+        return cls(
+            path,
+            sample_rate=settings.get("sample_rate", 0.1),
+            max_pending=settings.get("max_pending", 256),
+        )
+
+    def sampled(self):
+        """Decide whether the current request is recorded."""
+        with self._lock:
+            self.seen += 1
+        return self.sample_rate >= 1.0 or self._random.random() < self.sample_rate
+
+    def record(self, endpoint, user_id, image_bytes, status_code, latency_ms, label=None, no_cache=False):
+        """Queue one request (and how it was answered) for writing."""
+        entry = {
+            "time": round(time.time(), 3),
+            "endpoint": endpoint,
+            "user_id": user_id,
+            "no_cache": no_cache,
+            "status_code": status_code,
+            "label": label,
+            "latency_ms": latency_ms,
+            "size": len(image_bytes),
+        }
+        try:
+            self._queue.put_nowait((entry, image_bytes))
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            entry, image_bytes = item
+            entry["image_base64"] = base64.b64encode(image_bytes).decode("ascii")
+            try:
+                directory = os.path.dirname(os.path.abspath(self.path))
+                os.makedirs(directory, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(entry) + "\n")
+            except OSError as e:
+                logger.warning(f"Could not record request to {self.path}: {e}")
+                with self._lock:
+                    self.write_errors += 1
+                continue
+            with self._lock:
+                self.recorded += 1
+
+    def close(self, timeout=5.0):
+        """Write out what is queued and stop the writer thread."""
+        if self._writer.is_alive():
+            self._queue.put(None)
+            self._writer.join(timeout)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "path": self.path,
+                "sample_rate": self.sample_rate,
+                "seen": self.seen,
+                "recorded": self.recorded,
+                "dropped": self.dropped,
+                "write_errors": self.write_errors,
+                "pending": self._queue.qsize(),
+            }
+
+
+def recorded_paths(path):
+    """A recorder log and the logs the other processes wrote next to it (see from_config)."""
+    root, ext = os.path.splitext(path)
+    return [path] + sorted(glob.glob(f"{glob.escape(root)}.*{ext}"))
+
+
+def read_recorded(path):
+    """
+    Requests from a recorder log and its per-process siblings, in time order,
+    each a dict with the image decoded into "image_bytes".
+    """
+    requests = []
+    for log_path in recorded_paths(path):
+        if not os.path.exists(log_path):
+            continue
+        with open(log_path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                entry["image_bytes"] = base64.b64decode(entry.pop("image_base64"))
+                requests.append(entry)
+    requests.sort(key=lambda entry: entry["time"])
+    return requests
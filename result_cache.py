@@ -0,0 +1,132 @@
+import asyncio
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+def content_key(image_bytes, version):
+    """Cache key for one upload: digest of the image bytes plus the model/config version."""
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(version.encode("utf-8"))
+    digest.update(image_bytes)
+    return digest.hexdigest()
+
+
+class ResultCache:
+    def __init__(self, max_entries=1024, ttl_seconds=600.0):
+        """
+        Bounded LRU cache of validation results with per-entry TTL.
+
+        Concurrent lookups for a key that is still being computed wait for that
+        computation instead of starting their own, so retries of the same upload
+        always get the same verdict.
+
+        Args:
+            max_entries (int): Entries kept before the least recently used is evicted
+            ttl_seconds (float): Lifetime of an entry; 0 or None disables expiry
+        """
+        self.max_entries = max(1, int(max_entries))
+        self.ttl = float(ttl_seconds) if ttl_seconds else None
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._pending = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    @classmethod
+    def from_config(cls, config):
+        """Build a cache from the "result_cache" section of config.json, or None if disabled."""
+        settings = config.get("result_cache", {})
+        if not settings.get("enabled", False):
+            return None
+        return cls(max_entries=settings.get("max_entries", 1024), ttl_seconds=settings.get("ttl_seconds", 600))
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or expired entry."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    async def get_or_compute(self, key, compute):
+        """
+        Return (value, cached). On a miss, await compute() once and store its
+        result; exceptions are not cached and propagate to every waiter.
+        """
+        value = self.get(key)
+        if value is not None:
+            return value, True
+
+        pending = self._pending.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            try:
+                return await asyncio.shield(pending), True
+            except asyncio.CancelledError:
+                if not pending.cancelled():
+                    raise  # this waiter itself was cancelled
+                # The request computing the value went away; compute it here instead
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending[key] = future
+        try:
+            value = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # mark retrieved when nobody else was waiting
+            raise
+        finally:
+            if self._pending.get(key) is future:
+                del self._pending[key]
+        self.put(key, value)
+        future.set_result(value)
+        return value, False
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "coalesced": self.coalesced,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
@@ -1,3 +1,4 @@
+from typing import Dict, List, Optional
 from pydantic import BaseModel, Field
 
 class ValidateIDRequest(BaseModel):
@@ -11,3 +12,35 @@ class ValidateIDResponse(BaseModel):
     status: str  # approved, manual_review, rejected
     reason: str
     threshold: float
+    timings: Optional[Dict[str, float]] = None  # per-stage latency in ms, when report_timings is enabled
+    skipped_stages: Optional[List[str]] = None  # stages the cascade pipeline did not need to run
+    cached: Optional[bool] = None  # answered from the result cache; no stage ran for this request
+
+class BatchValidateIDRequest(BaseModel):
+    items: List[ValidateIDRequest]
+
+class ValidateIDError(BaseModel):
+    user_id: str
+    status_code: int
+    error: str
+
+class JobRequest(ValidateIDRequest):
+    callback_url: Optional[str] = None  # POSTed the finished job (as GET /jobs/{job_id} returns it)
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: str
+    status_url: str
+
+class JobStatus(BaseModel):
+    job_id: str
+    user_id: str
+    status: str  # queued, running, done, failed
+    attempts: int
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[ValidateIDResponse] = None
+    error: Optional[str] = None
+    callback_url: Optional[str] = None
+    callback_result: Optional[str] = None
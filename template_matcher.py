@@ -1,88 +1,234 @@
 import cv2
+import hashlib
+import json
 import numpy as np
 import os
 import logging
+import threading
+from image_context import as_decoded
+from request_log import Lazy, annotate, detail_logger, detail_enabled
 
 logger = logging.getLogger(__name__)
+detail = detail_logger(__name__)
+
+# cv2.ORB_create defaults; part of the descriptor cache key
+DEFAULT_ORB_PARAMS = {
+    "nfeatures": 500,
+    "scaleFactor": 1.2,
+    "nlevels": 8,
+    "edgeThreshold": 31,
+    "firstLevel": 0,
+    "WTA_K": 2,
+    "patchSize": 31,
+    "fastThreshold": 20,
+}
+
+GOOD_MATCH_DISTANCE = 60
+FLANN_INDEX_LSH = 6
+# Multi-probe LSH over binary ORB descriptors; see benchmarks/bench_template_index.py.
+# key_size grows with the index, for about LSH_BUCKET_DESCRIPTORS descriptors per
+# bucket: with a fixed 12 bits, buckets fill up and lookups slow down linearly
+DEFAULT_LSH_PARAMS = {"algorithm": FLANN_INDEX_LSH, "table_number": 6, "multi_probe_level": 1}
+LSH_BUCKET_DESCRIPTORS = 8
+LSH_KEY_SIZES = (12, 24)
 
 class TemplateMatcher:
-    def __init__(self, template_dir, resize_dim=(600, 400), min_match_count=10):
+    def __init__(self, template_dir, resize_dim=(600, 400), min_match_count=10, orb_params=None, cache_dir=None,
+                 index_min_templates=32, shortlist_size=5, lsh_params=None):
         """
         Args:
-            template_dir (str): Folder containing known template images
+            template_dir (str): Folder containing known template images (None starts empty)
             resize_dim (tuple): Resize all images to this size (width, height)
             min_match_count (int): Minimum good matches to consider a valid template match
+            orb_params (dict): Overrides for cv2.ORB_create keyword arguments
+            cache_dir (str): Folder for persisted template descriptors (None disables the cache)
+            index_min_templates (int): Use the LSH index once there are at least this many
+                templates; below that every template is matched exactly
+            shortlist_size (int): Templates verified exactly after LSH voting
+            lsh_params (dict): Overrides for the FLANN LSH index parameters (key_size
+                fixes the hash length instead of sizing it to the index)
         """
-        self.templates = []
+        self.templates = []  # (filename, keypoint count, ORB descriptors)
         self.resize_dim = resize_dim
         self.min_match_count = min_match_count
+        self.orb_params = dict(DEFAULT_ORB_PARAMS, **(orb_params or {}))
+        self.cache_dir = cache_dir
+        self.index_min_templates = index_min_templates
+        self.shortlist_size = shortlist_size
+        self.lsh_params = dict(lsh_params or {})
+        self._local = threading.local()
+        self._index = None
+        self._index_owners = None
+        self._index_lock = threading.Lock()
         
-        # Load and preprocess templates
-        for filename in os.listdir(template_dir):
+        # Templates never change after startup: compute their features once here,
+        # or load them from the descriptor cache when the file and settings are unchanged
+        templates = []
+        for filename in sorted(os.listdir(template_dir)) if template_dir else []:
             path = os.path.join(template_dir, filename)
-            img = cv2.imread(path, cv2.IMREAD_GRAYSCALE)
-            if img is not None:
-                img = cv2.resize(img, self.resize_dim)
-                self.templates.append((filename, img))
-        
-        # Initialize ORB detector
-        self.orb = cv2.ORB_create()
+            if not os.path.isfile(path):
+                continue
+            features = self._load_template_features(path)
+            if features is not None:
+                templates.append((filename,) + features)
+        self.set_templates(templates)
+        logger.info(f"Loaded {len(self.templates)} templates from {template_dir}")
+
+    def set_templates(self, templates):
+        """
+        Replace the template set, and rebuild the LSH index once it is large enough.
+
+        Args:
+            templates (list): (name, keypoint count, ORB descriptors) tuples
+        """
+        templates = list(templates)
+        indexed = [i for i, (_, _, des) in enumerate(templates) if des is not None]
+        index, owners = None, None
+        if indexed and len(templates) >= self.index_min_templates:
+            # One index over every template's descriptors; owners maps each row back to its template
+            owners = np.concatenate([np.full(len(templates[i][2]), i, np.int32) for i in indexed])
+            key_size = round(np.log2(max(len(owners) / LSH_BUCKET_DESCRIPTORS, 1)))
+            params = dict(DEFAULT_LSH_PARAMS, key_size=int(np.clip(key_size, *LSH_KEY_SIZES)))
+            params.update(self.lsh_params)
+            index = cv2.FlannBasedMatcher(params, {"checks": 64})
+            index.add([np.concatenate([templates[i][2] for i in indexed])])
+            index.train()
+            logger.info(f"Built LSH template index over {len(indexed)} templates "
+                        f"({len(owners)} descriptors, key_size {params['key_size']})")
+        with self._index_lock:
+            self.templates, self._index, self._index_owners = templates, index, owners
+
+    def _candidates(self, des1):
+        """
+        Templates worth verifying exactly for these input descriptors.
+
+        With the index, every input descriptor votes once for each template owning
+        one of its two nearest LSH neighbours within the good-match distance. Votes
+        are normalised by keypoint count like the exact score, and only the
+        shortlist_size best templates are verified. Without it, all are.
+        """
+        with self._index_lock:
+            templates, index, owners = self.templates, self._index, self._index_owners
+            if index is None or des1 is None:
+                return templates
+            neighbours = index.knnMatch(des1, k=2)
+
+        votes = np.zeros(len(templates))
+        for pair in neighbours:
+            voted = {owners[m.trainIdx] for m in pair if m.distance < GOOD_MATCH_DISTANCE}
+            for owner in voted:
+                votes[owner] += 1
+        scores = votes / np.array([max(kp_count, 1) for _, kp_count, _ in templates])
+        shortlist = np.argsort(-scores, kind="stable")[:self.shortlist_size]
+        return [templates[i] for i in shortlist if votes[i] > 0]
 
-    def match_template(self, input_img):
+    @property
+    def orb(self):
+        """ORB detector for the calling thread (cv2 detectors are not shared across threads)."""
+        orb = getattr(self._local, "orb", None)
+        if orb is None:
+            orb = cv2.ORB_create(**self.orb_params)
+            self._local.orb = orb
+        return orb
+
+    @property
+    def bf(self):
+        """Cross-checked Hamming matcher for the calling thread, created once like the detector."""
+        bf = getattr(self._local, "bf", None)
+        if bf is None:
+            bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+            self._local.bf = bf
+        return bf
+
+    def _cache_path(self, file_bytes):
+        key = hashlib.sha256(file_bytes)
+        settings = json.dumps([self.orb_params, list(self.resize_dim), cv2.__version__], sort_keys=True)
+        key.update(settings.encode("utf-8"))
+        return os.path.join(self.cache_dir, key.hexdigest() + ".npz")
+
+    def _load_template_features(self, path):
+        """Return (keypoint count, descriptors) for one template, or None if unreadable."""
+        with open(path, "rb") as f:
+            file_bytes = f.read()
+
+        cache_path = self._cache_path(file_bytes) if self.cache_dir else None
+        if cache_path and os.path.exists(cache_path):
+            try:
+                with np.load(cache_path, allow_pickle=False) as cached:
+                    descriptors = cached["descriptors"]
+                    return int(cached["keypoint_count"]), (descriptors if descriptors.size else None)
+            except Exception as e:
+                logger.warning(f"Ignoring unreadable descriptor cache {cache_path}: {e}")
+
+        img = cv2.imdecode(np.frombuffer(file_bytes, np.uint8), cv2.IMREAD_GRAYSCALE)
+        if img is None:
+            return None
+        img = cv2.resize(img, self.resize_dim)
+        keypoints, descriptors = self.orb.detectAndCompute(img, None)
+
+        if cache_path:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                np.savez(
+                    cache_path,
+                    keypoint_count=np.int64(len(keypoints)),
+                    descriptors=descriptors if descriptors is not None else np.empty((0, 32), np.uint8),
+                )
+            except OSError as e:
+                logger.warning(f"Could not write descriptor cache {cache_path}: {e}")
+        return len(keypoints), descriptors
+
+    def match_template(self, input_img, resized=False):
         """
         Args:
             input_img (np.array): Grayscale image of input ID card
+            resized (bool): True if input_img is already resized to resize_dim
         
         Returns:
             best_match_template (str): filename of best matching template
             best_score (float): similarity score (higher is better)
         """
-        logger.info(f"Input image shape: {input_img.shape}")
-        input_img = cv2.resize(input_img, self.resize_dim)
-        logger.info(f"Resized input shape: {input_img.shape}")
+        if not resized:
+            input_img = cv2.resize(input_img, self.resize_dim)
+        verbose = detail_enabled()  # checked once: this loop runs for every template
         
         # Detect keypoints and descriptors for input image
         kp1, des1 = self.orb.detectAndCompute(input_img, None)
-        logger.info(f"Input image keypoints: {len(kp1) if kp1 else 0}")
-        logger.info(f"Input descriptors shape: {des1.shape if des1 is not None else None}")
-        
-        bf = cv2.BFMatcher(cv2.NORM_HAMMING, crossCheck=True)
+        if verbose:
+            detail.debug("Input %s: %d keypoints", input_img.shape, len(kp1) if kp1 else 0)
         
         best_score = 0
         best_template = None
         
-        for (template_name, template_img) in self.templates:
-            logger.info(f"\nMatching against template: {template_name}")
-            kp2, des2 = self.orb.detectAndCompute(template_img, None)
-            logger.info(f"Template keypoints: {len(kp2) if kp2 else 0}")
-            
+        for (template_name, template_kp_count, des2) in self._candidates(des1):
             if des1 is None or des2 is None:
-                logger.warning(f"No descriptors found for {template_name}")
+                if verbose:
+                    detail.debug("No descriptors for %s", template_name)
                 continue
             
             # Match descriptors
-            matches = bf.match(des1, des2)
-            logger.info(f"Total matches found: {len(matches)}")
+            matches = self.bf.match(des1, des2)
             
             # Sort matches by distance (lower distance is better)
             matches = sorted(matches, key=lambda x: x.distance)
             
             # Filter good matches based on distance threshold
-            good_matches = [m for m in matches if m.distance < 60]
-            logger.info(f"Good matches (distance < 60): {len(good_matches)}")
+            good_matches = [m for m in matches if m.distance < GOOD_MATCH_DISTANCE]
             
-            score = len(good_matches) / max(len(kp2), 1)  # Normalize by keypoints count
-            logger.info(f"Match score: {score:.3f}")
+            score = len(good_matches) / max(template_kp_count, 1)  # Normalize by keypoints count
+            if verbose:
+                detail.debug("Template %s: %d keypoints, %d matches, %d good, score %.3f",
+                             template_name, template_kp_count, len(matches), len(good_matches), score)
             
             if score > best_score:
                 best_score = score
                 best_template = template_name
-                logger.info(f"New best match: {template_name} with score {score:.3f}")
         
-        logger.info(f"\nFinal best match: {best_template} with score {best_score:.3f}")
+        if verbose:
+            detail.debug("Best template match: %s with score %.3f", best_template, best_score)
         return best_template, best_score
 
-    def is_match(self, input_img, threshold=0.15):
+    def is_match(self, input_img, threshold=0.15, resized=False):
         """
         Decide if input image matches any known template
         
@@ -91,7 +237,7 @@ class TemplateMatcher:
             str: best matching template filename or None
             float: best similarity score
         """
-        best_template, best_score = self.match_template(input_img)
+        best_template, best_score = self.match_template(input_img, resized=resized)
         
         if best_score >= threshold:
             return True, best_template, best_score
@@ -99,33 +245,30 @@ class TemplateMatcher:
             return False, best_template, best_score
 
 
-# --- Function to use in FastAPI (used in main.py) ---
+# --- Function to use in FastAPI (used in pipeline.py) ---
 template_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "test_template"))
-matcher = TemplateMatcher(template_dir=template_dir)
+descriptor_cache_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".cache", "template_descriptors"))
+matcher = TemplateMatcher(template_dir=template_dir, cache_dir=descriptor_cache_dir)
 
-def check_template(image_bytes):
+def check_template(image):
     """
-    Receives image bytes (from FastAPI), converts to grayscale image,
-    and checks if it matches any known template.
+    Receives the request's DecodedImage (or raw image bytes), takes its cached
+    grayscale variant at the template size, and checks if it matches any known template.
     
     Returns:
         float: Similarity score between 0 and 1
     """
-    logger.info("Starting template matching...")
-    
-    # Convert bytes to image
-    nparr = np.frombuffer(image_bytes, np.uint8)
-    img = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
-    
-    if img is None:
+    try:
+        decoded = as_decoded(image)
+    except ValueError:
         logger.error("Failed to decode image bytes")
         return 0.0
-        
-    logger.info(f"Input image shape: {img.shape}")
-    logger.info(f"Image value range: min={img.min()}, max={img.max()}")
-    
-    _, _, score = matcher.is_match(img)
-    logger.info(f"Template matching score: {score:.3f}")
+
+    img = decoded.resized_gray(matcher.resize_dim)
+    # The range scan only runs if a sampled record is formatted
+    detail.debug("Input %s, value range %s", decoded.shape, Lazy(lambda: (int(img.min()), int(img.max()))))
+    _, best_template, score = matcher.is_match(img, resized=True)
+    annotate(template=best_template, template_score=round(score, 3))
     return score
 
 
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Make the top-level service modules importable when running plain `pytest`
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
@@ -0,0 +1,103 @@
+import asyncio
+
+from batching import MicroBatcher
+
+
+def test_concurrent_submits_share_one_batch():
+    calls = []
+
+    async def run_batch(items):
+        calls.append(list(items))
+        return [item * 10 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(run_batch, max_batch_size=32, max_wait_ms=20)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+        await batcher.close()
+        return results, batcher.stats()
+
+    results, stats = asyncio.run(scenario())
+
+    assert results == [0, 10, 20, 30, 40]
+    assert calls == [[0, 1, 2, 3, 4]]
+    assert stats["batches"] == 1
+    assert stats["avg_batch_size"] == 5
+
+
+def test_batches_are_capped_at_max_batch_size():
+    sizes = []
+
+    async def run_batch(items):
+        sizes.append(len(items))
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(run_batch, max_batch_size=4, max_wait_ms=200)
+        results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in range(10))), 5)
+        await batcher.close()
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert results == list(range(10))
+    assert max(sizes) <= 4
+    assert sum(sizes) == 10
+
+
+def test_batch_failure_is_raised_for_every_item():
+    async def run_batch(items):
+        raise RuntimeError("inference failed")
+
+    async def scenario():
+        batcher = MicroBatcher(run_batch, max_batch_size=8, max_wait_ms=5)
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+        await batcher.close()
+        return results
+
+    results = asyncio.run(scenario())
+
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+def test_from_config_returns_none_when_disabled():
+    async def run_batch(items):
+        return items
+
+    assert MicroBatcher.from_config({}, run_batch) is None
+    batcher = MicroBatcher.from_config({"batching": {"enabled": True, "max_batch_size": 8}}, run_batch)
+    assert batcher.max_batch_size == 8
+
+
+def test_close_waits_for_running_batches():
+    finished = []
+
+    async def run_batch(items):
+        await asyncio.sleep(0.05)
+        finished.append(items)
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(run_batch, max_batch_size=2, max_wait_ms=0)
+        submitted = asyncio.ensure_future(asyncio.gather(batcher.submit(1), batcher.submit(2)))
+        await asyncio.sleep(0.01)  # the batch is running
+        await batcher.close()
+        assert finished == [[1, 2]] and batcher.stats()["inflight_batches"] == 0
+        return await submitted
+
+    assert asyncio.run(scenario()) == [1, 2]
+
+
+def test_close_cancels_batches_that_overrun_the_timeout():
+    async def run_batch(items):
+        await asyncio.sleep(10)
+        return items
+
+    async def scenario():
+        batcher = MicroBatcher(run_batch, max_batch_size=1, max_wait_ms=0)
+        submitted = asyncio.ensure_future(batcher.submit(1))
+        await asyncio.sleep(0.01)
+        await batcher.close(timeout=0.01)
+        await asyncio.sleep(0)
+        return submitted.cancelled()
+
+    assert asyncio.run(scenario())
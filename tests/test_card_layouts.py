@@ -0,0 +1,36 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("cv2")
+
+from card_layouts import field_regions, photo_region
+
+LAYOUTS = json.load(open(os.path.join(os.path.dirname(__file__), "..", "card_layouts.json")))
+
+
+def test_regions_at_reference_size_follow_text_lines():
+    layout = LAYOUTS["template1.jpg"]
+    regions = field_regions(layout, *layout["size"])
+
+    assert list(regions) == ["name", "course", "roll", "college"]
+    x, y = layout["text_start"]
+    assert regions["name"][:2] == (x - 4, y - 4)
+    assert regions["roll"][1] == y + 2 * layout["line_gap"] - 4
+
+
+def test_regions_scale_with_upload_size():
+    layout = LAYOUTS["template2.jpg"]
+    width, height = layout["size"]
+    full = field_regions(layout, width, height)
+    half = field_regions(layout, width // 2, height // 2)
+
+    for field in full:
+        assert all(abs(a / 2 - b) <= 1 for a, b in zip(full[field], half[field]))
+
+
+def test_photo_region_is_clipped_to_image():
+    layout = LAYOUTS["template1.jpg"]
+    x0, y0, x1, y1 = photo_region(layout, 100, 100)
+    assert 0 <= x0 < x1 <= 100 and 0 <= y0 < y1 <= 100
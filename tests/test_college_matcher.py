@@ -0,0 +1,162 @@
+import random
+
+from college_matcher import (
+    AhoCorasick, CollegeMatcher, EDU_KEYWORDS, GENERIC_WORDS, FuzzyCollegeIndex, normalize_name, substring_distance
+)
+
+COLLEGES = ["IIT Delhi", "Anna University", "Delhi University", "NIT Trichy", "BITS Pilani"]
+
+
+def dp_substring_distance(pattern, text):
+    """Plain dynamic-programming reference for substring_distance."""
+    column = list(range(len(pattern) + 1))
+    best = column[-1]
+    for ch in text:
+        diagonal = column[0]
+        for i, pch in enumerate(pattern, 1):
+            above = column[i]
+            column[i] = min(above + 1, column[i - 1] + 1, diagonal + (pch != ch))
+            diagonal = above
+        best = min(best, column[-1])
+    return best
+
+
+def dp_word_similarity(name, line):
+    """weighted_similarity spelled out with the reference distance."""
+    total = scored = 0.0
+    for word in name.split():
+        weight = 0.25 if word in GENERIC_WORDS else 1.0
+        total += weight * len(word)
+        scored += weight * (len(word) - min(dp_substring_distance(word, line), len(word)))
+    return scored / total
+
+
+def dp_word_threshold(name, min_similarity):
+    """Names with fewer than 8 distinctive letters need halfway to an exact match."""
+    distinctive = sum(len(word) for word in name.split() if word not in GENERIC_WORDS)
+    return 1.0 - (1.0 - min_similarity) / 2 if distinctive < 8 else min_similarity
+
+
+def naive_find(text, colleges):
+    """The substring loops detect_college used before the automaton."""
+    text_lower = text.lower()
+    for college in colleges:
+        if college.lower() in text_lower:
+            return college, None
+    for keyword in EDU_KEYWORDS:
+        if keyword in text_lower:
+            for line in text.splitlines():
+                if keyword in line.lower() and len(line.strip()) > len(keyword):
+                    return None, line.strip()
+    return None, None
+
+
+def test_automaton_reports_overlapping_matches():
+    automaton = AhoCorasick(["he", "she", "his", "hers"])
+    found = sorted((end, automaton.patterns[pid]) for end, pid in automaton.iter_matches("ushers"))
+    assert found == [(3, "he"), (3, "she"), (5, "hers")]
+
+
+def test_returns_first_approved_college_in_list_order():
+    matcher = CollegeMatcher(COLLEGES)
+    text = "STUDENT CARD\nDelhi University\nformerly with IIT DELHI"
+    assert matcher.find(text) == ("IIT Delhi", None)
+
+
+def test_keyword_needs_more_than_the_keyword_on_its_line():
+    matcher = CollegeMatcher(COLLEGES)
+    assert matcher.find("College\nName: Asha") == (None, None)
+    assert matcher.find("Name: Asha\n  St. Xavier's College  ") == (None, "St. Xavier's College")
+
+
+def test_set_colleges_rebuilds_automaton():
+    matcher = CollegeMatcher(COLLEGES)
+    assert matcher.find("VIT Vellore") == (None, None)
+    matcher.set_colleges(COLLEGES + ["VIT Vellore"])
+    assert matcher.find("VIT Vellore") == ("VIT Vellore", None)
+
+
+def test_matches_naive_scan_on_random_text():
+    rng = random.Random(3)
+    words = ["iit", "delhi", "anna", "university", "nit", "college", "name:", "roll", "bits",
+             "pilani", "trichy", "school", "x", "\n", "\n", "  "]
+    matcher = CollegeMatcher(COLLEGES)
+    for _ in range(2000):
+        text = " ".join(rng.choice(words) for _ in range(rng.randint(0, 12)))
+        if rng.random() < 0.5:
+            text = text.upper()
+        assert matcher.find(text) == naive_find(text, COLLEGES), text
+
+
+def test_substring_distance_ignores_surrounding_text():
+    assert substring_distance("anna university", "welcome to anna university chennai") == 0
+    assert substring_distance("anna university", "anna unlversity") == 1
+    assert substring_distance("abc", "") == 3
+
+
+def test_substring_distance_matches_dynamic_programming():
+    rng = random.Random(5)
+    for _ in range(500):
+        pattern = "".join(rng.choice("abc ") for _ in range(rng.randint(1, 70)))
+        text = "".join(rng.choice("abcd ") for _ in range(rng.randint(0, 90)))
+        assert substring_distance(pattern, text) == dp_substring_distance(pattern, text)
+
+
+def test_fuzzy_lookup_survives_ocr_errors():
+    matcher = CollegeMatcher(COLLEGES + ["Indian Institute of Technology Madras"])
+    text = "STUDENT ID\nINDIAN INSTLTUTE OF TECHNOLOGV MADRAS\nRoll No: 21CS1001"
+    assert matcher.find(text) == (None, None)
+    name, similarity = matcher.closest(text)
+    assert name == "Indian Institute of Technology Madras"
+    assert 0.9 < similarity < 1.0
+
+
+def test_fuzzy_lookup_prefers_the_name_covering_more_text():
+    matcher = CollegeMatcher(["Shiv Nadar University", "Shiv Nadar University Campus 2"])
+    assert matcher.closest("SHIX NADAR UNIVERSITY XAMPUS 2")[0] == "Shiv Nadar University Campus 2"
+
+
+def test_fuzzy_lookup_rejects_unrelated_text():
+    matcher = CollegeMatcher(COLLEGES, min_similarity=0.8)
+    assert matcher.closest("Name: Asha Kumar\nCourse: B.Tech") == (None, 0.0)
+    assert matcher.closest("Anna Unversity") == ("Anna University", 0.933)
+
+
+def test_fuzzy_lookup_matches_exhaustive_scan():
+    rng = random.Random(11)
+    colleges = [f"{rng.choice(['Sri', 'National', 'Royal'])} {word} College" for word in
+                ["Ganga", "Kaveri", "Yamuna", "Godavari", "Krishna", "Narmada", "Tapti", "Mahanadi"]]
+    index = FuzzyCollegeIndex(colleges, min_similarity=0.75, max_candidates=len(colleges))
+    for _ in range(300):
+        name = list(normalize_name(rng.choice(colleges)))
+        for _ in range(rng.randint(0, 4)):
+            name[rng.randrange(len(name))] = rng.choice("abcdefghijklmnopqrstuvwxyz ")
+        text = "id card\n" + "".join(name)
+
+        scored = []
+        for college in colleges:
+            name = normalize_name(college)
+            for line in text.splitlines():
+                distance = dp_substring_distance(name, normalize_name(line))
+                if 1.0 - distance / len(name) >= 0.75 and \
+                        dp_word_similarity(name, normalize_name(line)) >= dp_word_threshold(name, 0.75):
+                    scored.append(len(name) - distance)
+        found, similarity = index.lookup(text)
+        if scored:
+            name = normalize_name(found)
+            assert len(name) - round((1.0 - similarity) * len(name)) == max(scored), text
+        else:
+            assert found is None, text
+
+
+def test_fuzzy_lookup_needs_the_distinctive_words():
+    matcher = CollegeMatcher(COLLEGES + ["College of Engineering Pune"])
+    assert matcher.closest("Fake University of Nowhere") == (None, 0.0)
+    assert matcher.closest("GOVERNMENT COLLEGE OF ENGINEERING") == (None, 0.0)
+    assert matcher.closest("College of Engineerlng Pune")[0] == "College of Engineering Pune"
+
+
+def test_short_names_need_a_closer_match():
+    matcher = CollegeMatcher(COLLEGES, min_similarity=0.8)
+    assert matcher.closest("Anua University") == (None, 0.0)  # "Anna" has 4 distinctive letters
+    assert matcher.closest("Anna Unlversity")[0] == "Anna University"
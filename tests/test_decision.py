@@ -0,0 +1,37 @@
+import itertools
+
+from decision import (
+    decide_label,
+    classifier_settles_label,
+    template_can_change_label,
+    SKIPPED_OCR_RESULT,
+)
+
+SCORES = [0.0, 0.2, 0.39, 0.4, 0.6, 0.85, 0.86, 1.0]
+FIELDS = [0, 1, 2, 3, 4]
+TEMPLATE_SCORES = [0.0, 0.29, 0.3, 0.8]
+
+
+def test_classifier_shortcut_never_changes_label():
+    for score in SCORES:
+        if not classifier_settles_label(score):
+            continue
+        shortcut = decide_label(score, SKIPPED_OCR_RESULT, 0.0, 0.7)
+        for fields, template in itertools.product(FIELDS, TEMPLATE_SCORES):
+            assert decide_label(score, {"fields_detected": fields}, template, 0.7) == shortcut
+
+
+def test_template_shortcut_never_changes_label():
+    for score, fields in itertools.product(SCORES, FIELDS):
+        ocr_result = {"fields_detected": fields}
+        if classifier_settles_label(score) or template_can_change_label(ocr_result):
+            continue
+        shortcut = decide_label(score, ocr_result, 0.0, 0.7)
+        for template in TEMPLATE_SCORES:
+            assert decide_label(score, ocr_result, template, 0.7) == shortcut
+
+
+def test_template_still_runs_when_ocr_failed():
+    assert template_can_change_label({"fields_detected": 1})
+    assert decide_label(0.6, {"fields_detected": 1}, 0.0, 0.7)[0] == "fake"
+    assert decide_label(0.6, {"fields_detected": 1}, 0.8, 0.7)[0] == "suspicious"
@@ -0,0 +1,131 @@
+import base64
+import io
+import json
+import os
+import zipfile
+
+import pytest
+
+for module in ("fastapi", "httpx", "multipart", "cv2", "onnxruntime", "PIL"):
+    pytest.importorskip(module)
+if not os.path.exists(os.path.join(os.path.dirname(__file__), "..", "model", "image_model.onnx")):
+    pytest.skip("importing main needs the trained model at model/image_model.onnx", allow_module_level=True)
+
+from fastapi.testclient import TestClient
+
+import main
+from schemas import ValidateIDResponse
+
+MAX_UPLOAD = 1000
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """The app with small upload limits and the pipeline replaced by a recorder of its inputs."""
+    calls = []
+
+    async def serve_validation(endpoint, user_id, image_bytes, bypass_cache=False):
+        calls.append((endpoint, user_id, image_bytes, bypass_cache))
+        return ValidateIDResponse(user_id=user_id, validation_score=0.9, label="genuine", status="approved",
+                                  reason="Clear image and valid college", threshold=0.7)
+
+    monkeypatch.setattr(main, "serve_validation", serve_validation)
+    monkeypatch.setitem(main.config, "max_upload_bytes", MAX_UPLOAD)
+    monkeypatch.setitem(main.config, "batch", dict(main.config.get("batch", {}), max_items=3, max_total_bytes=2500))
+    client = TestClient(main.app)
+    client.calls = calls
+    return client
+
+
+def ndjson(response):
+    return sorted((json.loads(line) for line in response.text.splitlines()), key=lambda item: item["user_id"])
+
+
+def batch_item(user_id, size):
+    return {"user_id": user_id, "image_base64": base64.b64encode(b"x" * size).decode("ascii")}
+
+
+def zip_archive(entries, compression=zipfile.ZIP_STORED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", compression=compression) as bundle:
+        for name, data in entries.items():
+            bundle.writestr(name, data)
+    return {"archive": ("cards.zip", buffer.getvalue(), "application/zip")}
+
+
+def test_batch_streams_one_line_per_item(client):
+    response = client.post("/validate-id/batch", json={"items": [batch_item("a", 10), batch_item("b", 20)]})
+    assert response.status_code == 200
+    assert [(item["user_id"], item["label"]) for item in ndjson(response)] == [("a", "genuine"), ("b", "genuine")]
+
+
+def test_batch_item_over_the_upload_limit_fails_alone(client):
+    items = [batch_item("a", 10), batch_item("big", MAX_UPLOAD + 1)]
+    response = client.post("/validate-id/batch", json={"items": items})
+    big = ndjson(response)[1]
+    assert big["user_id"] == "big" and big["status_code"] == 413
+    assert [call[1] for call in client.calls] == ["a"]
+
+
+def test_batch_over_the_item_or_byte_limit_is_rejected(client):
+    too_many = client.post("/validate-id/batch", json={"items": [batch_item(str(i), 1) for i in range(4)]})
+    too_large = client.post("/validate-id/batch", json={"items": [batch_item(str(i), 900) for i in range(3)]})
+    assert too_many.status_code == too_large.status_code == 413
+    assert client.calls == []
+
+
+def test_archive_validates_each_image_named_by_user(client):
+    response = client.post("/validate-id/batch/archive",
+                           files=zip_archive({"stu_1.jpg": b"a" * 10, "cards/stu_2.png": b"b" * 10, "notes.txt": b"-"}))
+    assert [item["user_id"] for item in ndjson(response)] == ["stu_1", "stu_2"]
+    assert sorted(call[2] for call in client.calls) == [b"a" * 10, b"b" * 10]
+
+
+def test_archive_entry_over_the_limit_fails_alone(client):
+    # 1 MB of zeros compresses to about 1 KB: the declared size is what counts
+    bomb = zip_archive({"bomb.jpg": b"\0" * (1024 * 1024), "stu_1.jpg": b"a" * 10}, zipfile.ZIP_DEFLATED)
+    response = client.post("/validate-id/batch/archive", files=bomb)
+
+    bomb_line, ok_line = ndjson(response)
+    assert bomb_line["user_id"] == "bomb" and bomb_line["status_code"] == 413
+    assert ok_line["label"] == "genuine"
+    assert [call[1] for call in client.calls] == ["stu_1"]
+
+
+def test_archive_over_the_byte_limit_or_not_a_zip_is_rejected(client):
+    entries = {f"{i}.jpg": b"\0" * 900 for i in range(3)}  # small archive, 2700 bytes once decompressed
+    too_large = client.post("/validate-id/batch/archive", files=zip_archive(entries, zipfile.ZIP_DEFLATED))
+    not_zip = client.post("/validate-id/batch/archive",
+                          files={"archive": ("cards.zip", b"not a zip", "application/zip")})
+    assert too_large.status_code == 413
+    assert not_zip.status_code == 400
+    assert client.calls == []
+
+
+def test_upload_accepts_a_raw_body_with_the_user_in_the_query_or_header(client):
+    query = client.post("/validate-id/upload?user_id=stu_1", content=b"raw-image",
+                        headers={"Content-Type": "application/octet-stream"})
+    header = client.post("/validate-id/upload", content=b"raw-image",
+                         headers={"Content-Type": "application/octet-stream", "X-User-Id": "stu_2",
+                                  "Cache-Control": "no-cache"})
+    assert query.status_code == header.status_code == 200
+    assert client.calls == [("/validate-id/upload", "stu_1", b"raw-image", False),
+                            ("/validate-id/upload", "stu_2", b"raw-image", True)]
+
+
+def test_upload_accepts_a_multipart_form(client):
+    response = client.post("/validate-id/upload", data={"user_id": "stu_1"},
+                           files={"file": ("card.jpg", b"form-image", "image/jpeg")})
+    assert response.status_code == 200
+    assert client.calls == [("/validate-id/upload", "stu_1", b"form-image", False)]
+
+
+def test_upload_needs_a_user_and_an_image_within_the_limit(client):
+    no_user = client.post("/validate-id/upload", content=b"raw-image")
+    empty = client.post("/validate-id/upload?user_id=stu_1", content=b"")
+    too_large = client.post("/validate-id/upload?user_id=stu_1", content=b"x" * (MAX_UPLOAD + 1))
+    too_large_form = client.post("/validate-id/upload", data={"user_id": "stu_1"},
+                                 files={"file": ("card.jpg", b"x" * (MAX_UPLOAD + 1), "image/jpeg")})
+    assert (no_user.status_code, empty.status_code) == (400, 400)
+    assert too_large.status_code == too_large_form.status_code == 413
+    assert client.calls == []
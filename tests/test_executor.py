@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from executor import StageExecutor
+
+
+def slow_square(x, delay=0.05):
+    time.sleep(delay)
+    return x * x
+
+
+def test_run_returns_result_and_records_stage():
+    executor = StageExecutor(mode="thread", max_workers=2)
+    try:
+        result = asyncio.run(executor.run("square", slow_square, 3, delay=0))
+        stats = executor.stats()
+    finally:
+        executor.shutdown()
+
+    assert result == 9
+    assert stats["completed"] == 1
+    assert stats["stages"]["square"]["count"] == 1
+
+
+
+def test_observers_see_every_completed_stage():
+    executor = StageExecutor(mode="thread", max_workers=1)
+    seen = []
+    executor.add_observer(lambda stage, wait, run: seen.append((stage, wait >= 0, run >= 0.01)))
+    try:
+        asyncio.run(executor.run("square", slow_square, 2, delay=0.01))
+    finally:
+        executor.shutdown()
+
+    assert seen == [("square", True, True)]
+
+def test_blocking_stages_do_not_block_event_loop():
+    executor = StageExecutor(mode="thread", max_workers=4)
+
+    async def scenario():
+        start = time.monotonic()
+        results = await asyncio.gather(*(executor.run("square", slow_square, i) for i in range(4)))
+        return results, time.monotonic() - start
+
+    try:
+        results, elapsed = asyncio.run(scenario())
+    finally:
+        executor.shutdown()
+
+    assert results == [0, 1, 4, 9]
+    assert elapsed < 4 * 0.05
+
+
+def test_queue_wait_is_reported_when_pool_is_saturated():
+    executor = StageExecutor(mode="thread", max_workers=1)
+
+    async def scenario():
+        await asyncio.gather(*(executor.run("square", slow_square, i) for i in range(3)))
+
+    try:
+        asyncio.run(scenario())
+        stats = executor.stats()
+    finally:
+        executor.shutdown()
+
+    assert stats["max_wait_ms"] >= 50
+    assert stats["queue_depth"] == 0
+
+
+def test_failed_stage_propagates_and_is_counted():
+    executor = StageExecutor(mode="thread", max_workers=1)
+    try:
+        with pytest.raises(TypeError):
+            asyncio.run(executor.run("square", slow_square, None, delay=0))
+        assert executor.stats()["failed"] == 1
+    finally:
+        executor.shutdown()
+
+
+def test_initializer_runs_in_every_worker_thread_at_startup():
+    threads = set()
+    executor = StageExecutor(mode="thread", max_workers=3,
+                             initializer=lambda: threads.add(threading.current_thread().name))
+    try:
+        executor.start_workers()
+        assert len(threads) == 3
+        ran_on = asyncio.run(executor.run("name", lambda: threading.current_thread().name))
+    finally:
+        executor.shutdown()
+
+    assert ran_on in threads
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        StageExecutor(mode="gpu")
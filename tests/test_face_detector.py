@@ -0,0 +1,68 @@
+import json
+import os
+
+import pytest
+
+pytest.importorskip("cv2")
+
+import numpy as np
+from PIL import Image
+
+from face_detector import FaceDetector
+from image_context import DecodedImage
+
+LAYOUTS = json.load(open(os.path.join(os.path.dirname(__file__), "..", "card_layouts.json")))
+
+
+class RecordingCascade:
+    """Stands in for the Haar cascade: records each search and answers from a list."""
+
+    def __init__(self, answers):
+        self.answers = list(answers)
+        self.calls = []
+
+    def detectMultiScale(self, image, **kwargs):
+        self.calls.append((image.shape, kwargs))
+        return self.answers.pop(0)
+
+
+def card(width, height):
+    return DecodedImage(Image.fromarray(np.zeros((height, width, 3), dtype=np.uint8)))
+
+
+def test_searches_downscaled_image_and_maps_boxes_back():
+    detector = FaceDetector(max_side=500, min_face_ratio=0.1, max_face_ratio=0.5)
+    detector._local.cascade = RecordingCascade([[(10, 20, 50, 50)]])
+
+    faces = detector.detect(card(2000, 1000))
+
+    (shape, kwargs), = detector._local.cascade.calls
+    assert shape == (250, 500)
+    assert kwargs["minSize"] == (25, 25) and kwargs["maxSize"] == (125, 125)
+    assert faces == [(40, 80, 200, 200)]
+
+
+def test_layout_photo_region_is_searched_first():
+    layout = LAYOUTS["template1.jpg"]
+    width, height = layout["size"]
+    detector = FaceDetector(max_side=max(width, height), photo_margin=0.0)
+    detector._local.cascade = RecordingCascade([[(5, 5, 100, 100)]])
+
+    faces = detector.detect(card(width, height), layout)
+
+    x, y, w, h = layout["photo"]
+    (shape, _), = detector._local.cascade.calls
+    assert shape == (h, w)
+    assert faces == [(x + 5, y + 5, 100, 100)]
+
+
+def test_falls_back_to_whole_card_when_photo_region_is_empty():
+    layout = LAYOUTS["template1.jpg"]
+    width, height = layout["size"]
+    detector = FaceDetector(max_side=max(width, height))
+    detector._local.cascade = RecordingCascade([(), [(1, 2, 80, 80)]])
+
+    faces = detector.detect(card(width, height), layout)
+
+    assert [shape for shape, _ in detector._local.cascade.calls][-1] == (height, width)
+    assert faces == [(1, 2, 80, 80)]
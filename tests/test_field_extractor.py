@@ -0,0 +1,65 @@
+import random
+import re
+
+from field_extractor import BLACKLIST_NAMES, FieldExtractor, NAME_PATTERNS, ROLL_PATTERNS
+
+
+def loop_name(text):
+    """detect_name before the combined scanner: each pattern over each stripped line."""
+    for _, pattern, _ in NAME_PATTERNS:
+        for line in text.splitlines():
+            match = re.search(pattern, line.strip(), re.IGNORECASE)
+            if match:
+                name_clean = re.sub(r'[^a-z\. ]', '', match.group(1).strip().lower()).strip()
+                if name_clean in BLACKLIST_NAMES:
+                    continue
+                if len(name_clean.replace('.', '').replace(' ', '')) >= 3:
+                    return name_clean
+    return None
+
+
+def loop_roll(text):
+    """detect_roll_number before the combined scanner: first pattern found in list order."""
+    for label, pattern, _ in ROLL_PATTERNS:
+        if re.search(pattern, text.upper(), re.IGNORECASE):
+            return label
+    return None
+
+
+def test_extracts_values_and_patterns():
+    extractor = FieldExtractor()
+    fields = extractor.extract("ANNA UNIVERSITY\n  Name: Asha Kumar  \nRoll No: 21CS1001\n")
+    assert fields["name"] == {"value": "asha kumar", "pattern": "name_label"}
+    assert fields["roll_number"] == {"value": "21CS1001", "pattern": "year_branch_4"}
+
+
+def test_blacklisted_name_falls_through_to_next_candidate():
+    extractor = FieldExtractor()
+    fields = extractor.extract("Name: Batman\nStudent: Ravi Teja")
+    assert fields["name"] == {"value": "ravi teja", "pattern": "student_label"}
+    assert extractor.extract("Name: Iron Man")["name"] is None
+
+
+def test_counts_matched_and_selected_patterns():
+    extractor = FieldExtractor()
+    extractor.extract("Name: Asha\nClass 8 Section B")
+    extractor.extract("Class 9")
+    stats = extractor.stats()
+    assert stats["scans"] == 2
+    assert stats["patterns"]["class_number"] == {"field": "roll", "matched": 2, "selected": 2}
+    assert stats["patterns"]["section"] == {"field": "roll", "matched": 1, "selected": 0}
+    assert stats["patterns"]["hall_ticket"]["matched"] == 0
+
+
+def test_matches_per_pattern_loops_on_random_text():
+    rng = random.Random(2)
+    tokens = ["Name:", "name", "Mr.", "Dr", "Student", "STUDENT ID:", "Asha", "KUMAR", "Batman", "Iron", "Man",
+              "Roll", "No:", "21CS1001", "22891A0678", "Class", "8", "Sec.", "ZA", "3rd", "Grade", "Section",
+              "Session", "2013-2014", "Course", "ID", "AB1234", "-", ".", ":", "  ", "\n", "\n", "\r\n", "\t"]
+    extractor = FieldExtractor()
+    for _ in range(3000):
+        text = " ".join(rng.choice(tokens) for _ in range(rng.randint(0, 14)))
+        fields = extractor.extract(text)
+        name = fields["name"]["value"] if fields["name"] else None
+        roll = fields["roll_number"]["pattern"] if fields["roll_number"] else None
+        assert (name, roll) == (loop_name(text), loop_roll(text)), repr(text)
@@ -0,0 +1,48 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+onnx = pytest.importorskip("onnx")
+ort = pytest.importorskip("onnxruntime")
+pytest.importorskip("torch")
+pytest.importorskip("torchvision")
+
+from onnx import TensorProto, helper, numpy_helper
+
+from image_classifier import quantize_model
+
+
+@pytest.fixture
+def fp32_path(tmp_path):
+    """A single (N, 256) x (256, 64) MatMul, the layer kind dynamic quantization converts."""
+    weights = np.random.default_rng(0).normal(size=(256, 64)).astype(np.float32)
+    graph = helper.make_graph(
+        [helper.make_node("MatMul", ["input", "weights"], ["output"])],
+        "linear",
+        [helper.make_tensor_value_info("input", TensorProto.FLOAT, [None, 256])],
+        [helper.make_tensor_value_info("output", TensorProto.FLOAT, [None, 64])],
+        initializer=[numpy_helper.from_array(weights, "weights")],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    path = str(tmp_path / "model.onnx")
+    onnx.save(model, path)
+    return path
+
+
+def run(path, x):
+    return ort.InferenceSession(path, providers=["CPUExecutionProvider"]).run(None, {"input": x})[0]
+
+
+def test_dynamic_int8_model_is_smaller_and_close_to_fp32(tmp_path, fp32_path):
+    int8_path = quantize_model("dynamic", fp32_path=fp32_path, int8_path=str(tmp_path / "int8" / "model.int8.onnx"))
+    x = np.random.default_rng(1).normal(size=(4, 256)).astype(np.float32)
+    expected, actual = run(fp32_path, x), run(int8_path, x)
+
+    assert onnx.load(int8_path).ByteSize() < onnx.load(fp32_path).ByteSize() / 2
+    assert np.abs(actual - expected).max() < 0.05 * np.abs(expected).max()
+    assert (actual.argmax(axis=1) == expected.argmax(axis=1)).all()
+
+
+def test_unknown_quantization_mode_is_rejected(tmp_path, fp32_path):
+    with pytest.raises(ValueError):
+        quantize_model("fp8", fp32_path=fp32_path, int8_path=str(tmp_path / "model.int8.onnx"))
@@ -0,0 +1,78 @@
+import io
+import pickle
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from image_context import DecodedImage, as_decoded
+
+EXIF_ORIENTATION = 0x0112
+
+
+def encode(image, format="PNG", **params):
+    buffer = io.BytesIO()
+    image.save(buffer, format=format, **params)
+    return buffer.getvalue()
+
+
+def landscape_card(width=60, height=30):
+    """Left half black, right half white, so the orientation is visible in the pixels."""
+    pixels = np.zeros((height, width, 3), dtype=np.uint8)
+    pixels[:, width // 2:] = 255
+    return Image.fromarray(pixels)
+
+
+def test_decodes_to_rgb_once():
+    decoded = DecodedImage.from_bytes(encode(landscape_card().convert("L")))
+    assert decoded.shape == (30, 60, 3)
+    assert decoded.pil.mode == "RGB"
+    assert decoded.gray.shape == (30, 60)
+    assert decoded.gray is decoded.gray
+
+
+def test_invalid_bytes_raise_value_error():
+    with pytest.raises(ValueError):
+        DecodedImage.from_bytes(b"not an image")
+
+
+def test_exif_orientation_is_applied_like_cv2():
+    # Stored sideways, tagged "rotate 90 degrees clockwise to display" (orientation 6)
+    stored = landscape_card().transpose(Image.Transpose.ROTATE_90)
+    exif = Image.Exif()
+    exif[EXIF_ORIENTATION] = 6
+    data = encode(stored, "JPEG", exif=exif.tobytes(), quality=95)
+
+    decoded = DecodedImage.from_bytes(data)
+    upright = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+
+    assert decoded.shape[:2] == upright.shape[:2] == (30, 60)
+    assert decoded.gray[:, :20].mean() < 64 and decoded.gray[:, 40:].mean() > 192
+
+
+def test_downscaled_keeps_aspect_and_reports_scale():
+    decoded = as_decoded(encode(landscape_card(400, 200)))
+    small, scale = decoded.downscaled(100)
+    assert small.shape == (50, 100) and scale == 4.0
+    unchanged, scale = decoded.downscaled(1000)
+    assert unchanged is decoded.gray and scale == 1.0
+
+
+def test_dhash_survives_rescaling():
+    card = landscape_card(400, 200)
+    original = DecodedImage(card).dhash()
+    rescaled = DecodedImage(card.resize((200, 100))).dhash()
+    assert (original ^ rescaled).bit_count() <= 2
+
+
+def test_pickled_copy_sends_pixels_once_and_rebuilds_pil():
+    decoded = DecodedImage.from_bytes(encode(landscape_card()))
+    assert decoded.gray is not None  # cached variants travel with the copy
+
+    copy = pickle.loads(pickle.dumps(decoded))
+
+    assert copy._pil is None
+    assert np.array_equal(np.asarray(copy.pil), decoded.rgb)
+    assert np.array_equal(copy.gray, decoded.gray)
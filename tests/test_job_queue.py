@@ -0,0 +1,78 @@
+import time
+
+import pytest
+
+from job_queue import JobQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    return JobQueue(str(tmp_path / "jobs.sqlite3"), max_attempts=2)
+
+
+def test_submitted_job_is_claimed_and_completed(queue):
+    job_id = queue.submit("stu_1", b"image", callback_url="http://localhost/hook")
+    assert queue.get(job_id)["status"] == "queued"
+
+    job = queue.claim("w1", lease_seconds=60)
+    assert (job["id"], job["user_id"], job["image"], job["attempts"]) == (job_id, "stu_1", b"image", 1)
+    assert job["callback_url"] == "http://localhost/hook"
+    assert queue.get(job_id)["status"] == "running"
+    assert queue.claim("w2", lease_seconds=60) is None
+
+    queue.complete(job_id, {"label": "genuine"})
+    done = queue.get(job_id)
+    assert done["status"] == "done" and done["result"] == {"label": "genuine"}
+    assert queue.stats() == {"queued": 0, "running": 0, "done": 1, "failed": 0}
+
+
+def test_jobs_are_claimed_oldest_first(queue):
+    first = queue.submit("stu_1", b"a")
+    second = queue.submit("stu_2", b"b")
+    assert [queue.claim("w", 60)["id"] for _ in range(2)] == [first, second]
+
+
+def test_jobs_survive_reopening_the_file(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    job_id = JobQueue(path).submit("stu_1", b"image")
+    assert JobQueue(path).claim("w", 60)["id"] == job_id
+
+
+def test_expired_lease_is_retried_then_failed(queue):
+    job_id = queue.submit("stu_1", b"image")
+    queue.claim("w1", lease_seconds=0.01)
+    time.sleep(0.02)
+    retry = queue.claim("w2", lease_seconds=0.01)
+    assert retry["id"] == job_id and retry["attempts"] == 2
+
+    time.sleep(0.02)
+    assert queue.claim("w3", lease_seconds=60) is None
+    failed = queue.get(job_id)
+    assert failed["status"] == "failed" and "2 attempts" in failed["error"]
+
+
+def test_renewed_lease_is_not_reclaimed(queue):
+    queue.submit("stu_1", b"image")
+    queue.claim("w1", lease_seconds=0.05)
+    assert queue.renew("w1", lease_seconds=60) == 1
+    time.sleep(0.06)
+    assert queue.claim("w2", lease_seconds=60) is None
+
+
+def test_two_connections_never_claim_the_same_job(tmp_path):
+    path = str(tmp_path / "jobs.sqlite3")
+    api, other = JobQueue(path), JobQueue(path)
+    for index in range(4):
+        api.submit(f"stu_{index}", b"image")
+    claimed = [q.claim(name, 60)["id"] for q, name in ((api, "a"), (other, "b"), (api, "a"), (other, "b"))]
+    assert len(set(claimed)) == 4
+
+
+def test_purge_removes_only_old_finished_jobs(queue):
+    done = queue.submit("stu_1", b"a")
+    queue.claim("w", 60)
+    queue.complete(done, {})
+    pending = queue.submit("stu_2", b"b")
+    assert queue.purge(older_than_seconds=3600) == 0
+    assert queue.purge(older_than_seconds=0) == 1
+    assert queue.get(done) is None and queue.get(pending)["status"] == "queued"
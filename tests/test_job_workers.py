@@ -0,0 +1,49 @@
+import pytest
+
+pytest.importorskip("fastapi")
+
+import job_workers
+from job_workers import check_callback_url
+
+
+@pytest.mark.parametrize("url", [
+    "http://127.0.0.1:8000/hook",
+    "http://localhost/hook",
+    "http://10.1.2.3/hook",
+    "http://192.168.0.10/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/hook",
+    "http://0.0.0.0/hook",
+    "ftp://93.184.216.34/hook",
+    "http:///hook",
+])
+def test_internal_or_non_http_callbacks_are_refused(url):
+    with pytest.raises(ValueError):
+        check_callback_url(url)
+
+
+def test_public_callbacks_are_accepted():
+    check_callback_url("https://93.184.216.34/hook")
+
+
+def test_allow_list_replaces_the_address_check():
+    check_callback_url("http://hooks.internal:9000/done", allowed_hosts=["Hooks.Internal"])
+    with pytest.raises(ValueError):
+        check_callback_url("https://93.184.216.34/hook", allowed_hosts=["hooks.internal"])
+
+
+class RecordingQueue:
+    def __init__(self):
+        self.outcomes = {}
+
+    def get(self, job_id):
+        raise AssertionError("a refused callback must not be sent")
+
+    def set_callback_result(self, job_id, outcome):
+        self.outcomes[job_id] = outcome
+
+
+def test_refused_callback_is_recorded_and_not_sent():
+    queue = RecordingQueue()
+    job_workers._deliver_callback(queue, "job-1", "http://169.254.169.254/latest", timeout=1)
+    assert queue.outcomes["job-1"].startswith("refused: ")
@@ -0,0 +1,70 @@
+from metrics import MetricsRegistry, process_memory
+
+
+def test_counter_renders_per_label_combination():
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("endpoint", "status"))
+    requests.inc("/validate-id", "200")
+    requests.inc("/validate-id", "200")
+    requests.inc("/validate-id", "400")
+
+    text = registry.render()
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{endpoint="/validate-id",status="200"} 2' in text
+    assert 'requests_total{endpoint="/validate-id",status="400"} 1' in text
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = MetricsRegistry()
+    stages = registry.histogram("stage_seconds", "Stage time", ("stage",), buckets=(0.01, 0.1, 1.0))
+    for value in (0.005, 0.05, 0.05, 2.0):
+        stages.observe(value, "ocr")
+
+    lines = registry.render().splitlines()
+    assert 'stage_seconds_bucket{stage="ocr",le="0.01"} 1' in lines
+    assert 'stage_seconds_bucket{stage="ocr",le="0.1"} 3' in lines
+    assert 'stage_seconds_bucket{stage="ocr",le="1"} 3' in lines
+    assert 'stage_seconds_bucket{stage="ocr",le="+Inf"} 4' in lines
+    assert 'stage_seconds_count{stage="ocr"} 4' in lines
+    assert any(line.startswith('stage_seconds_sum{stage="ocr"} 2.10') for line in lines)
+
+
+def test_bucket_bounds_are_inclusive():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("h", "h", buckets=(0.1,))
+    histogram.observe(0.1)
+    assert 'h_bucket{le="0.1"} 1' in registry.render()
+
+
+def test_timer_observes_its_block():
+    registry = MetricsRegistry()
+    histogram = registry.histogram("t", "t", ("stage",))
+    with histogram.time("decision"):
+        pass
+    assert 't_count{stage="decision"} 1' in registry.render()
+
+
+def test_callbacks_are_read_at_scrape_time_and_can_be_absent():
+    registry = MetricsRegistry()
+    depth = [3]
+    registry.callback("queue_depth", "Queue depth", lambda: depth[0])
+    registry.callback("cache_entries", "Disabled cache", lambda: None)
+    registry.callback("memory_bytes", "Memory", lambda: {("rss",): 10}, labelnames=("type",))
+
+    depth[0] = 5
+    text = registry.render()
+    assert "queue_depth 5" in text
+    assert "cache_entries" not in text
+    assert 'memory_bytes{type="rss"} 10' in text
+
+
+def test_label_values_are_escaped():
+    registry = MetricsRegistry()
+    registry.counter("c", "c", ("name",)).inc('a"b\\c\nd')
+    assert 'c{name="a\\"b\\\\c\\nd"} 1' in registry.render()
+
+
+def test_process_memory_reports_bytes():
+    memory = process_memory()
+    assert set(memory) == {"rss", "vms"}
+    assert memory["rss"] >= 0
@@ -0,0 +1,75 @@
+import logging
+
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("pytesseract")
+
+import ocr_engine
+from ocr_engine import OCREngine, PytesseractEngine, create_ocr_engine
+
+
+class EchoEngine(OCREngine):
+    name = "echo"
+
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+
+    def _recognize(self, rgb, psm):
+        if self.fail:
+            raise RuntimeError("tesseract is not installed")
+        return f"{rgb.shape[1]}x{rgb.shape[0]} psm {psm}"
+
+
+@pytest.fixture
+def tesseract_cmd(monkeypatch):
+    """Restore pytesseract's global binary path after the test."""
+    monkeypatch.setattr(ocr_engine.pytesseract.pytesseract, "tesseract_cmd", "tesseract")
+    return ocr_engine.pytesseract.pytesseract
+
+
+def test_auto_falls_back_to_pytesseract_without_tesserocr(monkeypatch, tesseract_cmd, caplog):
+    monkeypatch.setattr(ocr_engine, "tesserocr", None)
+    assert isinstance(create_ocr_engine({"engine": "auto"}), PytesseractEngine)
+    assert "falls back to pytesseract" in caplog.text
+    caplog.clear()
+    assert isinstance(create_ocr_engine({"engine": "pytesseract", "psm": 6}), PytesseractEngine)
+    assert "falls back" not in caplog.text  # asked for by name
+    with pytest.raises(RuntimeError):
+        create_ocr_engine({"engine": "tesserocr"})
+
+
+def test_unknown_engine_is_rejected(tesseract_cmd):
+    with pytest.raises(ValueError):
+        create_ocr_engine({"engine": "easyocr"})
+
+
+def test_missing_tesseract_cmd_keeps_the_path_lookup(tesseract_cmd, caplog):
+    with caplog.at_level(logging.WARNING, logger="ocr_engine"):
+        PytesseractEngine(tesseract_cmd="/no/such/tesseract")
+    assert tesseract_cmd.tesseract_cmd == "tesseract"
+    assert "not found" in caplog.text
+
+
+def test_existing_tesseract_cmd_is_used(tmp_path, tesseract_cmd):
+    binary = tmp_path / "tesseract"
+    binary.write_text("")
+    PytesseractEngine(tesseract_cmd=str(binary))
+    assert tesseract_cmd.tesseract_cmd == str(binary)
+
+
+def test_warmup_failure_is_logged_not_raised(caplog):
+    engine = EchoEngine(fail=True)
+    with caplog.at_level(logging.WARNING, logger="ocr_engine"):
+        assert engine.warmup() is False
+    assert "warmup failed" in caplog.text
+    assert engine.stats()["warmup_ms"] is None
+
+
+def test_calls_are_timed_and_use_the_requested_mode():
+    engine = EchoEngine()
+    assert engine.warmup() is True
+    assert engine.image_to_string(np.zeros((10, 40, 3), dtype=np.uint8), psm=7) == "40x10 psm 7"
+    stats = engine.stats()
+    assert stats["calls"] == 1 and stats["warmup_ms"] is not None
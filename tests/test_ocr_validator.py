@@ -0,0 +1,42 @@
+import pytest
+
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("cv2")
+
+import ocr_validator
+from college_matcher import CollegeMatcher
+from image_context import DecodedImage
+
+COLLEGES = CollegeMatcher(["Indian Institute of Technology Madras", "Anna University"])
+
+
+class TextEngine:
+    def __init__(self, text):
+        self.text = text
+
+    def image_to_string(self, image, psm=None):
+        return self.text
+
+
+@pytest.fixture
+def read_as(monkeypatch):
+    """Validate a blank card whose OCR text is the given string, with no face found."""
+    monkeypatch.setattr(ocr_validator, "layout_registry", None)
+    monkeypatch.setattr(ocr_validator, "find_faces", lambda image, layout=None: [])
+
+    def validate(text):
+        monkeypatch.setattr(ocr_validator, "ocr_engine", TextEngine(text))
+        return ocr_validator.validate_id_card(DecodedImage(Image.new("RGB", (60, 40), "white")), COLLEGES, 3)
+    return validate
+
+
+def test_misread_college_is_a_candidate_not_a_verified_college(read_as):
+    result = read_as("INDIAN INSTLTUTE OF TECHNOLOGV MADRAS\nRoll No: 21CS1001")
+    assert result["college_candidate"]["name"] == "Indian Institute of Technology Madras"
+    assert result["college_name"] is None and result["college_verified"] is False
+
+
+def test_exact_college_is_verified_without_a_candidate(read_as):
+    result = read_as("ANNA UNIVERSITY\nRoll No: 21CS1001")
+    assert result["college_name"] == "Anna University" and result["college_verified"] is True
+    assert result["college_candidate"] is None
@@ -0,0 +1,80 @@
+import threading
+
+import pytest
+
+np = pytest.importorskip("numpy")
+onnx = pytest.importorskip("onnx")
+pytest.importorskip("onnxruntime")
+
+from onnx import TensorProto, helper
+
+from onnx_sessions import SessionPool, session_options
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    """A one-node model doubling a (N, 3) float input."""
+    graph = helper.make_graph(
+        [helper.make_node("Add", ["x", "x"], ["y"])],
+        "double",
+        [helper.make_tensor_value_info("x", TensorProto.FLOAT, [None, 3])],
+        [helper.make_tensor_value_info("y", TensorProto.FLOAT, [None, 3])],
+    )
+    model = helper.make_model(graph, opset_imports=[helper.make_opsetid("", 13)])
+    model.ir_version = 8
+    path = str(tmp_path / "double.onnx")
+    onnx.save(model, path)
+    return path
+
+
+def test_config_settings_are_applied_and_reported(model_path):
+    config = {"onnx": {"pool_size": 2, "intra_op_num_threads": 1, "inter_op_num_threads": 1,
+                       "graph_optimization_level": "basic", "enable_mem_pattern": False}}
+    pool = SessionPool.from_config(config, model_path)
+    report = pool.report()
+
+    assert len(pool.sessions) == 2
+    assert (report["pool_size"], report["intra_op_num_threads"], report["inter_op_num_threads"]) == (2, 1, 1)
+    assert report["graph_optimization_level"] == "ORT_ENABLE_BASIC"
+    assert report["enable_mem_pattern"] is False
+    assert report["providers"] == ["CPUExecutionProvider"]
+
+
+def test_unknown_setting_value_is_rejected():
+    with pytest.raises(ValueError):
+        session_options({"execution_mode": "turbo"})
+    with pytest.raises(ValueError):
+        SessionPool("unused.onnx", size=0)
+
+
+def test_each_caller_gets_its_own_session_until_it_returns_it(model_path):
+    pool = SessionPool(model_path, size=2)
+    with pool.session() as first, pool.session() as second:
+        assert first is not second
+        assert pool.stats()["idle"] == 0
+        output = first.run(None, {"x": np.ones((1, 3), np.float32)})[0]
+    assert output.tolist() == [[2.0, 2.0, 2.0]]
+    assert pool.stats()["idle"] == 2
+
+
+def test_busy_pool_makes_the_next_caller_wait(model_path):
+    pool = SessionPool(model_path, size=1)
+    borrowed = threading.Event()
+    release = threading.Event()
+
+    def hold():
+        with pool.session():
+            borrowed.set()
+            release.wait()
+
+    holder = threading.Thread(target=hold)
+    holder.start()
+    borrowed.wait()
+    threading.Timer(0.05, release.set).start()
+    with pool.session():
+        pass
+    holder.join()
+
+    stats = pool.stats()
+    assert (stats["acquired"], stats["waits"]) == (2, 1)
+    assert stats["avg_wait_ms"] >= 40
@@ -0,0 +1,175 @@
+import io
+import os
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+pytest.importorskip("cv2")
+
+from image_context import DecodedImage
+from phash_index import RECYCLED_REASON, DuplicateChecker, NearDuplicateIndex, content_digest
+
+
+def flip_bits(value, positions):
+    for bit in positions:
+        value ^= 1 << bit
+    return value
+
+
+def test_finds_hashes_within_radius_only():
+    index = NearDuplicateIndex(max_distance=6)
+    base = 0x0F0F_F0F0_1234_ABCD
+    index.add(base, {"user_id": "a"})
+    index.add(flip_bits(base, [1, 20, 40]), {"user_id": "b"})
+    index.add(flip_bits(base, range(0, 64, 8)), {"user_id": "c"})  # 8 bits away
+
+    found = index.search(base)
+
+    assert [(d, r["user_id"]) for d, r in found] == [(0, "a"), (3, "b")]
+    assert [r["user_id"] for _, r in index.search(base, max_distance=0)] == ["a"]
+
+
+def test_matches_brute_force_on_random_hashes():
+    rng = random.Random(7)
+    index = NearDuplicateIndex(max_distance=4)
+    hashes = [rng.getrandbits(64) for _ in range(2000)]
+    for i, h in enumerate(hashes):
+        index.add(h, {"id": i})
+    # Plant near-duplicates so there is something to find
+    for i in range(0, 2000, 100):
+        near = flip_bits(hashes[i], rng.sample(range(64), rng.randint(0, 4)))
+        index.add(near, {"id": f"near-{i}"})
+        hashes.append(near)
+
+    query = hashes[500]
+    expected = sorted(i for i, h in enumerate(hashes) if bin(h ^ query).count("1") <= 4)
+    found = index.search(query)
+
+    assert len(found) == len(expected)
+
+
+def test_indexes_attached_to_one_store_share_entries(tmp_path):
+    path = str(tmp_path / "hashes.sqlite3")
+    api, worker = NearDuplicateIndex(max_distance=3), NearDuplicateIndex(max_distance=3)
+    api.attach(path)
+    worker.attach(path)
+    worker.add(123456789, {"user_id": "stu_1", "label": "genuine"})
+
+    assert api.search(123456789)[0][1] == {"user_id": "stu_1", "label": "genuine"}
+    assert len(api) == len(worker) == 1
+
+    restarted = NearDuplicateIndex(max_distance=3)
+    restarted.attach(path)
+    assert restarted.search(123456789) == api.search(123456789)
+
+
+def test_radius_must_leave_room_for_chunks():
+    with pytest.raises(ValueError):
+        NearDuplicateIndex(max_distance=64)
+
+
+GENUINE = {"validation_score": 0.93, "label": "genuine", "status": "approved", "reason": "Clear image and valid college"}
+TEMPLATE_HASH = 0x3C3C_7E7E_0F0F_F0F0  # two cards printed on one template can share their dHash
+SAMPLES = os.path.join(os.path.dirname(__file__), "sample_inputs")
+
+
+def card_thumbnail(photo_value):
+    """A 32x32 card: the same template stripes, with a photo box of the given grey."""
+    thumbnail = np.tile(np.linspace(40, 220, 32, dtype=np.uint8), (32, 1))
+    thumbnail[8:24, 2:12] = photo_value
+    return thumbnail
+
+
+ALICE_CARD, BOB_CARD = card_thumbnail(30), card_thumbnail(250)
+
+
+def checker(**settings):
+    return DuplicateChecker(NearDuplicateIndex(max_distance=6), "v1", **settings)
+
+
+def fingerprint(path, reencode=None):
+    """(dHash, thumbnail, digest) of a sample card, optionally resized and re-saved as JPEG first."""
+    image = Image.open(path).convert("RGB")
+    if reencode is not None:
+        scale, quality = reencode
+        image = image.resize((int(image.width * scale), int(image.height * scale)))
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality if reencode else 95)
+    decoded = DecodedImage.from_bytes(buffer.getvalue())
+    return decoded.dhash(), decoded.thumbnail(), content_digest(buffer.getvalue())
+
+
+def test_distinct_cards_on_one_template_never_share_a_verdict():
+    duplicates = checker(reuse_verdicts=True, flag_other_users=True)
+    alice, bob = content_digest(b"alice card"), content_digest(b"bob card")
+    duplicates.check("alice", TEMPLATE_HASH, ALICE_CARD, alice, GENUINE)
+
+    assert duplicates.reused_verdict(TEMPLATE_HASH, bob) is None
+    bob_result = dict(GENUINE, validation_score=0.41, label="suspicious", status="manual_review")
+    assert duplicates.check("bob", TEMPLATE_HASH, BOB_CARD, bob, bob_result) == (bob_result, False)
+
+
+def test_copy_from_another_user_is_flagged_when_enabled():
+    card = content_digest(b"card")
+    duplicates = checker(flag_other_users=True)
+    duplicates.check("alice", TEMPLATE_HASH, ALICE_CARD, card, GENUINE)
+
+    result, flagged = duplicates.check("mallory", flip_bits(TEMPLATE_HASH, [3, 40]), ALICE_CARD, card, GENUINE)
+    assert flagged and result["label"] == "suspicious" and result["reason"] == RECYCLED_REASON
+    assert not checker(flag_other_users=False).check("mallory", TEMPLATE_HASH, ALICE_CARD, card, GENUINE)[1]
+
+
+def test_reencoded_photo_of_a_card_is_detected_but_another_card_is_not():
+    duplicates = checker(flag_other_users=True)
+    image_hash, thumbnail, digest = fingerprint(os.path.join(SAMPLES, "genuine", "clear_id1.jpg"))
+    duplicates.check("alice", image_hash, thumbnail, digest, GENUINE)
+
+    for reencode in ((0.6, 50), (1.3, 75)):
+        copy_hash, copy_thumbnail, copy_digest = fingerprint(
+            os.path.join(SAMPLES, "genuine", "clear_id1.jpg"), reencode)
+        assert copy_digest != digest
+        assert duplicates.check("mallory", copy_hash, copy_thumbnail, copy_digest, GENUINE)[1]
+
+    # Printed on the same template, a few dHash bits away, but another card
+    other_hash, other_thumbnail, other_digest = fingerprint(os.path.join(SAMPLES, "fake", "fake_template_1.jpg"))
+    assert (other_hash ^ image_hash).bit_count() <= 6
+    assert not duplicates.check("bob", other_hash, other_thumbnail, other_digest, GENUINE)[1]
+
+
+def test_verdicts_are_reused_only_when_enabled_fresh_and_same_version():
+    card = content_digest(b"card")
+    index = NearDuplicateIndex(max_distance=0)
+    DuplicateChecker(index, "v1").check("alice", TEMPLATE_HASH, ALICE_CARD, card, GENUINE)
+
+    assert DuplicateChecker(index, "v1").reused_verdict(TEMPLATE_HASH, card) is None
+    assert DuplicateChecker(index, "v1", reuse_verdicts=True).reused_verdict(TEMPLATE_HASH, card)["label"] == "genuine"
+    assert DuplicateChecker(index, "v2", reuse_verdicts=True).reused_verdict(TEMPLATE_HASH, card) is None
+    expired = DuplicateChecker(index, "v1", reuse_verdicts=True, reuse_ttl_seconds=0)
+    assert expired.reused_verdict(TEMPLATE_HASH, card) is None
+    other_bytes = content_digest(b"same card, saved again")
+    assert DuplicateChecker(index, "v1", reuse_verdicts=True).reused_verdict(TEMPLATE_HASH, other_bytes) is None
+
+
+def test_checker_is_off_when_it_would_neither_reuse_nor_flag():
+    settings = {"enabled": True, "persist_path": None, "reuse_verdicts": False, "flag_other_users": False}
+    assert DuplicateChecker.from_config({"duplicate_index": settings}, "v1") is None
+    settings["flag_other_users"] = True
+    assert DuplicateChecker.from_config({"duplicate_index": settings}, "v1") is not None
+
+
+def test_index_keeps_only_the_newest_entries(tmp_path):
+    memory = NearDuplicateIndex(max_distance=0, max_entries=10)
+    stored = NearDuplicateIndex(max_distance=0, max_entries=10)
+    stored.attach(str(tmp_path / "hashes.sqlite3"))
+    for value in range(25):
+        memory.add(value, {"n": value})
+        stored.add(value, {"n": value})
+
+    for index in (memory, stored):
+        assert 10 <= len(index) < 11
+        assert index.search(0) == [] and index.search(24) == [(0, {"n": 24})]
+    restarted = NearDuplicateIndex(max_distance=0, max_entries=10)
+    restarted.attach(str(tmp_path / "hashes.sqlite3"))
+    assert 10 <= len(restarted) < 12 and restarted.search(0) == []
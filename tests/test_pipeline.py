@@ -0,0 +1,69 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+for module in ("fastapi", "cv2", "onnxruntime", "PIL"):
+    pytest.importorskip(module)
+if not os.path.exists(os.path.join(os.path.dirname(__file__), "..", "model", "image_model.onnx")):
+    pytest.skip("importing pipeline needs the trained model at model/image_model.onnx", allow_module_level=True)
+
+import pipeline
+
+
+def test_quantized_setting_serves_the_int8_export():
+    assert pipeline.served_model_path({}) == pipeline.MODEL_PATH
+    assert pipeline.served_model_path({"onnx": {"quantized": False}}) == pipeline.MODEL_PATH
+    assert pipeline.served_model_path({"onnx": {"quantized": True}}) == pipeline.QUANTIZED_MODEL_PATH
+    assert os.path.basename(pipeline.QUANTIZED_MODEL_PATH) == "image_model.int8.onnx"
+
+
+STAGE_SECONDS = 0.1
+
+
+@pytest.fixture
+def slow_stages(monkeypatch):
+    """Classifier, OCR and template stages that each take STAGE_SECONDS."""
+    async def classify(decoded):
+        await asyncio.sleep(STAGE_SECONDS)
+        return "genuine", 0.9
+
+    def run_ocr(decoded):
+        time.sleep(STAGE_SECONDS)
+        return {"fields_detected": 4, "is_valid": True, "college_valid": True}
+
+    def check_template(decoded):
+        time.sleep(STAGE_SECONDS)
+        return 0.8
+
+    monkeypatch.setattr(pipeline, "classify", classify)
+    monkeypatch.setattr(pipeline, "run_ocr", run_ocr)
+    monkeypatch.setattr(pipeline, "check_template", check_template)
+
+
+def test_parallel_mode_runs_the_stages_concurrently(monkeypatch, slow_stages):
+    monkeypatch.setitem(pipeline.config, "pipeline_mode", "parallel")
+    result = asyncio.run(pipeline.run_pipeline(decoded=None))
+
+    timings = result["timings"]
+    assert {"classifier", "ocr", "template", "total"} <= set(timings)
+    assert min(timings[stage] for stage in ("classifier", "ocr", "template")) >= STAGE_SECONDS * 1000 * 0.9
+    assert timings["total"] < 2 * STAGE_SECONDS * 1000
+    assert result["skipped_stages"] == []
+    assert result["validation_score"] == 0.9
+
+
+def test_duplicate_checks_run_off_the_event_loop(monkeypatch):
+    threads = []
+
+    class Checker:
+        def check(self, user_id, image_hash, thumbnail, digest, result):
+            threads.append(threading.current_thread())
+            return result, False
+
+    monkeypatch.setattr(pipeline, "duplicate_checker", Checker())
+    result = {"image_hash": 1, "thumbnail": None, "label": "genuine"}
+    assert asyncio.run(pipeline._check_recycled("stu_1", "digest", result)) is result
+    assert threads and threads[0] is not threading.main_thread()
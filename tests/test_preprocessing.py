@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+np = pytest.importorskip("numpy")
+Image = pytest.importorskip("PIL.Image")
+
+from preprocessing import MEAN, STD, Preprocessor
+
+
+def legacy_normalise(pil_image):
+    """The original main.preprocess_image arithmetic, on an image already at 224x224."""
+    img_array = np.array(pil_image).astype(np.float32) / 255.0
+    img_array = (img_array - np.array(MEAN, dtype=np.float32)) / np.array(STD, dtype=np.float32)
+    return np.transpose(img_array, (2, 0, 1))
+
+
+def random_image(width, height, seed=0):
+    pixels = np.random.default_rng(seed).integers(0, 256, (height, width, 3), dtype=np.uint8)
+    return Image.fromarray(pixels)
+
+
+def test_fused_normalisation_matches_the_original_formula():
+    image = random_image(224, 224)
+    result = Preprocessor()(image)
+    assert result.shape == (3, 224, 224) and result.dtype == np.float32
+    np.testing.assert_allclose(result, legacy_normalise(image), atol=1e-5)
+
+
+def test_writes_into_the_given_buffer():
+    preprocessor = Preprocessor()
+    out = np.zeros((3, 224, 224), dtype=np.float32)
+    assert preprocessor(random_image(640, 400), out) is out
+    assert out.any()
+
+
+def test_reduced_resize_stays_close_to_a_full_resolution_resize():
+    image = random_image(1600, 1000)
+    reduced = Preprocessor(reducing_gap=3.0)(image)
+    full = Preprocessor(reducing_gap=None)(image)
+    assert np.abs(reduced - full).mean() < 0.05
+
+
+def test_batch_buffer_is_reused_per_thread():
+    preprocessor = Preprocessor()
+    images = [random_image(300, 200, seed) for seed in range(3)]
+    first = preprocessor.batch(images)
+    expected = first.copy()
+    second = preprocessor.batch(images[:2])
+    assert np.shares_memory(first, second)
+    np.testing.assert_array_equal(second, expected[:2])
+    np.testing.assert_array_equal(preprocessor.stack([preprocessor(img) for img in images]), expected)
+
+
+def test_open_decodes_jpeg_at_reduced_scale():
+    buffer = io.BytesIO()
+    random_image(1792, 1792).save(buffer, format="JPEG")
+    pil_image = Preprocessor(reducing_gap=2.0).open(buffer.getvalue())
+    assert pil_image.size == (448, 448)  # 1/4 scale still covers 2 x 224
+
+
+def test_unknown_filter_is_rejected():
+    with pytest.raises(ValueError):
+        Preprocessor(resample="sharpest")
@@ -0,0 +1,81 @@
+import asyncio
+import json
+import logging
+
+import pytest
+
+import request_log
+from executor import StageExecutor
+from request_log import (DetailSampler, JsonFormatter, Lazy, annotate, detail_enabled, detail_logger,
+                         request_scope)
+
+
+@pytest.fixture
+def sample_rate():
+    previous = request_log.detail_sample_rate
+
+    def set_rate(rate):
+        request_log.detail_sample_rate = rate
+    yield set_rate
+    request_log.detail_sample_rate = previous
+
+
+def detail_record(message="step", args=()):
+    return logging.LogRecord("detail.ocr_validator", logging.DEBUG, __file__, 1, message, args, None)
+
+
+def test_annotations_collect_in_the_current_request_only():
+    annotate(ignored=True)  # outside a request: no-op
+    with request_scope(endpoint="/validate-id") as log:
+        annotate(label="fake", fields_detected=1)
+    assert log.fields == {"endpoint": "/validate-id", "label": "fake", "fields_detected": 1}
+
+
+def test_annotations_reach_the_request_from_executor_threads():
+    executor = StageExecutor(mode="thread", max_workers=1)
+
+    async def scenario():
+        with request_scope() as log:
+            await executor.run("ocr", annotate, fields_detected=3)
+        return log.fields
+
+    try:
+        assert asyncio.run(scenario()) == {"fields_detected": 3}
+    finally:
+        executor.shutdown()
+
+
+def test_detail_records_only_pass_for_sampled_requests(sample_rate):
+    sampler = DetailSampler()
+    sample_rate(0.0)
+    with request_scope():
+        assert not detail_enabled()
+        assert not sampler.filter(detail_record())
+    sample_rate(1.0)
+    with request_scope():
+        assert detail_enabled()
+        assert sampler.filter(detail_record())
+    info = logging.LogRecord("requests", logging.INFO, __file__, 1, "validated", (), None)
+    assert sampler.filter(info)
+
+
+def test_lazy_arguments_are_only_computed_when_formatted():
+    calls = []
+    record = detail_record("range %s", (Lazy(lambda: calls.append(1) or (0, 255)),))
+    assert calls == []
+    assert record.getMessage() == "range (0, 255)"
+    assert calls == [1]
+
+
+def test_json_formatter_writes_fields():
+    record = logging.LogRecord("requests", logging.INFO, __file__, 1, "validated", (), None)
+    record.fields = {"label": "genuine", "latency_ms": 12.5, "template": Lazy(str.upper, "t1")}
+    entry = json.loads(JsonFormatter().format(record))
+    assert entry["message"] == "validated" and entry["level"] == "INFO"
+    assert entry["label"] == "genuine" and entry["latency_ms"] == 12.5 and entry["template"] == "T1"
+
+
+def test_detail_loggers_live_under_one_parent():
+    child = detail_logger("decision")  # modules create theirs before setup_logging touches the parent
+    parent = logging.getLogger("detail")
+    assert child.parent is parent
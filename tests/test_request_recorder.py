@@ -0,0 +1,58 @@
+import multiprocessing
+
+from request_recorder import RequestRecorder, read_recorded
+
+
+def test_recorded_requests_read_back(tmp_path):
+    path = tmp_path / "log" / "requests.jsonl"
+    recorder = RequestRecorder(str(path))
+    recorder.record("/validate-id", "u1", b"\xff\xd8jpeg", 200, 12.5, label="genuine")
+    recorder.record("/validate-id/upload", "u2", b"png", 400, 1.0, no_cache=True)
+    recorder.close()
+
+    first, second = read_recorded(str(path))
+    assert first["endpoint"] == "/validate-id" and first["image_bytes"] == b"\xff\xd8jpeg"
+    assert first["label"] == "genuine" and first["size"] == 6
+    assert second["user_id"] == "u2" and second["status_code"] == 400 and second["no_cache"] is True
+    assert recorder.stats()["recorded"] == 2
+
+
+def test_sampling_rate_is_respected(tmp_path):
+    recorder = RequestRecorder(str(tmp_path / "r.jsonl"), sample_rate=0.25, seed=1)
+    sampled = sum(recorder.sampled() for _ in range(4000))
+    recorder.close()
+    assert 850 < sampled < 1150
+    assert recorder.stats()["seen"] == 4000
+
+
+def test_nothing_sampled_at_zero_rate(tmp_path):
+    recorder = RequestRecorder(str(tmp_path / "r.jsonl"), sample_rate=0.0)
+    assert not any(recorder.sampled() for _ in range(100))
+    recorder.close()
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    recorder = RequestRecorder(str(tmp_path / "r.jsonl"), max_pending=1)
+    recorder.close()  # writer stopped: nothing drains the queue any more
+    recorder.record("/validate-id", "u1", b"a", 200, 1.0)
+    recorder.record("/validate-id", "u2", b"b", 200, 1.0)
+    assert recorder.stats()["dropped"] == 1
+
+
+def test_disabled_by_default():
+    assert RequestRecorder.from_config({}) is None
+
+
+def test_job_workers_write_their_own_log_and_replay_reads_all(tmp_path, monkeypatch):
+    config = {"recording": {"enabled": True, "path": "requests.jsonl"}}
+    api = RequestRecorder.from_config(config, base_dir=str(tmp_path))
+    monkeypatch.setattr(multiprocessing.current_process(), "name", "job-worker-0")
+    worker = RequestRecorder.from_config(config, base_dir=str(tmp_path))
+    assert worker.path == str(tmp_path / "requests.job-worker-0.jsonl")
+
+    api.record("/validate-id", "u1", b"a", 200, 1.0)
+    api.close()
+    worker.record("/jobs", "u2", b"b", 202, 1.0)
+    worker.close()
+
+    assert [r["user_id"] for r in read_recorded(api.path)] == ["u1", "u2"]
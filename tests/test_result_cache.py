@@ -0,0 +1,72 @@
+import asyncio
+import time
+
+import pytest
+
+from result_cache import ResultCache, content_key
+
+
+def test_lru_eviction_keeps_recently_used_entries():
+    cache = ResultCache(max_entries=2, ttl_seconds=None)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_entries_expire_after_ttl():
+    cache = ResultCache(max_entries=10, ttl_seconds=0.05)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["expirations"] == 1
+
+
+def test_hit_and_miss_counters():
+    cache = ResultCache()
+    cache.get("missing")
+    cache.put("key", {"label": "fake"})
+    cache.get("key")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["hit_rate"]) == (1, 1, 0.5)
+
+
+def test_concurrent_misses_compute_once():
+    cache = ResultCache()
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"label": "genuine"}
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get_or_compute("k", compute) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+
+    assert len(calls) == 1
+    assert all(value == {"label": "genuine"} for value, _ in results)
+    assert [cached for _, cached in results].count(False) == 1
+
+
+def test_failures_are_not_cached():
+    cache = ResultCache()
+
+    async def failing():
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_compute("k", failing))
+    assert cache.get("k") is None
+
+
+def test_content_key_depends_on_version():
+    assert content_key(b"image", "v1") == content_key(bytearray(b"image"), "v1")
+    assert content_key(b"image", "v1") != content_key(b"image", "v2")
@@ -0,0 +1,118 @@
+import os
+
+import pytest
+
+cv2 = pytest.importorskip("cv2")
+np = pytest.importorskip("numpy")
+
+from template_matcher import TemplateMatcher
+
+TEMPLATE_DIR = os.path.join(os.path.dirname(__file__), "..", "test_template")
+
+
+def load_gray(name):
+    img = cv2.imread(os.path.join(TEMPLATE_DIR, name), cv2.IMREAD_GRAYSCALE)
+    assert img is not None, name
+    return img
+
+
+def test_empty_template_set_matches_nothing():
+    matcher = TemplateMatcher(template_dir=None)
+    assert matcher.templates == []
+    assert matcher.is_match(load_gray("cbit.jpg")) == (False, None, 0)
+
+
+def test_small_template_set_finds_the_same_card():
+    matcher = TemplateMatcher(template_dir=TEMPLATE_DIR)
+    assert [name for name, _, _ in matcher.templates] == sorted(os.listdir(TEMPLATE_DIR))
+
+    matched, name, score = matcher.is_match(load_gray("cbit.jpg"))
+    assert matched and name == "cbit.jpg" and score > 0.5
+
+
+def test_set_templates_replaces_the_set():
+    matcher = TemplateMatcher(template_dir=TEMPLATE_DIR)
+    kept = [template for template in matcher.templates if template[0] != "cbit.jpg"]
+    matcher.set_templates(kept)
+
+    name, _ = matcher.match_template(load_gray("cbit.jpg"))
+    assert name != "cbit.jpg"
+    matcher.set_templates([])
+    assert matcher.match_template(load_gray("cbit.jpg")) == (None, 0)
+
+
+def test_descriptors_are_loaded_from_the_cache_on_the_next_start(tmp_path, monkeypatch):
+    cache_dir = str(tmp_path / "descriptors")
+    first = TemplateMatcher(template_dir=TEMPLATE_DIR, cache_dir=cache_dir)
+    assert len(os.listdir(cache_dir)) == len(first.templates)
+
+    def no_orb(self):
+        raise AssertionError("features were recomputed")
+
+    monkeypatch.setattr(TemplateMatcher, "orb", property(no_orb))
+    second = TemplateMatcher(template_dir=TEMPLATE_DIR, cache_dir=cache_dir)
+    for (name, count, descriptors), (cached_name, cached_count, cached) in zip(first.templates, second.templates):
+        assert (name, count) == (cached_name, cached_count)
+        assert np.array_equal(descriptors, cached)
+
+
+def test_other_orb_settings_do_not_reuse_cached_descriptors(tmp_path):
+    cache_dir = str(tmp_path / "descriptors")
+    TemplateMatcher(template_dir=TEMPLATE_DIR, cache_dir=cache_dir)
+    TemplateMatcher(template_dir=TEMPLATE_DIR, cache_dir=cache_dir, orb_params={"nfeatures": 200})
+    assert len(os.listdir(cache_dir)) == 2 * len(os.listdir(TEMPLATE_DIR))
+
+
+def perturbed(templates, count, seed=0):
+    """Distinct synthetic templates: real descriptors with a quarter of their bits flipped."""
+    rng = np.random.default_rng(seed)
+    fillers = []
+    for i in range(count):
+        _, kp_count, descriptors = templates[i % len(templates)]
+        bits = np.unpackbits(descriptors, axis=1)
+        fillers.append((f"filler_{i}", kp_count, np.packbits(bits ^ (rng.random(bits.shape) < 0.25), axis=1)))
+    return fillers
+
+
+def test_small_sets_are_matched_exactly_without_an_index():
+    matcher = TemplateMatcher(template_dir=TEMPLATE_DIR)
+    assert matcher._index is None
+    assert matcher._candidates(None) == matcher.templates
+
+
+def decision(matcher, img):
+    matched, name, _ = matcher.is_match(img)
+    return matched, name if matched else None
+
+
+def test_indexed_set_reaches_the_brute_force_decisions():
+    real = TemplateMatcher(template_dir=TEMPLATE_DIR).templates
+    templates = real + perturbed(real, 40)
+    brute = TemplateMatcher(template_dir=None, index_min_templates=float("inf"))
+    brute.set_templates(templates)
+    indexed = TemplateMatcher(template_dir=None)
+    indexed.set_templates(templates)
+    assert indexed._index is not None
+
+    samples = os.path.join(os.path.dirname(__file__), "sample_inputs")
+    queries = [load_gray(name) for name in sorted(os.listdir(TEMPLATE_DIR))] + [
+        cv2.imread(os.path.join(samples, path), cv2.IMREAD_GRAYSCALE)
+        for path in ("genuine/clear_id1.jpg", "fake/fake_template_1.jpg")
+    ]
+    for img in queries:
+        assert decision(indexed, img) == decision(brute, img)
+
+
+def test_index_ignores_templates_without_descriptors():
+    real = TemplateMatcher(template_dir=TEMPLATE_DIR).templates
+    indexed = TemplateMatcher(template_dir=None, index_min_templates=0)
+    indexed.set_templates([("blank.jpg", 0, None)] + real)
+    assert indexed.is_match(load_gray("cbit.jpg"))[:2] == (True, "cbit.jpg")
+    indexed.set_templates([("blank.jpg", 0, None)])
+    assert indexed._index is None and indexed.match_template(load_gray("cbit.jpg")) == (None, 0)
+
+
+def test_fixed_key_size_overrides_the_sized_one():
+    matcher = TemplateMatcher(template_dir=TEMPLATE_DIR, index_min_templates=0, lsh_params={"key_size": 16})
+    assert matcher._index is not None
+    assert matcher.is_match(load_gray("cbit.jpg"))[:2] == (True, "cbit.jpg")